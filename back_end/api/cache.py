@@ -0,0 +1,254 @@
+"""
+Report cache module.
+TTL/LRU response cache for report endpoints with tag-based invalidation.
+
+Entries are keyed by route + parameters + the current version of every tag the
+report depends on ("contracts", "usages", ...). Writes in the services layer
+call invalidate(tag), which bumps the tag version so older entries are never
+read again (and age out via TTL/LRU). The backend is pluggable: anything with
+async get/set/incr (e.g. a Redis client wrapper) can replace InMemoryCache.
+Tag versions live in the cache_tag_versions table by default, so writes made
+by another process (a second API worker, generate_invoices.py) still
+invalidate this process's entries.
+
+Also holds the weak ETag helpers used for conditional GETs (If-None-Match).
+"""
+import functools
+import hashlib
+import importlib
+import inspect
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from datetime import date
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+from fastapi import Request, Response
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from api.config import settings
+from api.database import acquire, statements
+from api.metrics import REPORT_CACHE_REQUESTS
+
+
+# Shared tag versions (REPORT_CACHE_SHARED_TAGS): one query per read or invalidation
+_GET_TAG_VERSIONS = statements.register(
+    "cache.tag_versions",
+    "SELECT tag, version FROM cache_tag_versions WHERE tag = ANY($1::text[])"
+)
+_BUMP_TAG_VERSIONS = statements.register("cache.bump_tag_versions", """
+    INSERT INTO cache_tag_versions (tag, version)
+    SELECT tag, 1 FROM unnest($1::text[]) AS tag
+    ON CONFLICT (tag) DO UPDATE SET version = cache_tag_versions.version + 1
+""")
+
+
+class CacheBackend(ABC):
+    """Key/value store used by the report cache."""
+    
+    @abstractmethod
+    async def get(self, key: str) -> Optional[Any]:
+        """Return the value, or None if missing/expired."""
+    
+    @abstractmethod
+    async def set(self, key: str, value: Any, ttl: float) -> None:
+        """Store a value for ttl seconds."""
+    
+    @abstractmethod
+    async def incr(self, key: str) -> int:
+        """Atomically increase an integer (missing = 0) and return the new value."""
+    
+    async def get_int(self, key: str) -> int:
+        """Read an integer counter (0 if missing)."""
+        return int(await self.get(key) or 0)
+
+
+class InMemoryCache(CacheBackend):
+    """Process-local TTL + LRU cache."""
+    
+    def __init__(self, max_entries: int = 1024):
+        self.max_entries = max_entries
+        # key -> (expires_at, value)
+        self._entries: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+        # Tag versions never expire and do not count toward max_entries
+        self._counters: Dict[str, int] = {}
+    
+    async def get(self, key: str) -> Optional[Any]:
+        if key in self._counters:
+            return self._counters[key]
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return value
+    
+    async def set(self, key: str, value: Any, ttl: float) -> None:
+        self._entries[key] = (time.monotonic() + ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+    
+    async def incr(self, key: str) -> int:
+        self._counters[key] = self._counters.get(key, 0) + 1
+        return self._counters[key]
+    
+    def clear(self) -> None:
+        """Drop all entries (tag versions are kept)."""
+        self._entries.clear()
+
+
+def make_etag(*parts: Any) -> str:
+    """Weak ETag from whatever identifies a representation (row versions, parameters, body)."""
+    digest = hashlib.sha1("|".join(str(part) for part in parts).encode("utf-8")).hexdigest()
+    return f'W/"{digest[:20]}"'
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """True if If-None-Match contains the ETag (weak comparison) or is "*"."""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    opaque = etag.removeprefix("W/")
+    return any(tag.strip().removeprefix("W/") == opaque for tag in header.split(","))
+
+
+def not_modified(etag: str) -> Response:
+    """Empty 304 response carrying the current ETag."""
+    return Response(status_code=304, headers={"ETag": etag})
+
+
+def conditional(request: Request, response: Response, etag: Optional[str]) -> Optional[Response]:
+    """
+    Conditional GET for routes that know their version before loading data.
+    
+    Returns a 304 response when the client already has this version; otherwise
+    sets the ETag header and returns None so the route builds the body as usual.
+    A None etag (e.g. unknown id) skips the check.
+    """
+    if etag is None:
+        return None
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    response.headers["ETag"] = etag
+    return None
+
+
+def _create_backend() -> CacheBackend:
+    """Build the backend named by REPORT_CACHE_BACKEND ("memory" or "module:ClassName")."""
+    if settings.REPORT_CACHE_BACKEND == "memory":
+        return InMemoryCache(settings.REPORT_CACHE_MAX_ENTRIES)
+    module_name, _, class_name = settings.REPORT_CACHE_BACKEND.partition(":")
+    backend_class = getattr(importlib.import_module(module_name), class_name)
+    return backend_class()
+
+
+_backend: Optional[CacheBackend] = None
+
+
+def get_backend() -> CacheBackend:
+    """Get the report cache backend (created on first use)."""
+    global _backend
+    
+    if _backend is None:
+        _backend = _create_backend()
+    return _backend
+
+
+async def invalidate(*tags: str) -> None:
+    """
+    Invalidate every cached report depending on one of the tags.
+    
+    Call after the write is committed, so a concurrent read cannot re-cache
+    the old data under the new version.
+    """
+    if not settings.REPORT_CACHE_ENABLED:
+        return
+    if settings.REPORT_CACHE_SHARED_TAGS:
+        async with acquire() as conn:
+            await statements.execute(conn, _BUMP_TAG_VERSIONS, sorted(set(tags)))
+        return
+    backend = get_backend()
+    for tag in tags:
+        await backend.incr(f"tag:{tag}")
+
+
+async def _tag_versions(tags: Sequence[str]) -> List[int]:
+    """Current version of each tag (0 if never invalidated)."""
+    if settings.REPORT_CACHE_SHARED_TAGS:
+        # Same (replica) snapshot source as the reports themselves
+        async with acquire(readonly=True) as conn:
+            rows = await statements.fetch(conn, _GET_TAG_VERSIONS, list(tags))
+        found = {row["tag"]: row["version"] for row in rows}
+        return [found.get(tag, 0) for tag in tags]
+    backend = get_backend()
+    return [await backend.get_int(f"tag:{tag}") for tag in tags]
+
+
+def _ttl(params: Dict[str, Any]) -> float:
+    """Closed past months rarely change; current/future months and all-time reports do."""
+    month, year = params.get("month"), params.get("year")
+    if month and year:
+        today = date.today()
+        if (year, month) < (today.year, today.month):
+            return settings.REPORT_CACHE_TTL_PAST_MONTH
+    return settings.REPORT_CACHE_TTL_CURRENT
+
+
+def _render(value: Any) -> Tuple[str, bytes]:
+    """Serialize a report once; the ETag is a hash of the JSON body."""
+    body = JSONResponse(jsonable_encoder(value)).body
+    return make_etag(body), body
+
+
+def cached_report(name: str, tags: Sequence[str], bypass: Optional[str] = None):
+    """
+    Cache an async report handler by its keyword arguments.
+    
+    The serialized body is cached together with its ETag, so a hit returns the
+    stored bytes (or a 304 for a matching If-None-Match) without re-encoding.
+    
+    Args:
+        name: Report name (part of the key and metric label)
+        tags: Data the report depends on; invalidate(tag) drops its entries
+        bypass: Name of a bool parameter that skips the cache when true
+    
+    Usage:
+        @router.get("/reports/...")
+        @cached_report("building_finance", tags=("contracts", "usages"))
+        async def handler(month: int, year: int): ...
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        async def wrapper(cache_request: Request, **params):
+            if not settings.REPORT_CACHE_ENABLED or (bypass and params.get(bypass)):
+                etag, body = _render(await func(**params))
+            else:
+                backend = get_backend()
+                versions = [str(version) for version in await _tag_versions(tags)]
+                args = "&".join(f"{key}={params[key]}" for key in sorted(params))
+                key = f"report:{name}?{args}#{'.'.join(versions)}"
+                
+                cached = await backend.get(key)
+                if cached is not None:
+                    REPORT_CACHE_REQUESTS.inc(name, "hit")
+                    etag, body = cached
+                else:
+                    REPORT_CACHE_REQUESTS.inc(name, "miss")
+                    etag, body = _render(await func(**params))
+                    await backend.set(key, (etag, body), _ttl(params))
+            
+            if etag_matches(cache_request, etag):
+                return not_modified(etag)
+            return Response(body, media_type="application/json", headers={"ETag": etag})
+        
+        # FastAPI reads the handler's parameters from the signature; add the request
+        signature = inspect.signature(func)
+        request_param = inspect.Parameter("cache_request", inspect.Parameter.KEYWORD_ONLY, annotation=Request)
+        wrapper.__signature__ = signature.replace(parameters=[*signature.parameters.values(), request_param])
+        return wrapper
+    return decorator
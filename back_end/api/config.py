@@ -16,6 +16,48 @@ class Settings(BaseSettings):
     POSTGRES_PASSWORD: str
     POSTGRES_DB: str
     
+    # PostgreSQL read replica (optional; same user/password/database as the primary)
+    POSTGRES_REPLICA_HOST: Optional[str] = None
+    POSTGRES_REPLICA_PORT: Optional[int] = None
+    DB_REPLICA_MAX_LAG: float = 5.0               # seconds; above this reads go to the primary
+    DB_REPLICA_LAG_CHECK_INTERVAL: float = 2.0    # seconds between lag checks
+    
+    # Connection pool (size max_size to workers x expected concurrency per worker)
+    DB_POOL_MIN_SIZE: int = 5
+    DB_POOL_MAX_SIZE: int = 20
+    DB_POOL_MAX_INACTIVE_LIFETIME: float = 300.0   # seconds, 0 = never close idle connections
+    DB_POOL_ACQUIRE_TIMEOUT: Optional[float] = 10.0  # seconds to wait for a free connection
+    DB_STATEMENT_CACHE_SIZE: int = 100             # per connection, keep >= registered statements
+    DB_COMMAND_TIMEOUT: Optional[float] = 60.0     # default per-query timeout (seconds)
+    
+    # Slow query log (opt-in): JSON lines in a rotating file, sampled EXPLAIN (ANALYZE, BUFFERS)
+    SLOW_QUERY_LOG_ENABLED: bool = False
+    SLOW_QUERY_THRESHOLD_MS: float = 200.0
+    SLOW_QUERY_EXPLAIN_SAMPLE_RATE: float = 0.1   # 0..1, share of slow queries that get a plan
+    SLOW_QUERY_LOG_FILE: str = "logs/slow_queries.log"
+    SLOW_QUERY_LOG_MAX_BYTES: int = 10 * 1024 * 1024
+    SLOW_QUERY_LOG_BACKUP_COUNT: int = 5
+    
+    # Report response cache (api/cache.py); backend "memory" or "module:ClassName"
+    REPORT_CACHE_ENABLED: bool = True
+    REPORT_CACHE_BACKEND: str = "memory"
+    REPORT_CACHE_SHARED_TAGS: bool = True          # tag versions in cache_tag_versions (all processes)
+    REPORT_CACHE_MAX_ENTRIES: int = 1024
+    REPORT_CACHE_TTL_PAST_MONTH: float = 86400.0   # seconds, reports for closed months
+    REPORT_CACHE_TTL_CURRENT: float = 60.0         # seconds, current/future month and all-time
+    
+    # Bulk ingestion (POST /api/usages/*:bulk)
+    BULK_BATCH_SIZE: int = 5000     # rows validated and COPYed per batch
+    BULK_MAX_ERRORS: int = 1000     # per-row errors returned (all rejected rows are counted)
+    
+    # Month-close invoice job (POST /api/invoices/generate)
+    INVOICE_JOB_SHARDS: int = 16        # companies split by company_id % shards, one transaction each
+    INVOICE_JOB_CONCURRENCY: int = 4    # shards running at once (each holds a pool connection)
+    
+    # Usage table partitions (auto_test/script/maintain_partitions.py)
+    USAGE_PARTITIONS_AHEAD: int = 3     # monthly partitions kept ready after the current month
+    USAGE_RETENTION_MONTHS: int = 0     # months kept attached before archiving, 0 = keep all
+    
     # Backward compatibility
     DB_HOST: Optional[str] = None
     DB_PORT: Optional[int] = None
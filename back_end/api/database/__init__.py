@@ -1,5 +1,19 @@
 """Database package initialization."""
-from api.database.connection import create_pool, close_pool, get_pool
+from api.database.connection import create_pool, close_pool, get_pool, acquire, pool_stats
 from api.database.transaction import transaction
+from api.database import statements
+from api.database.statements import statement_stats
+from api.database.query_metrics import instrument_repository, query_caller
 
-__all__ = ["create_pool", "close_pool", "get_pool", "transaction"]
+__all__ = [
+    "create_pool",
+    "close_pool",
+    "get_pool",
+    "acquire",
+    "pool_stats",
+    "transaction",
+    "statements",
+    "statement_stats",
+    "instrument_repository",
+    "query_caller",
+]
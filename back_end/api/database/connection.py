@@ -1,52 +1,112 @@
 """
 Database connection module using asyncpg.
 Provides connection pool management for PostgreSQL.
+
+An optional read replica (POSTGRES_REPLICA_HOST) gets its own pool; read-only
+callers ask for it with get_pool(readonly=True) / acquire(readonly=True) and
+fall back to the primary while the replica lags or is unreachable.
 """
+import asyncio
+import time
 import asyncpg
-from typing import Optional
+from contextlib import asynccontextmanager
+from typing import Any, AsyncGenerator, Dict, List, Optional
 from api.config import settings
+from api.metrics import register_collector
+from api.database.statements import prepare_statements
+from api.database.query_metrics import InstrumentedConnection
+from api.database.pool_metrics import PoolMetrics, pool_metrics, replica_pool_metrics
 
 
-# Global connection pool
+# Global connection pools
 _pool: Optional[asyncpg.Pool] = None
+_replica_pool: Optional[asyncpg.Pool] = None
+
+# Replica health, refreshed at most every DB_REPLICA_LAG_CHECK_INTERVAL seconds
+_replica_state: Dict[str, Any] = {"healthy": False, "lag_seconds": None, "checked_at": 0.0, "fallbacks": 0}
+
+# Replication lag in seconds (0 when caught up or when the server is not a standby)
+REPLICA_LAG_QUERY = """
+    SELECT CASE
+        WHEN NOT pg_is_in_recovery() THEN 0
+        WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)
+    END
+"""
+
+
+async def _create(host: str, port: int) -> asyncpg.Pool:
+    """Create a pool with the shared Settings (sizing, cache, timeouts)."""
+    return await asyncpg.create_pool(
+        host=host,
+        port=port,
+        user=settings.POSTGRES_USER,
+        password=settings.POSTGRES_PASSWORD,
+        database=settings.POSTGRES_DB,
+        min_size=settings.DB_POOL_MIN_SIZE,
+        max_size=settings.DB_POOL_MAX_SIZE,
+        max_inactive_connection_lifetime=settings.DB_POOL_MAX_INACTIVE_LIFETIME,
+        statement_cache_size=settings.DB_STATEMENT_CACHE_SIZE,
+        command_timeout=settings.DB_COMMAND_TIMEOUT,
+        connection_class=InstrumentedConnection,
+        init=prepare_statements
+    )
 
 
 async def create_pool() -> asyncpg.Pool:
     """
     Create and return a connection pool.
     
+    Sizing, connection lifetime, statement cache and timeouts come from
+    Settings (DB_POOL_*, DB_STATEMENT_CACHE_SIZE, DB_COMMAND_TIMEOUT).
+    New connections prepare every registered statement (see statements.py).
+    The replica pool is created too when POSTGRES_REPLICA_HOST is set; if it
+    cannot be reached, reads stay on the primary.
+    
     Returns:
-        asyncpg.Pool: Database connection pool
+        asyncpg.Pool: Database connection pool (primary)
     """
-    global _pool
+    global _pool, _replica_pool
     
-    _pool = await asyncpg.create_pool(
-        host=settings.POSTGRES_HOST,
-        port=settings.POSTGRES_PORT,
-        user=settings.POSTGRES_USER,
-        password=settings.POSTGRES_PASSWORD,
-        database=settings.POSTGRES_DB,
-        min_size=5,
-        max_size=20,
-        command_timeout=60
-    )
+    _pool = await _create(settings.POSTGRES_HOST, settings.POSTGRES_PORT)
+    pool_metrics.reset()
+    
+    if settings.POSTGRES_REPLICA_HOST:
+        try:
+            _replica_pool = await _create(
+                settings.POSTGRES_REPLICA_HOST,
+                settings.POSTGRES_REPLICA_PORT or settings.POSTGRES_PORT
+            )
+        except (OSError, asyncpg.PostgresError) as e:
+            print(f"⚠️  Replica pool unavailable, reads use the primary: {e}")
+            _replica_pool = None
+        replica_pool_metrics.reset()
+        _replica_state.update(healthy=_replica_pool is not None, lag_seconds=None, checked_at=0.0, fallbacks=0)
     
     return _pool
 
 
 async def close_pool() -> None:
-    """Close the database connection pool."""
-    global _pool
+    """Close the database connection pools."""
+    global _pool, _replica_pool
+    
+    if _replica_pool:
+        await _replica_pool.close()
+        _replica_pool = None
     
     if _pool:
         await _pool.close()
         _pool = None
 
 
-def get_pool() -> asyncpg.Pool:
+def get_pool(readonly: bool = False) -> asyncpg.Pool:
     """
     Get the global connection pool.
     
+    Args:
+        readonly: Prefer the replica pool (falls back to the primary when no
+            replica is configured or it is lagging/unreachable)
+    
     Returns:
         asyncpg.Pool: Database connection pool
         
@@ -56,4 +116,153 @@ def get_pool() -> asyncpg.Pool:
     if _pool is None:
         raise RuntimeError("Database pool is not initialized. Call create_pool() first.")
     
+    if readonly and _replica_pool is not None and _replica_state["healthy"]:
+        return _replica_pool
+    
     return _pool
+
+
+async def _refresh_replica_state() -> None:
+    """Re-check replica lag if the last check is older than the interval."""
+    now = time.monotonic()
+    if now - _replica_state["checked_at"] < settings.DB_REPLICA_LAG_CHECK_INTERVAL:
+        return
+    _replica_state["checked_at"] = now
+    
+    try:
+        lag = await _replica_pool.fetchval(REPLICA_LAG_QUERY, timeout=settings.DB_POOL_ACQUIRE_TIMEOUT)
+        _replica_state["lag_seconds"] = float(lag)
+        _replica_state["healthy"] = float(lag) <= settings.DB_REPLICA_MAX_LAG
+    except (OSError, asyncio.TimeoutError, asyncpg.PostgresError, asyncpg.InterfaceError):
+        _replica_state["lag_seconds"] = None
+        _replica_state["healthy"] = False
+
+
+async def _acquire_from(pool: asyncpg.Pool, metrics: PoolMetrics) -> asyncpg.Connection:
+    """Acquire a connection, recording wait time or timeout."""
+    started = time.perf_counter()
+    try:
+        pooled = await pool.acquire(timeout=settings.DB_POOL_ACQUIRE_TIMEOUT)
+    except asyncio.TimeoutError:
+        metrics.record_timeout()
+        raise
+    metrics.observe_wait((time.perf_counter() - started) * 1000)
+    return pooled
+
+
+@asynccontextmanager
+async def acquire(
+    conn: Optional[asyncpg.Connection] = None,
+    readonly: bool = False
+) -> AsyncGenerator[asyncpg.Connection, None]:
+    """
+    Use the caller's connection, or acquire one from the pool.
+    
+    Repositories take an optional connection so a service can run several
+    calls on one connection (e.g. inside transaction()). Read-only callers
+    pass readonly=True to use the replica when it is healthy; a given
+    connection always wins, so reads inside a transaction stay on the primary.
+    
+    Usage:
+        async with acquire(conn) as conn:
+            await conn.fetchrow("SELECT ...")
+    
+    Yields:
+        asyncpg.Connection: The given connection or a pooled one
+    """
+    if conn is not None:
+        yield conn
+        return
+    
+    if readonly and _replica_pool is not None:
+        await _refresh_replica_state()
+    
+    pool = get_pool(readonly)
+    pooled = None
+    if pool is _replica_pool:
+        try:
+            pooled = await _acquire_from(pool, replica_pool_metrics)
+        except (OSError, asyncio.TimeoutError, asyncpg.PostgresError, asyncpg.InterfaceError):
+            # Replica down or saturated: serve this read from the primary
+            _replica_state["healthy"] = False
+            _replica_state["fallbacks"] += 1
+            pool = get_pool()
+    elif readonly and _replica_pool is not None:
+        _replica_state["fallbacks"] += 1
+    
+    if pooled is None:
+        pooled = await _acquire_from(pool, pool_metrics)
+    
+    try:
+        yield pooled
+    finally:
+        await pool.release(pooled)
+
+
+def pool_stats() -> Dict[str, Any]:
+    """
+    Runtime view of the pool: in-use/idle connections, acquire wait
+    histogram, acquire timeouts and the configured limits. The replica
+    section (None without a replica) adds its lag and fallback count.
+    
+    Returns:
+        dict: Pool statistics (zeros if the pool is not initialized)
+    """
+    replica = None
+    if _replica_pool is not None:
+        replica = {
+            **replica_pool_metrics.snapshot(_replica_pool),
+            "healthy": _replica_state["healthy"],
+            "lag_seconds": _replica_state["lag_seconds"],
+            "max_lag_seconds": settings.DB_REPLICA_MAX_LAG,
+            "fallbacks": _replica_state["fallbacks"]
+        }
+    
+    return {
+        **pool_metrics.snapshot(_pool),
+        "config": {
+            "max_inactive_connection_lifetime": settings.DB_POOL_MAX_INACTIVE_LIFETIME,
+            "statement_cache_size": settings.DB_STATEMENT_CACHE_SIZE,
+            "command_timeout": settings.DB_COMMAND_TIMEOUT,
+            "acquire_timeout": settings.DB_POOL_ACQUIRE_TIMEOUT
+        },
+        "replica": replica
+    }
+
+
+def _render_pool_metrics() -> List[str]:
+    """Pool gauges and acquire wait histogram for /metrics."""
+    pools = [("primary", _pool, pool_metrics)]
+    if _replica_pool is not None:
+        pools.append(("replica", _replica_pool, replica_pool_metrics))
+    
+    lines = [
+        "# HELP db_pool_connections Pool connections by state",
+        "# TYPE db_pool_connections gauge"
+    ]
+    for name, pool, metrics in pools:
+        snapshot = metrics.snapshot(pool)
+        lines.append(f'db_pool_connections{{pool="{name}",state="in_use"}} {snapshot["in_use"]}')
+        lines.append(f'db_pool_connections{{pool="{name}",state="idle"}} {snapshot["idle"]}')
+    
+    lines += [
+        "# HELP db_pool_acquire_wait_seconds Time spent waiting for a pooled connection",
+        "# TYPE db_pool_acquire_wait_seconds histogram"
+    ]
+    for name, pool, metrics in pools:
+        for bound_ms, count in metrics.histogram().items():
+            le = bound_ms if bound_ms == "+Inf" else str(float(bound_ms) / 1000)
+            lines.append(f'db_pool_acquire_wait_seconds_bucket{{pool="{name}",le="{le}"}} {count}')
+        lines.append(f'db_pool_acquire_wait_seconds_sum{{pool="{name}"}} {metrics.wait_sum_ms / 1000}')
+        lines.append(f'db_pool_acquire_wait_seconds_count{{pool="{name}"}} {metrics.acquires}')
+    
+    lines += [
+        "# HELP db_pool_acquire_timeouts_total Acquires that hit DB_POOL_ACQUIRE_TIMEOUT",
+        "# TYPE db_pool_acquire_timeouts_total counter"
+    ]
+    for name, pool, metrics in pools:
+        lines.append(f'db_pool_acquire_timeouts_total{{pool="{name}"}} {metrics.timeouts}')
+    return lines
+
+
+register_collector(_render_pool_metrics)
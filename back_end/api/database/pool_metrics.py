@@ -0,0 +1,79 @@
+"""
+Connection pool metrics.
+Records acquire wait times (histogram) and acquire timeouts for the global pool.
+"""
+from typing import Any, Dict, List, Optional
+import asyncpg
+
+
+# Upper bounds (ms) of the acquire wait histogram buckets
+WAIT_BUCKETS_MS: List[float] = [1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000]
+
+
+class PoolMetrics:
+    """Acquire wait histogram and timeout counter."""
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self) -> None:
+        """Clear all counters (e.g. when a new pool is created)."""
+        self.bucket_counts = [0] * (len(WAIT_BUCKETS_MS) + 1)  # last one is +Inf
+        self.acquires = 0
+        self.wait_sum_ms = 0.0
+        self.wait_max_ms = 0.0
+        self.timeouts = 0
+
+    def observe_wait(self, wait_ms: float) -> None:
+        """Record one successful acquire and how long it waited."""
+        self.acquires += 1
+        self.wait_sum_ms += wait_ms
+        self.wait_max_ms = max(self.wait_max_ms, wait_ms)
+        for i, bound in enumerate(WAIT_BUCKETS_MS):
+            if wait_ms <= bound:
+                self.bucket_counts[i] += 1
+                return
+        self.bucket_counts[-1] += 1
+
+    def record_timeout(self) -> None:
+        """Record an acquire that gave up after the acquire timeout."""
+        self.timeouts += 1
+
+    def histogram(self) -> Dict[str, int]:
+        """Cumulative bucket counts keyed by upper bound in ms ("+Inf" last)."""
+        result = {}
+        total = 0
+        for bound, count in zip(WAIT_BUCKETS_MS + ["+Inf"], self.bucket_counts):
+            total += count
+            result[str(bound)] = total
+        return result
+
+    def snapshot(self, pool: Optional[asyncpg.Pool]) -> Dict[str, Any]:
+        """
+        Current pool usage plus acquire metrics.
+
+        Returns:
+            dict: size, min/max size, in_use, idle, acquire stats, timeouts
+        """
+        size = pool.get_size() if pool else 0
+        idle = pool.get_idle_size() if pool else 0
+        return {
+            "size": size,
+            "min_size": pool.get_min_size() if pool else 0,
+            "max_size": pool.get_max_size() if pool else 0,
+            "in_use": size - idle,
+            "idle": idle,
+            "acquires": self.acquires,
+            "acquire_wait_ms": {
+                "avg": round(self.wait_sum_ms / self.acquires, 3) if self.acquires else 0.0,
+                "max": round(self.wait_max_ms, 3),
+                "sum": round(self.wait_sum_ms, 3),
+                "buckets": self.histogram()
+            },
+            "acquire_timeouts": self.timeouts
+        }
+
+
+# Global metrics for the application pools
+pool_metrics = PoolMetrics()
+replica_pool_metrics = PoolMetrics()
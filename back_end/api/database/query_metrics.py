@@ -0,0 +1,83 @@
+"""
+SQL metrics module.
+Times conn.fetch/fetchrow/fetchval and attributes them to the calling
+repository method (or the route, for inline report SQL). execute() is left
+alone: asyncpg uses it internally for BEGIN/COMMIT and the pool reset query.
+Every call, failed ones included, is also passed to the slow query log
+(slow_query_log.py).
+"""
+import functools
+import inspect
+import time
+from contextvars import ContextVar
+from typing import Any, List
+from api.database.statements import StatementConnection
+from api.metrics import QUERY_LATENCY, QUERY_ROWS, QUERY_ERRORS
+from api.database.slow_query_log import record_query
+
+
+# Who is running SQL right now: "OfficeRepository.get_by_id", "GET /api/reports/...", ...
+query_caller: ContextVar[str] = ContextVar("query_caller", default="unknown")
+
+
+def _row_count(operation: str, result: Any) -> int:
+    """Rows returned by a fetch* call."""
+    if operation == "fetch":
+        return len(result)
+    return 1 if result is not None else 0
+
+
+class InstrumentedConnection(StatementConnection):
+    """Connection that records latency, row counts and errors per caller."""
+    
+    async def _timed(self, operation: str, call, query: str, *args, **kwargs) -> Any:
+        caller = query_caller.get()
+        started = time.perf_counter()
+        error = None
+        try:
+            result = await call(query, *args, **kwargs)
+        except Exception as e:
+            error = type(e).__name__
+            QUERY_ERRORS.inc(caller, error)
+            raise
+        finally:
+            elapsed = time.perf_counter() - started
+            QUERY_LATENCY.observe(elapsed, caller, operation)
+            record_query(query, args, elapsed * 1000, caller, error)
+        QUERY_ROWS.inc(caller, amount=_row_count(operation, result))
+        return result
+    
+    async def fetch(self, query, *args, **kwargs) -> List[Any]:
+        return await self._timed("fetch", super().fetch, query, *args, **kwargs)
+    
+    async def fetchrow(self, query, *args, **kwargs) -> Any:
+        return await self._timed("fetchrow", super().fetchrow, query, *args, **kwargs)
+    
+    async def fetchval(self, query, *args, **kwargs) -> Any:
+        return await self._timed("fetchval", super().fetchval, query, *args, **kwargs)
+
+
+def instrument_repository(cls):
+    """
+    Class decorator: run every public coroutine method with query_caller set
+    to "ClassName.method", so its SQL is labelled in /metrics.
+    
+    Async generators (streaming) are left as is; their cursor reads are not timed.
+    """
+    for name, method in list(vars(cls).items()):
+        if name.startswith("_") or not inspect.iscoroutinefunction(method):
+            continue
+        setattr(cls, name, _with_caller(f"{cls.__name__}.{name}", method))
+    return cls
+
+
+def _with_caller(caller: str, method):
+    """Wrap a coroutine method so SQL inside it is attributed to `caller`."""
+    @functools.wraps(method)
+    async def wrapper(*args, **kwargs):
+        token = query_caller.set(caller)
+        try:
+            return await method(*args, **kwargs)
+        finally:
+            query_caller.reset(token)
+    return wrapper
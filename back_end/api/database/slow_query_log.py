@@ -0,0 +1,138 @@
+"""
+Slow query log.
+Opt-in (SLOW_QUERY_LOG_ENABLED): queries slower than SLOW_QUERY_THRESHOLD_MS are
+written as JSON lines to a rotating file with their SQL, parameter types,
+duration and caller. A sample of them also gets EXPLAIN (ANALYZE, BUFFERS).
+"""
+import asyncio
+import json
+import logging
+import os
+import random
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from logging.handlers import RotatingFileHandler
+from typing import Any, Dict, List, Optional, Sequence, Set
+from api.config import settings
+
+
+# Set while capturing a plan, so EXPLAIN itself is never logged
+_explaining: ContextVar[bool] = ContextVar("slow_query_explaining", default=False)
+
+# Keep references to running EXPLAIN tasks
+_explain_tasks: Set[asyncio.Task] = set()
+
+_logger: Optional[logging.Logger] = None
+
+
+def _get_logger() -> logging.Logger:
+    """Logger writing to the rotating slow query file (created on first use)."""
+    global _logger
+    
+    if _logger is None:
+        directory = os.path.dirname(settings.SLOW_QUERY_LOG_FILE)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        handler = RotatingFileHandler(
+            settings.SLOW_QUERY_LOG_FILE,
+            maxBytes=settings.SLOW_QUERY_LOG_MAX_BYTES,
+            backupCount=settings.SLOW_QUERY_LOG_BACKUP_COUNT,
+            encoding="utf-8"
+        )
+        handler.setFormatter(logging.Formatter("%(message)s"))
+        _logger = logging.getLogger("api.slow_queries")
+        _logger.setLevel(logging.INFO)
+        _logger.propagate = False
+        _logger.addHandler(handler)
+    
+    return _logger
+
+
+def param_shapes(args: Sequence[Any]) -> List[str]:
+    """Parameter types without values, e.g. ["int", "date", "list[3]"]."""
+    shapes = []
+    for arg in args:
+        if isinstance(arg, (list, tuple)):
+            shapes.append(f"{type(arg).__name__}[{len(arg)}]")
+        else:
+            shapes.append(type(arg).__name__)
+    return shapes
+
+
+def _is_read_only(sql: str) -> bool:
+    """Only plain reads are re-executed by EXPLAIN ANALYZE."""
+    head = sql.lstrip().split(None, 1)[0].upper() if sql.strip() else ""
+    return head in ("SELECT", "WITH")
+
+
+def _write(record: Dict[str, Any]) -> None:
+    """Append one JSON line to the slow query file."""
+    _get_logger().info(json.dumps(record, ensure_ascii=False, default=str))
+
+
+async def _explain_and_write(record: Dict[str, Any], sql: str, args: Sequence[Any]) -> None:
+    """
+    Capture the plan on a separate pooled connection, then write the record.
+    
+    Reads run EXPLAIN (ANALYZE, BUFFERS) inside a READ ONLY transaction on the
+    replica when it is healthy; writes and failed queries only get a plain
+    EXPLAIN (not executed). The EXPLAIN is prepared as the unnamed statement
+    (name=""): it bypasses the statement cache, so one-off plans neither evict
+    the pool's cached statements nor stay behind as named server-side statements.
+    """
+    from api.database.connection import acquire
+    from api.database.query_metrics import query_caller
+    
+    _explaining.set(True)
+    query_caller.set("SlowQueryLog.explain")
+    analyze = _is_read_only(sql) and "error" not in record
+    try:
+        async with acquire(readonly=_is_read_only(sql)) as conn:
+            if analyze:
+                async with conn.transaction(readonly=True):
+                    stmt = await conn.prepare(f"EXPLAIN (ANALYZE, BUFFERS) {sql}", name="")
+                    rows = await stmt.fetch(*args)
+            else:
+                stmt = await conn.prepare(f"EXPLAIN {sql}", name="")
+                rows = await stmt.fetch(*args)
+        record["explain"] = "\n".join(row[0] for row in rows)
+    except Exception as e:
+        record["explain_error"] = f"{type(e).__name__}: {e}"
+    _write(record)
+
+
+def record_query(
+    sql: str,
+    args: Sequence[Any],
+    duration_ms: float,
+    caller: str,
+    error: Optional[str] = None
+) -> None:
+    """
+    Log the query if the slow query log is enabled and it exceeded the threshold.
+    
+    Called by InstrumentedConnection after every fetch/fetchrow/fetchval,
+    including failed ones (e.g. a statement timeout), with the exception name.
+    """
+    if not settings.SLOW_QUERY_LOG_ENABLED or _explaining.get():
+        return
+    if duration_ms < settings.SLOW_QUERY_THRESHOLD_MS:
+        return
+    
+    record = {
+        "ts": datetime.now(timezone.utc).isoformat(),
+        "caller": caller,
+        "duration_ms": round(duration_ms, 3),
+        "sql": " ".join(sql.split()),
+        "param_types": param_shapes(args)
+    }
+    if error is not None:
+        record["error"] = error
+    
+    if random.random() < settings.SLOW_QUERY_EXPLAIN_SAMPLE_RATE:
+        # Off the request path: the plan is captured in the background
+        task = asyncio.get_running_loop().create_task(_explain_and_write(record, sql, args))
+        _explain_tasks.add(task)
+        task.add_done_callback(_explain_tasks.discard)
+    else:
+        _write(record)
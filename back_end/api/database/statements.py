@@ -0,0 +1,161 @@
+"""
+Prepared statement registry.
+
+Repositories declare their hot queries once with register(). Every pooled
+connection prepares all registered queries on init into asyncpg's
+per-connection statement cache (keyed by SQL text), so CRUD calls skip
+parse/plan on the server. Query texts are fixed (canonical UPDATE shapes),
+so the cache is never churned by per-call variants.
+"""
+import re
+import asyncpg
+from typing import Any, Dict, List, Optional
+from api.metrics import register_collector
+
+
+# Warming and inspecting the statement cache use asyncpg internals
+# (Connection._get_statement, _stmt_cache); the public prepare() does not fill
+# that cache. Only enabled on the asyncpg versions they were checked against;
+# elsewhere asyncpg caches each statement on its first run instead.
+_ASYNCPG_VERSION = tuple(int(part) for part in re.findall(r"\d+", asyncpg.__version__)[:2])
+CACHE_INTERNALS_SUPPORTED = (0, 27) <= _ASYNCPG_VERSION <= (0, 32) and all(
+    hasattr(asyncpg.Connection, attr) for attr in ("_get_statement", "_check_open")
+)
+
+
+# name -> SQL text
+_registry: Dict[str, str] = {}
+
+# Cache counters across all connections
+_stats = {"prepared_on_init": 0, "hits": 0, "misses": 0}
+
+
+def register(name: str, sql: str) -> str:
+    """
+    Declare a query once (at import time of the repository module).
+
+    Args:
+        name: Unique statement name, e.g. "offices.get_by_id"
+        sql: Query text
+
+    Returns:
+        str: The statement name, used with fetch()/fetchrow()/fetchval()
+
+    Raises:
+        ValueError: If the name is already registered with a different query
+    """
+    if _registry.get(name, sql) != sql:
+        raise ValueError(f"Statement '{name}' is already registered with a different query")
+    _registry[name] = sql
+    return name
+
+
+def update_statement(table: str, key: str, columns: List[str], returning: str = "*") -> str:
+    """
+    Build the canonical UPDATE for a table: one SQL text for any column subset.
+
+    Every column is written as COALESCE($n, column), so a None value keeps the
+    current value (same semantics as skipping it in a dynamic SET list).
+    Parameters follow `columns`, the key comes last.
+    """
+    set_clauses = ",\n                ".join(
+        f"{column} = COALESCE(${i}, {column})" for i, column in enumerate(columns, start=1)
+    )
+    return f"""
+            UPDATE {table}
+            SET {set_clauses}
+            WHERE {key} = ${len(columns) + 1}
+            RETURNING {returning}
+        """
+
+
+class StatementConnection(asyncpg.Connection):
+    """Connection that can warm and inspect its own statement cache."""
+
+    async def prepare_cached(self, sql: str) -> None:
+        """Parse/plan `sql` on the server and keep it in the statement cache."""
+        await self._get_statement(sql, None, named=True, use_cache=True)
+
+    def is_cached(self, sql: str) -> Optional[bool]:
+        """True if `sql` is in the statement cache (no parse on next run); None if unknown."""
+        if not CACHE_INTERNALS_SUPPORTED:
+            return None
+        # Same key asyncpg uses for conn.fetch*() with the default record class
+        return self._stmt_cache.has((sql, self._protocol.get_record_class(), False))
+
+
+async def prepare_statements(conn: asyncpg.Connection) -> None:
+    """Pool init callback: prepare every registered query on a new connection."""
+    if not isinstance(conn, StatementConnection) or not CACHE_INTERNALS_SUPPORTED:
+        return
+
+    for sql in _registry.values():
+        await conn.prepare_cached(sql)
+        _stats["prepared_on_init"] += 1
+
+    # asyncpg ends Parse/Describe with Flush, not Sync, so the connection is
+    # left in an implicit transaction holding locks on every table it parsed.
+    # A simple query ends it; otherwise an idle pool blocks DDL and migrations.
+    await conn.execute("SELECT 1")
+
+
+def _sql(conn: asyncpg.Connection, name: str) -> str:
+    """Resolve a statement name and count a cache hit or miss (when the cache can be inspected)."""
+    sql = _registry[name]
+    is_cached = getattr(conn, "is_cached", None)
+    cached = is_cached(sql) if is_cached is not None else False
+    if cached is True:
+        _stats["hits"] += 1
+    elif cached is False:
+        _stats["misses"] += 1
+    return sql
+
+
+async def fetch(conn: asyncpg.Connection, name: str, *args) -> List[asyncpg.Record]:
+    """Run a registered statement and return all rows."""
+    return await conn.fetch(_sql(conn, name), *args)
+
+
+async def fetchrow(conn: asyncpg.Connection, name: str, *args) -> Optional[asyncpg.Record]:
+    """Run a registered statement and return the first row."""
+    return await conn.fetchrow(_sql(conn, name), *args)
+
+
+async def fetchval(conn: asyncpg.Connection, name: str, *args) -> Any:
+    """Run a registered statement and return the first column of the first row."""
+    return await conn.fetchval(_sql(conn, name), *args)
+
+
+async def execute(conn: asyncpg.Connection, name: str, *args) -> str:
+    """Run a registered statement and return its command status (e.g. "UPDATE 42")."""
+    return await conn.execute(_sql(conn, name), *args)
+
+
+def statement_stats() -> Dict[str, Any]:
+    """
+    Statement cache counters.
+
+    Returns:
+        dict: registered, warm_on_init (asyncpg version supported), prepared_on_init,
+            hits, misses, hit_ratio
+    """
+    lookups = _stats["hits"] + _stats["misses"]
+    return {
+        "registered": len(_registry),
+        "warm_on_init": CACHE_INTERNALS_SUPPORTED,
+        **_stats,
+        "hit_ratio": round(_stats["hits"] / lookups, 4) if lookups else None
+    }
+
+
+def _render_statement_metrics() -> List[str]:
+    """Statement cache counters for /metrics."""
+    return [
+        "# HELP db_statement_cache_lookups_total Registered statement lookups by result",
+        "# TYPE db_statement_cache_lookups_total counter",
+        f'db_statement_cache_lookups_total{{result="hit"}} {_stats["hits"]}',
+        f'db_statement_cache_lookups_total{{result="miss"}} {_stats["misses"]}'
+    ]
+
+
+register_collector(_render_statement_metrics)
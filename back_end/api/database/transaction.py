@@ -5,7 +5,7 @@ Provides context manager for database transactions.
 from contextlib import asynccontextmanager
 from typing import AsyncGenerator
 import asyncpg
-from api.database.connection import get_pool
+from api.database.connection import acquire
 
 
 @asynccontextmanager
@@ -21,7 +21,6 @@ async def transaction() -> AsyncGenerator[asyncpg.Connection, None]:
     Yields:
         asyncpg.Connection: Database connection with active transaction
     """
-    pool = get_pool()
-    async with pool.acquire() as conn:
+    async with acquire() as conn:
         async with conn.transaction():
             yield conn
@@ -2,19 +2,51 @@
 Main FastAPI application.
 Entry point for the Office Building Management System API.
 """
-from fastapi import FastAPI
+import time
+from fastapi import Depends, FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse
 from contextlib import asynccontextmanager
-from api.database import create_pool, close_pool
+from api.database import create_pool, close_pool, query_caller
+from api.metrics import REQUEST_LATENCY, render_metrics
+from api.repositories.loaders import start_request_loaders
 from api.routes import (
     office_routes,
     company_routes,
     rent_contract_routes,
     building_employee_routes,
-    report_routes
+    report_routes,
+    usage_routes,
+    invoice_routes,
+    internal_routes
 )
 
 
+def _route_template(request: Request) -> str:
+    """Matched route as "/api/offices/{office_id}" to keep metric label cardinality bounded."""
+    route = request.scope.get("route")
+    if route is None:
+        return "unmatched"
+    
+    # Included routers may report their path without the include prefix ("/api")
+    template = route.path_format
+    concrete = template.format(**request.scope.get("path_params", {}))
+    path = request.scope["path"]
+    if path.endswith(concrete):
+        return path[:len(path) - len(concrete)] + template
+    return template
+
+
+async def label_route_queries(request: Request):
+    """Attribute SQL run outside repositories (inline report queries) to the route."""
+    query_caller.set(f"{request.method} {_route_template(request)}")
+
+
+async def request_loaders():
+    """Fresh DataLoaders per request (batched, deduplicated get_by_id lookups)."""
+    start_request_loaders()
+
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Lifespan context manager for startup and shutdown events."""
@@ -34,7 +66,8 @@ app = FastAPI(
     title="Office Building Management System",
     description="API for managing office building, companies, contracts, and services",
     version="1.0.0",
-    lifespan=lifespan
+    lifespan=lifespan,
+    dependencies=[Depends(label_route_queries), Depends(request_loaders)]
 )
 
 # Configure CORS
@@ -44,9 +77,23 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "ETag"],
 )
 
 
+@app.middleware("http")
+async def record_request_metrics(request: Request, call_next):
+    """Request latency histogram by route template."""
+    started = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        REQUEST_LATENCY.observe(time.perf_counter() - started, request.method, _route_template(request), str(status))
+
+
 # Health check endpoint
 @app.get("/", tags=["Health"])
 async def root():
@@ -64,12 +111,21 @@ async def health_check():
     return {"status": "healthy"}
 
 
+@app.get("/metrics", tags=["Health"], response_class=PlainTextResponse)
+async def metrics():
+    """Prometheus metrics: request latency, SQL timing/rows/errors, pool and statement cache."""
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
+
+
 # Include routers
 app.include_router(office_routes.router, prefix="/api")
 app.include_router(company_routes.router, prefix="/api")
 app.include_router(rent_contract_routes.router, prefix="/api")
 app.include_router(building_employee_routes.router, prefix="/api")
 app.include_router(report_routes.router, prefix="/api")
+app.include_router(usage_routes.router, prefix="/api")
+app.include_router(invoice_routes.router, prefix="/api")
+app.include_router(internal_routes.router, prefix="/api")
 
 
 if __name__ == "__main__":
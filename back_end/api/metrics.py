@@ -0,0 +1,124 @@
+"""
+Metrics module.
+Minimal Prometheus text-format metrics (counters, histograms) kept in process.
+"""
+from typing import Callable, Dict, List, Sequence, Tuple
+
+
+# Default latency buckets (seconds)
+LATENCY_BUCKETS: List[float] = [0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10]
+
+
+def _escape(value: str) -> str:
+    """Escape a label value for the text exposition format."""
+    return str(value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+def _labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    """Render {name="value",...}; empty string when there are no labels."""
+    parts = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+class Counter:
+    """Monotonic counter with labels."""
+    
+    def __init__(self, name: str, help_text: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = tuple(labels)
+        self.values: Dict[Tuple[str, ...], float] = {}
+    
+    def inc(self, *label_values: str, amount: float = 1) -> None:
+        """Increase the counter for the given label values."""
+        self.values[label_values] = self.values.get(label_values, 0) + amount
+    
+    def render(self) -> List[str]:
+        """Text exposition lines."""
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} counter"]
+        for label_values, value in sorted(self.values.items()):
+            lines.append(f"{self.name}{_labels(self.label_names, label_values)} {value}")
+        return lines
+
+
+class Histogram:
+    """Histogram with cumulative buckets and labels."""
+    
+    def __init__(
+        self,
+        name: str,
+        help_text: str,
+        labels: Sequence[str] = (),
+        buckets: Sequence[float] = LATENCY_BUCKETS
+    ):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = tuple(labels)
+        self.buckets = list(buckets)
+        # label values -> (per-bucket counts incl. +Inf, sum, count)
+        self.series: Dict[Tuple[str, ...], list] = {}
+    
+    def observe(self, value: float, *label_values: str) -> None:
+        """Record one observation."""
+        series = self.series.setdefault(label_values, [[0] * (len(self.buckets) + 1), 0.0, 0])
+        index = next((i for i, bound in enumerate(self.buckets) if value <= bound), len(self.buckets))
+        series[0][index] += 1
+        series[1] += value
+        series[2] += 1
+    
+    def render(self) -> List[str]:
+        """Text exposition lines."""
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        for label_values, (counts, total, count) in sorted(self.series.items()):
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + ["+Inf"], counts):
+                cumulative += bucket_count
+                le = f'le="{bound}"'
+                lines.append(f"{self.name}_bucket{_labels(self.label_names, label_values, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.label_names, label_values)} {total}")
+            lines.append(f"{self.name}_count{_labels(self.label_names, label_values)} {count}")
+        return lines
+
+
+# HTTP
+REQUEST_LATENCY = Histogram(
+    "http_request_duration_seconds",
+    "HTTP request latency by route template",
+    labels=("method", "route", "status")
+)
+
+# SQL (caller = repository method, or the route for inline report SQL)
+QUERY_LATENCY = Histogram(
+    "db_query_duration_seconds",
+    "SQL execution time by caller",
+    labels=("caller", "operation")
+)
+QUERY_ROWS = Counter("db_query_rows_total", "Rows returned by caller", labels=("caller",))
+QUERY_ERRORS = Counter("db_query_errors_total", "Failed SQL calls by caller", labels=("caller", "error"))
+
+# Report cache (api/cache.py)
+REPORT_CACHE_REQUESTS = Counter(
+    "report_cache_requests_total",
+    "Report cache lookups by report and result",
+    labels=("report", "result")
+)
+
+# Extra collectors (e.g. pool gauges) rendered on each scrape
+_collectors: List[Callable[[], List[str]]] = []
+
+
+def register_collector(collector: Callable[[], List[str]]) -> None:
+    """Add a function returning exposition lines computed at scrape time."""
+    _collectors.append(collector)
+
+
+def render_metrics() -> str:
+    """Render every metric in Prometheus text format."""
+    lines: List[str] = []
+    for metric in (REQUEST_LATENCY, QUERY_LATENCY, QUERY_ROWS, QUERY_ERRORS, REPORT_CACHE_REQUESTS):
+        lines.extend(metric.render())
+    for collector in _collectors:
+        lines.extend(collector())
+    return "\n".join(lines) + "\n"
@@ -12,7 +12,7 @@ class CompanyMonthlyUsageBase(BaseModel):
     company_id: int = Field(..., description="ID công ty")
     service_id: int = Field(..., description="ID dịch vụ")
     invoice_id: Optional[int] = Field(None, description="ID hóa đơn")
-    from_date: Optional[date] = Field(None, description="Từ ngày")
+    from_date: date = Field(..., description="Từ ngày (xác định tháng của usage)")
     to_date: Optional[date] = Field(None, description="Đến ngày")
     quantity: Optional[int] = Field(None, description="Số lượng nhân viên hoặc m2 làm căn cứ tính")
     price: Optional[Decimal] = Field(None, description="Thành tiền tháng đó")
@@ -9,6 +9,7 @@ from datetime import date
 
 class InvoiceBase(BaseModel):
     """Base schema for Invoice."""
+    company_id: Optional[int] = Field(None, description="Công ty (hóa đơn tháng)")
     created_date: Optional[date] = None
     pay_day: Optional[date] = Field(None, description="Ngày thanh toán")
     from_date: Optional[date] = Field(None, description="Kỳ thanh toán từ ngày")
@@ -16,6 +17,9 @@ class InvoiceBase(BaseModel):
     total_amount: Optional[Decimal] = Field(None, description="Tổng tiền")
     status: Optional[str] = Field("unpaid", max_length=20, description="paid, unpaid, overdue")
     note: Optional[str] = None
+    rent_amount: Optional[Decimal] = Field(None, description="Tiền thuê")
+    monthly_service_amount: Optional[Decimal] = Field(None, description="Dịch vụ theo tháng")
+    daily_service_amount: Optional[Decimal] = Field(None, description="Dịch vụ theo ngày")
 
 
 class InvoiceCreate(InvoiceBase):
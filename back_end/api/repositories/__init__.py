@@ -3,10 +3,19 @@ from api.repositories.office_repository import OfficeRepository
 from api.repositories.company_repository import CompanyRepository
 from api.repositories.rent_contract_repository import RentContractRepository
 from api.repositories.building_employee_repository import BuildingEmployeeRepository
+from api.repositories.usage_repository import UsageRepository
+from api.repositories.payroll_repository import PayrollRepository
+from api.repositories.invoice_repository import InvoiceRepository
+from api.repositories.loaders import DataLoader, get_loaders
 
 __all__ = [
     "OfficeRepository",
     "CompanyRepository",
     "RentContractRepository",
     "BuildingEmployeeRepository",
+    "UsageRepository",
+    "PayrollRepository",
+    "InvoiceRepository",
+    "DataLoader",
+    "get_loaders",
 ]
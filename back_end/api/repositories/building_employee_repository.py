@@ -3,25 +3,69 @@ Repository for BuildingEmployee entity.
 All database operations use raw SQL with asyncpg.
 """
 from typing import List, Optional, Dict, Any
-from api.database import get_pool
+import asyncpg
+from api.database import acquire, statements, instrument_repository
 
 
+# Hot CRUD queries, prepared once per pooled connection
+_CREATE = statements.register("building_employees.create", """
+    INSERT INTO building_employees 
+        (first_name, last_name, phone_number, role, email, address, 
+         date_of_birth, base_salary, hire_date, status)
+    VALUES ($1, $2, $3, $4, $5, $6, $7, $8, $9, $10)
+    RETURNING employee_id, first_name, last_name, phone_number, role, 
+              email, address, date_of_birth, base_salary, hire_date, status
+""")
+_GET_BY_ID = statements.register(
+    "building_employees.get_by_id",
+    "SELECT * FROM building_employees WHERE employee_id = $1"
+)
+_GET_BY_IDS = statements.register(
+    "building_employees.get_by_ids",
+    "SELECT * FROM building_employees WHERE employee_id = ANY($1::int[])"
+)
+_LIST_OFFSET = statements.register(
+    "building_employees.list_offset",
+    "SELECT * FROM building_employees ORDER BY employee_id LIMIT $1 OFFSET $2"
+)
+_LIST_AFTER = statements.register(
+    "building_employees.list_after",
+    "SELECT * FROM building_employees WHERE employee_id > $2 ORDER BY employee_id LIMIT $1"
+)
+_UPDATE_COLUMNS = [
+    "first_name", "last_name", "phone_number", "role", "email", "address",
+    "date_of_birth", "base_salary", "hire_date", "status"
+]
+_UPDATE = statements.register("building_employees.update", statements.update_statement(
+    "building_employees", "employee_id", _UPDATE_COLUMNS
+))
+_DELETE = statements.register(
+    "building_employees.delete",
+    "DELETE FROM building_employees WHERE employee_id = $1 RETURNING employee_id"
+)
+
+# Versions for ETags: updated_at (trigger-maintained) per row; per table, the
+# table_versions counter bumped by a statement trigger on every committed write
+_VERSION = statements.register(
+    "building_employees.version",
+    "SELECT updated_at::text FROM building_employees WHERE employee_id = $1"
+)
+_LIST_VERSION = statements.register(
+    "building_employees.list_version",
+    "SELECT version::text FROM table_versions WHERE table_name = 'building_employees'"
+)
+
+
+@instrument_repository
 class BuildingEmployeeRepository:
     """Repository for BuildingEmployee CRUD operations."""
     
-    async def create(self, employee_data: Dict[str, Any]) -> Dict[str, Any]:
+    async def create(self, employee_data: Dict[str, Any], conn: Optional[asyncpg.Connection] = None) -> Dict[str, Any]:
         """Create a new building employee."""
-        query = """
-            INSERT INTO building_employees 
-                (first_name, last_name, phone_number, role, email, address, 
-                 date_of_birth, base_salary, hire_date, status)
-            VALUES ($1, $2, $3, $4, $5, $6, $7, $8, $9, $10)
-            RETURNING employee_id, first_name, last_name, phone_number, role, 
-                      email, address, date_of_birth, base_salary, hire_date, status
-        """
-        async with get_pool().acquire() as conn:
-            row = await conn.fetchrow(
-                query,
+        async with acquire(conn) as conn:
+            row = await statements.fetchrow(
+                conn,
+                _CREATE,
                 employee_data.get("first_name"),
                 employee_data.get("last_name"),
                 employee_data.get("phone_number"),
@@ -35,82 +79,70 @@ class BuildingEmployeeRepository:
             )
             return dict(row)
     
-    async def get_by_id(self, employee_id: int) -> Optional[Dict[str, Any]]:
+    async def get_by_id(self, employee_id: int, conn: Optional[asyncpg.Connection] = None) -> Optional[Dict[str, Any]]:
         """Get employee by ID."""
-        query = "SELECT * FROM building_employees WHERE employee_id = $1"
-        async with get_pool().acquire() as conn:
-            row = await conn.fetchrow(query, employee_id)
+        async with acquire(conn, readonly=True) as conn:
+            row = await statements.fetchrow(conn, _GET_BY_ID, employee_id)
             return dict(row) if row else None
     
-    async def get_all(self, skip: int = 0, limit: int = 100) -> List[Dict[str, Any]]:
-        """Get all employees with pagination."""
-        query = "SELECT * FROM building_employees ORDER BY employee_id LIMIT $1 OFFSET $2"
-        async with get_pool().acquire() as conn:
-            rows = await conn.fetch(query, limit, skip)
+    async def get_by_ids(self, employee_ids: List[int], conn: Optional[asyncpg.Connection] = None) -> List[Dict[str, Any]]:
+        """Get employees by IDs in one query (rows in no particular order, unknown IDs skipped)."""
+        async with acquire(conn, readonly=True) as conn:
+            rows = await statements.fetch(conn, _GET_BY_IDS, employee_ids)
             return [dict(row) for row in rows]
     
-    async def update(self, employee_id: int, employee_data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
-        """Update an employee."""
-        set_clauses = []
-        values = []
-        param_count = 1
-        
-        for key, value in employee_data.items():
-            if value is not None:
-                set_clauses.append(f"{key} = ${param_count}")
-                values.append(value)
-                param_count += 1
+    async def get_all(
+        self,
+        skip: int = 0,
+        limit: int = 100,
+        after_id: Optional[int] = None,
+        conn: Optional[asyncpg.Connection] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Get all employees with pagination.
         
-        if not set_clauses:
-            return await self.get_by_id(employee_id)
+        Keyset pagination when after_id is given (constant cost per page),
+        OFFSET pagination otherwise (backward compatibility).
+        """
+        async with acquire(conn, readonly=True) as conn:
+            if after_id is not None:
+                rows = await statements.fetch(conn, _LIST_AFTER, limit, after_id)
+            else:
+                rows = await statements.fetch(conn, _LIST_OFFSET, limit, skip)
+            return [dict(row) for row in rows]
+    
+    async def get_version(self, employee_id: int, conn: Optional[asyncpg.Connection] = None) -> Optional[str]:
+        """Row version of an employee (None if it does not exist)."""
+        async with acquire(conn, readonly=True) as conn:
+            return await statements.fetchval(conn, _VERSION, employee_id)
+    
+    async def get_list_version(self, conn: Optional[asyncpg.Connection] = None) -> str:
+        """Version of the whole employees table."""
+        async with acquire(conn, readonly=True) as conn:
+            return await statements.fetchval(conn, _LIST_VERSION)
+    
+    async def update(
+        self,
+        employee_id: int,
+        employee_data: Dict[str, Any],
+        conn: Optional[asyncpg.Connection] = None
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Update an employee.
         
-        values.append(employee_id)
-        query = f"""
-            UPDATE building_employees 
-            SET {', '.join(set_clauses)}
-            WHERE employee_id = ${param_count}
-            RETURNING *
+        One canonical statement for any field subset: None keeps the current value.
         """
+        values = [employee_data.get(column) for column in _UPDATE_COLUMNS]
+        
+        if all(value is None for value in values):
+            return await self.get_by_id(employee_id, conn)
         
-        async with get_pool().acquire() as conn:
-            row = await conn.fetchrow(query, *values)
+        async with acquire(conn) as conn:
+            row = await statements.fetchrow(conn, _UPDATE, *values, employee_id)
             return dict(row) if row else None
     
-    async def delete(self, employee_id: int) -> bool:
+    async def delete(self, employee_id: int, conn: Optional[asyncpg.Connection] = None) -> bool:
         """Delete an employee."""
-        query = "DELETE FROM building_employees WHERE employee_id = $1 RETURNING employee_id"
-        async with get_pool().acquire() as conn:
-            row = await conn.fetchrow(query, employee_id)
+        async with acquire(conn) as conn:
+            row = await statements.fetchrow(conn, _DELETE, employee_id)
             return row is not None
-    
-    async def get_salaries(self, month: int, year: int) -> List[Dict[str, Any]]:
-        """
-        Calculate salaries for building employees for a specific month.
-        Salary = base_salary + (revenue * bonus_rate)
-        """
-        query = """
-            SELECT 
-                be.employee_id,
-                CONCAT(be.first_name, ' ', be.last_name) as full_name,
-                be.role,
-                be.base_salary,
-                COALESCE(sr.bonus_rate, 0) as bonus_rate,
-                COALESCE(SUM(cmu.price), 0) as monthly_revenue,
-                be.base_salary + (COALESCE(SUM(cmu.price), 0) * COALESCE(sr.bonus_rate, 0)) as total_salary
-            FROM building_employees be
-            LEFT JOIN service_subscribers ss ON be.employee_id = ss.employee_id
-                AND ss.from_date <= MAKE_DATE($1, $2, 1) + INTERVAL '1 month' - INTERVAL '1 day'
-                AND (ss.end_date IS NULL OR ss.end_date >= MAKE_DATE($1, $2, 1))
-            LEFT JOIN service_role_rules srr ON ss.service_role_rules_id = srr.id
-            LEFT JOIN salary_rules sr ON srr.salary_rule_id = sr.id
-            LEFT JOIN company_monthly_usages cmu ON cmu.service_id = srr.service_id
-                AND EXTRACT(YEAR FROM cmu.from_date) = $1
-                AND EXTRACT(MONTH FROM cmu.from_date) = $2
-            GROUP BY be.employee_id, be.first_name, be.last_name, be.role, 
-                     be.base_salary, sr.bonus_rate
-            ORDER BY be.employee_id
-        """
-        
-        async with get_pool().acquire() as conn:
-            rows = await conn.fetch(query, year, month)
-            return [dict(row) for row in rows]
@@ -3,22 +3,52 @@ Repository for Company entity.
 All database operations use raw SQL with asyncpg.
 """
 from typing import List, Optional, Dict, Any
-from api.database import get_pool
+import asyncpg
+from api.database import acquire, statements, instrument_repository
 
 
+# Hot CRUD queries, prepared once per pooled connection
+_CREATE = statements.register("companies.create", """
+    INSERT INTO companies (name, tax_code, email, address)
+    VALUES ($1, $2, $3, $4)
+    RETURNING id, name, tax_code, email, address
+""")
+_GET_BY_ID = statements.register("companies.get_by_id", "SELECT * FROM companies WHERE id = $1")
+_GET_BY_IDS = statements.register("companies.get_by_ids", "SELECT * FROM companies WHERE id = ANY($1::int[])")
+_GET_BY_TAX_CODE = statements.register("companies.get_by_tax_code", "SELECT * FROM companies WHERE tax_code = $1")
+_LIST_OFFSET = statements.register("companies.list_offset", "SELECT * FROM companies ORDER BY id LIMIT $1 OFFSET $2")
+_LIST_AFTER = statements.register("companies.list_after", "SELECT * FROM companies WHERE id > $2 ORDER BY id LIMIT $1")
+_UPDATE_COLUMNS = ["name", "tax_code", "email", "address"]
+_UPDATE = statements.register("companies.update", statements.update_statement(
+    "companies", "id", _UPDATE_COLUMNS, returning="id, name, tax_code, email, address"
+))
+_DELETE = statements.register("companies.delete", "DELETE FROM companies WHERE id = $1 RETURNING id")
+
+# Column order of the records passed to copy_employees
+EMPLOYEE_COLUMNS = ["company_id", "full_name", "job_title", "phone_number", "email", "status"]
+
+# Versions for ETags: updated_at (trigger-maintained) per row; per table, the
+# table_versions counter bumped by a statement trigger on every committed write
+_VERSION = statements.register(
+    "companies.version",
+    "SELECT updated_at::text FROM companies WHERE id = $1"
+)
+_LIST_VERSION = statements.register(
+    "companies.list_version",
+    "SELECT version::text FROM table_versions WHERE table_name = 'companies'"
+)
+
+
+@instrument_repository
 class CompanyRepository:
     """Repository for Company CRUD operations."""
     
-    async def create(self, company_data: Dict[str, Any]) -> Dict[str, Any]:
+    async def create(self, company_data: Dict[str, Any], conn: Optional[asyncpg.Connection] = None) -> Dict[str, Any]:
         """Create a new company."""
-        query = """
-            INSERT INTO companies (name, tax_code, email, address)
-            VALUES ($1, $2, $3, $4)
-            RETURNING id, name, tax_code, email, address
-        """
-        async with get_pool().acquire() as conn:
-            row = await conn.fetchrow(
-                query,
+        async with acquire(conn) as conn:
+            row = await statements.fetchrow(
+                conn,
+                _CREATE,
                 company_data["name"],
                 company_data["tax_code"],
                 company_data.get("email"),
@@ -26,62 +56,101 @@ class CompanyRepository:
             )
             return dict(row)
     
-    async def get_by_id(self, company_id: int) -> Optional[Dict[str, Any]]:
+    async def get_by_id(self, company_id: int, conn: Optional[asyncpg.Connection] = None) -> Optional[Dict[str, Any]]:
         """Get company by ID."""
-        query = "SELECT * FROM companies WHERE id = $1"
-        async with get_pool().acquire() as conn:
-            row = await conn.fetchrow(query, company_id)
+        async with acquire(conn, readonly=True) as conn:
+            row = await statements.fetchrow(conn, _GET_BY_ID, company_id)
             return dict(row) if row else None
     
-    async def get_by_tax_code(self, tax_code: str) -> Optional[Dict[str, Any]]:
+    async def get_by_ids(self, company_ids: List[int], conn: Optional[asyncpg.Connection] = None) -> List[Dict[str, Any]]:
+        """Get companies by IDs in one query (rows in no particular order, unknown IDs skipped)."""
+        async with acquire(conn, readonly=True) as conn:
+            rows = await statements.fetch(conn, _GET_BY_IDS, company_ids)
+            return [dict(row) for row in rows]
+    
+    async def get_by_tax_code(
+        self,
+        tax_code: str,
+        conn: Optional[asyncpg.Connection] = None
+    ) -> Optional[Dict[str, Any]]:
         """Get company by tax code."""
-        query = "SELECT * FROM companies WHERE tax_code = $1"
-        async with get_pool().acquire() as conn:
-            row = await conn.fetchrow(query, tax_code)
+        async with acquire(conn, readonly=True) as conn:
+            row = await statements.fetchrow(conn, _GET_BY_TAX_CODE, tax_code)
             return dict(row) if row else None
     
-    async def get_all(self, skip: int = 0, limit: int = 100) -> List[Dict[str, Any]]:
-        """Get all companies with pagination."""
-        query = "SELECT * FROM companies ORDER BY id LIMIT $1 OFFSET $2"
-        async with get_pool().acquire() as conn:
-            rows = await conn.fetch(query, limit, skip)
+    async def get_all(
+        self,
+        skip: int = 0,
+        limit: int = 100,
+        after_id: Optional[int] = None,
+        conn: Optional[asyncpg.Connection] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Get all companies with pagination.
+        
+        Keyset pagination when after_id is given (constant cost per page),
+        OFFSET pagination otherwise (backward compatibility).
+        """
+        async with acquire(conn, readonly=True) as conn:
+            if after_id is not None:
+                rows = await statements.fetch(conn, _LIST_AFTER, limit, after_id)
+            else:
+                rows = await statements.fetch(conn, _LIST_OFFSET, limit, skip)
             return [dict(row) for row in rows]
     
-    async def update(self, company_id: int, company_data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
-        """Update a company."""
-        set_clauses = []
-        values = []
-        param_count = 1
-        
-        for key, value in company_data.items():
-            if value is not None:
-                set_clauses.append(f"{key} = ${param_count}")
-                values.append(value)
-                param_count += 1
-        
-        if not set_clauses:
-            return await self.get_by_id(company_id)
+    async def get_version(self, company_id: int, conn: Optional[asyncpg.Connection] = None) -> Optional[str]:
+        """Row version of a company (None if it does not exist)."""
+        async with acquire(conn, readonly=True) as conn:
+            return await statements.fetchval(conn, _VERSION, company_id)
+    
+    async def get_list_version(self, conn: Optional[asyncpg.Connection] = None) -> str:
+        """Version of the whole companies table."""
+        async with acquire(conn, readonly=True) as conn:
+            return await statements.fetchval(conn, _LIST_VERSION)
+    
+    async def update(
+        self,
+        company_id: int,
+        company_data: Dict[str, Any],
+        conn: Optional[asyncpg.Connection] = None
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Update a company.
         
-        values.append(company_id)
-        query = f"""
-            UPDATE companies 
-            SET {', '.join(set_clauses)}
-            WHERE id = ${param_count}
-            RETURNING id, name, tax_code, email, address
+        One canonical statement for any field subset: None keeps the current value.
         """
+        values = [company_data.get(column) for column in _UPDATE_COLUMNS]
         
-        async with get_pool().acquire() as conn:
-            row = await conn.fetchrow(query, *values)
+        if all(value is None for value in values):
+            return await self.get_by_id(company_id, conn)
+        
+        async with acquire(conn) as conn:
+            row = await statements.fetchrow(conn, _UPDATE, *values, company_id)
             return dict(row) if row else None
     
-    async def delete(self, company_id: int) -> bool:
+    async def delete(self, company_id: int, conn: Optional[asyncpg.Connection] = None) -> bool:
         """Delete a company."""
-        query = "DELETE FROM companies WHERE id = $1 RETURNING id"
-        async with get_pool().acquire() as conn:
-            row = await conn.fetchrow(query, company_id)
+        async with acquire(conn) as conn:
+            row = await statements.fetchrow(conn, _DELETE, company_id)
             return row is not None
     
-    async def get_monthly_costs(self, company_id: int, month: int, year: int) -> Dict[str, Any]:
+    async def copy_employees(
+        self,
+        records: List[tuple],
+        conn: Optional[asyncpg.Connection] = None
+    ) -> int:
+        """COPY rows (EMPLOYEE_COLUMNS order) into company_employees."""
+        async with acquire(conn) as conn:
+            await conn.copy_records_to_table("company_employees", records=records, columns=EMPLOYEE_COLUMNS)
+            return len(records)
+    
+    async def get_monthly_costs(
+        self,
+        company_id: int,
+        month: int,
+        year: int,
+        conn: Optional[asyncpg.Connection] = None
+    ) -> Dict[str, Any]:
         """
         Get company's monthly costs including rent and services.
         
@@ -89,6 +158,8 @@ class CompanyRepository:
             Dict with rent_cost, service_costs (list), total_cost
         """
         # Get rent cost for the month
+        # (contract period [from_date, end_date] overlaps the month [start, next month),
+        #  served by idx_rent_contracts_company_period)
         rent_query = """
             SELECT 
                 SUM(rc.rent_price) as rent_cost,
@@ -97,15 +168,12 @@ class CompanyRepository:
             JOIN offices o ON rc.office_id = o.id
             WHERE rc.company_id = $1
             AND rc.status = 'active'
-            AND DATE_PART('year', rc.from_date) <= $2
-            AND DATE_PART('month', rc.from_date) <= $3
-            AND (rc.end_date IS NULL OR (
-                DATE_PART('year', rc.end_date) >= $2
-                AND DATE_PART('month', rc.end_date) >= $3
-            ))
+            AND daterange(rc.from_date, rc.end_date, '[]')
+                && daterange(MAKE_DATE($2, $3, 1), (MAKE_DATE($2, $3, 1) + INTERVAL '1 month')::date)
         """
         
         # Get monthly service costs
+        # (half-open month range prunes to the month's partition, then uses its company/date index)
         service_query = """
             SELECT 
                 s.name as service_name,
@@ -113,12 +181,13 @@ class CompanyRepository:
             FROM company_monthly_usages cmu
             JOIN services s ON cmu.service_id = s.id
             WHERE cmu.company_id = $1
-            AND DATE_PART('year', cmu.from_date) = $2
-            AND DATE_PART('month', cmu.from_date) = $3
+            AND cmu.from_date >= MAKE_DATE($2, $3, 1)
+            AND cmu.from_date < (MAKE_DATE($2, $3, 1) + INTERVAL '1 month')::date
             GROUP BY s.id, s.name
         """
         
         # Get daily service costs (parking, meals)
+        # (half-open month range prunes to the month's partition)
         daily_query = """
             SELECT 
                 s.name as service_name,
@@ -127,12 +196,12 @@ class CompanyRepository:
             JOIN company_employees ce ON edu.employee_id = ce.id
             JOIN services s ON edu.service_id = s.id
             WHERE ce.company_id = $1
-            AND DATE_PART('year', edu.usage_date) = $2
-            AND DATE_PART('month', edu.usage_date) = $3
+            AND edu.usage_date >= MAKE_DATE($2, $3, 1)
+            AND edu.usage_date < (MAKE_DATE($2, $3, 1) + INTERVAL '1 month')::date
             GROUP BY s.id, s.name
         """
         
-        async with get_pool().acquire() as conn:
+        async with acquire(conn, readonly=True) as conn:
             rent_row = await conn.fetchrow(rent_query, company_id, year, month)
             service_rows = await conn.fetch(service_query, company_id, year, month)
             daily_rows = await conn.fetch(daily_query, company_id, year, month)
@@ -157,9 +226,15 @@ class CompanyRepository:
                 "total_cost": float(total_cost)
             }
     
-    async def get_service_details(self, company_id: int, month: int, year: int) -> dict:
+    async def get_service_details(
+        self,
+        company_id: int,
+        month: int,
+        year: int,
+        conn: Optional[asyncpg.Connection] = None
+    ) -> dict:
         """Get detailed service usage and costs for a company."""
-        async with get_pool().acquire() as conn:
+        async with acquire(conn, readonly=True) as conn:
             # Get company name
             company_row = await conn.fetchrow("SELECT name FROM companies WHERE id = $1", company_id)
             company_name = company_row['name'] if company_row else f"Company {company_id}"
@@ -174,8 +249,8 @@ class CompanyRepository:
                 FROM company_monthly_usages cmu
                 JOIN services s ON cmu.service_id = s.id
                 WHERE cmu.company_id = $1
-                AND EXTRACT(YEAR FROM cmu.from_date) = $2
-                AND EXTRACT(MONTH FROM cmu.from_date) = $3
+                AND cmu.from_date >= MAKE_DATE($2, $3, 1)
+                AND cmu.from_date < (MAKE_DATE($2, $3, 1) + INTERVAL '1 month')::date
             """, company_id, year, month)
             
             # Daily services
@@ -189,8 +264,8 @@ class CompanyRepository:
                 JOIN company_employees ce ON edu.employee_id = ce.id
                 JOIN services s ON edu.service_id = s.id
                 WHERE ce.company_id = $1
-                AND EXTRACT(YEAR FROM edu.usage_date) = $2
-                AND EXTRACT(MONTH FROM edu.usage_date) = $3
+                AND edu.usage_date >= MAKE_DATE($2, $3, 1)
+                AND edu.usage_date < (MAKE_DATE($2, $3, 1) + INTERVAL '1 month')::date
             """, company_id, year, month)
             
             monthly_total = sum(float(row['total_cost']) for row in monthly_rows)
@@ -0,0 +1,147 @@
+"""
+Repository for Invoice entity.
+
+Month-close generation is set-based per shard of companies (company_id % shards):
+one statement upserts the invoices of every company in the shard, two more
+link the month's usages to them.
+"""
+from typing import Any, Dict
+import asyncpg
+from api.database import statements, instrument_repository
+
+
+# $1 = year, $2 = month, $3 = shard count, $4 = shard
+_PERIOD = """
+    period AS (
+        SELECT MAKE_DATE($1, $2, 1) AS month_start,
+               (MAKE_DATE($1, $2, 1) + INTERVAL '1 month')::date AS month_end
+    )
+"""
+
+# Serialize runs of the same shard and month (a concurrent rerun waits, then finds the invoices)
+_LOCK_SHARD = statements.register(
+    "invoices.lock_shard",
+    "SELECT pg_advisory_xact_lock(hashtext(format('invoices:%s-%s:%s/%s', $1::int, $2::int, $4::int, $3::int)))"
+)
+
+# Charges per company (same rules as CompanyRepository.get_monthly_costs).
+# Existing unpaid invoices are brought up to date; paid/overdue ones are left as issued.
+_UPSERT = statements.register("invoices.upsert_month", f"""
+    WITH {_PERIOD},
+    rent AS (
+        SELECT rc.company_id, SUM(rc.rent_price) AS amount
+        FROM rent_contracts rc, period p
+        WHERE rc.status = 'active'
+            AND rc.company_id % $3 = $4
+            AND daterange(rc.from_date, rc.end_date, '[]') && daterange(p.month_start, p.month_end)
+        GROUP BY rc.company_id
+    ),
+    monthly AS (
+        SELECT cmu.company_id, SUM(cmu.price) AS amount
+        FROM company_monthly_usages cmu, period p
+        WHERE cmu.from_date >= p.month_start AND cmu.from_date < p.month_end
+            AND cmu.company_id % $3 = $4
+        GROUP BY cmu.company_id
+    ),
+    daily AS (
+        SELECT ce.company_id, SUM(edu.price) AS amount
+        FROM employee_daily_usages edu
+        JOIN company_employees ce ON ce.id = edu.employee_id
+        CROSS JOIN period p
+        WHERE edu.usage_date >= p.month_start AND edu.usage_date < p.month_end
+            AND ce.company_id % $3 = $4
+        GROUP BY ce.company_id
+    ),
+    charges AS (
+        SELECT
+            c.id AS company_id,
+            COALESCE(r.amount, 0) AS rent_amount,
+            COALESCE(m.amount, 0) AS monthly_service_amount,
+            COALESCE(d.amount, 0) AS daily_service_amount
+        FROM companies c
+        LEFT JOIN rent r ON r.company_id = c.id
+        LEFT JOIN monthly m ON m.company_id = c.id
+        LEFT JOIN daily d ON d.company_id = c.id
+        WHERE c.id % $3 = $4
+            AND (r.amount IS NOT NULL OR m.amount IS NOT NULL OR d.amount IS NOT NULL)
+    )
+    INSERT INTO invoices
+        (company_id, from_date, to_date, rent_amount, monthly_service_amount,
+         daily_service_amount, total_amount, status, note)
+    SELECT
+        ch.company_id, p.month_start, p.month_end - 1,
+        ch.rent_amount, ch.monthly_service_amount, ch.daily_service_amount,
+        ch.rent_amount + ch.monthly_service_amount + ch.daily_service_amount,
+        'unpaid', format('Hóa đơn tháng %s/%s', $2::int, $1::int)
+    FROM charges ch, period p
+    ON CONFLICT (company_id, from_date) DO UPDATE SET
+        rent_amount = EXCLUDED.rent_amount,
+        monthly_service_amount = EXCLUDED.monthly_service_amount,
+        daily_service_amount = EXCLUDED.daily_service_amount,
+        total_amount = EXCLUDED.total_amount
+    WHERE invoices.status = 'unpaid'
+        AND (invoices.rent_amount, invoices.monthly_service_amount, invoices.daily_service_amount)
+            IS DISTINCT FROM (EXCLUDED.rent_amount, EXCLUDED.monthly_service_amount, EXCLUDED.daily_service_amount)
+    RETURNING (xmax = 0) AS created
+""")
+
+# Link usages not yet billed to the company's unpaid invoice of the month
+_LINK_MONTHLY = statements.register("invoices.link_monthly_usages", f"""
+    WITH {_PERIOD}
+    UPDATE company_monthly_usages cmu
+    SET invoice_id = i.id
+    FROM invoices i, period p
+    WHERE cmu.invoice_id IS NULL
+        AND cmu.from_date >= p.month_start AND cmu.from_date < p.month_end
+        AND cmu.company_id % $3 = $4
+        AND i.company_id = cmu.company_id
+        AND i.from_date = p.month_start
+        AND i.status = 'unpaid'
+""")
+_LINK_DAILY = statements.register("invoices.link_daily_usages", f"""
+    WITH {_PERIOD}
+    UPDATE employee_daily_usages edu
+    SET invoice_id = i.id
+    FROM company_employees ce, invoices i, period p
+    WHERE edu.invoice_id IS NULL
+        AND edu.usage_date >= p.month_start AND edu.usage_date < p.month_end
+        AND ce.id = edu.employee_id
+        AND ce.company_id % $3 = $4
+        AND i.company_id = ce.company_id
+        AND i.from_date = p.month_start
+        AND i.status = 'unpaid'
+""")
+
+
+def _row_count(status: str) -> int:
+    """Row count from a command status such as "UPDATE 42"."""
+    return int(status.split()[-1])
+
+
+@instrument_repository
+class InvoiceRepository:
+    """Repository for Invoice operations."""
+    
+    async def generate_shard(
+        self,
+        month: int,
+        year: int,
+        shards: int,
+        shard: int,
+        conn: asyncpg.Connection
+    ) -> Dict[str, Any]:
+        """
+        Create or refresh the invoices of one shard of companies and link their usages.
+        
+        Must run inside a transaction (the advisory lock is transaction-scoped).
+        """
+        await statements.fetchval(conn, _LOCK_SHARD, year, month, shards, shard)
+        rows = await statements.fetch(conn, _UPSERT, year, month, shards, shard)
+        monthly = await statements.execute(conn, _LINK_MONTHLY, year, month, shards, shard)
+        daily = await statements.execute(conn, _LINK_DAILY, year, month, shards, shard)
+        return {
+            "invoices_created": sum(1 for row in rows if row["created"]),
+            "invoices_updated": sum(1 for row in rows if not row["created"]),
+            "monthly_usages_linked": _row_count(monthly),
+            "daily_usages_linked": _row_count(daily)
+        }
@@ -0,0 +1,148 @@
+"""
+Request-scoped DataLoaders for repository lookups by primary key.
+
+load(id) calls made in the same event-loop tick are coalesced into one
+get_by_ids (WHERE id = ANY($1)) query per entity type, and repeated ids are
+served from the loader's cache for the rest of the request.
+Read-only loaders may use the replica; pass readonly=False for checks that
+guard a write, so a lagging replica cannot hide a just-created row. Inside a
+transaction, pass conn: the batches then run on that connection, one at a time.
+
+Usage (in a service):
+    loaders = get_loaders()
+    office, company = await asyncio.gather(
+        loaders.offices.load(office_id),
+        loaders.companies.load(company_id)
+    )
+"""
+import asyncio
+from contextvars import ContextVar
+from typing import Any, Awaitable, Callable, Dict, Hashable, List, Optional, Set
+import asyncpg
+from api.database import acquire
+from api.repositories.office_repository import OfficeRepository
+from api.repositories.company_repository import CompanyRepository
+from api.repositories.rent_contract_repository import RentContractRepository
+from api.repositories.building_employee_repository import BuildingEmployeeRepository
+
+
+BatchFunction = Callable[[List[Hashable]], Awaitable[Dict[Hashable, Any]]]
+
+
+class DataLoader:
+    """Batch and cache load(key) calls; batch_fn maps a list of keys to {key: value}."""
+    
+    def __init__(self, batch_fn: BatchFunction):
+        self.batch_fn = batch_fn
+        self._futures: Dict[Hashable, asyncio.Future] = {}
+        self._pending: List[Hashable] = []
+        self._tasks: Set[asyncio.Task] = set()
+    
+    def load(self, key: Hashable) -> "asyncio.Future[Optional[Any]]":
+        """Value for key (None if missing), fetched with the other keys of this tick."""
+        future = self._futures.get(key)
+        if future is None:
+            loop = asyncio.get_running_loop()
+            future = loop.create_future()
+            self._futures[key] = future
+            if not self._pending:
+                # Two hops, so tasks started in this tick (e.g. by gather) queue their keys first
+                loop.call_soon(loop.call_soon, self._dispatch)
+            self._pending.append(key)
+        return future
+    
+    async def load_many(self, keys: List[Hashable]) -> List[Optional[Any]]:
+        """Values for keys, in the same order."""
+        return list(await asyncio.gather(*(self.load(key) for key in keys)))
+    
+    def clear(self, key: Hashable) -> None:
+        """Forget a cached key (e.g. after the row was written in this request)."""
+        future = self._futures.get(key)
+        if future is not None and future.done():
+            del self._futures[key]
+    
+    def _dispatch(self) -> None:
+        keys, self._pending = self._pending, []
+        task = asyncio.get_running_loop().create_task(self._run(keys))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+    
+    async def _run(self, keys: List[Hashable]) -> None:
+        try:
+            found = await self.batch_fn(keys)
+        except Exception as e:
+            # Failed lookups are not cached; the next load() retries
+            for key in keys:
+                future = self._futures.pop(key)
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for key in keys:
+            future = self._futures[key]
+            if not future.done():
+                future.set_result(found.get(key))
+
+
+def _by_id(
+    get_by_ids,
+    key: str,
+    readonly: bool,
+    conn: Optional[asyncpg.Connection] = None,
+    lock: Optional[asyncio.Lock] = None
+) -> BatchFunction:
+    """Adapt a repository get_by_ids into a {id: row} batch function."""
+    async def batch(ids: List[int]) -> Dict[int, Dict[str, Any]]:
+        if conn is not None:
+            # A connection runs one query at a time; loaders sharing it take turns
+            async with lock:
+                rows = await get_by_ids(ids, conn)
+        elif readonly:
+            rows = await get_by_ids(ids)
+        else:
+            async with acquire() as primary:
+                rows = await get_by_ids(ids, primary)
+        return {row[key]: row for row in rows}
+    return batch
+
+
+class Loaders:
+    """One DataLoader per entity type."""
+    
+    def __init__(self, readonly: bool = True, conn: Optional[asyncpg.Connection] = None):
+        lock = asyncio.Lock() if conn is not None else None
+        
+        def loader(repository_get_by_ids, key: str) -> DataLoader:
+            return DataLoader(_by_id(repository_get_by_ids, key, readonly, conn, lock))
+        
+        self.offices = loader(OfficeRepository().get_by_ids, "id")
+        self.companies = loader(CompanyRepository().get_by_ids, "id")
+        self.contracts = loader(RentContractRepository().get_by_ids, "id")
+        self.employees = loader(BuildingEmployeeRepository().get_by_ids, "employee_id")
+
+
+# Loaders of the current request, keyed by readonly (created on first use)
+_loaders: ContextVar[Optional[Dict[bool, Loaders]]] = ContextVar("loaders", default=None)
+
+
+def start_request_loaders() -> None:
+    """Open a loader scope for the current request; called per request by the app."""
+    _loaders.set({})
+
+
+def get_loaders(readonly: bool = True, conn: Optional[asyncpg.Connection] = None) -> Loaders:
+    """
+    Loaders of the current request.
+    
+    Outside a request (scripts, tests) a fresh, unshared set is returned, so
+    nothing is cached across callers. With conn (e.g. inside transaction()) a
+    fresh set bound to that connection is returned, so lookups see the
+    transaction's own writes and no other pooled connection is used.
+    """
+    if conn is not None:
+        return Loaders(conn=conn)
+    scope = _loaders.get()
+    if scope is None:
+        return Loaders(readonly)
+    if readonly not in scope:
+        scope[readonly] = Loaders(readonly)
+    return scope[readonly]
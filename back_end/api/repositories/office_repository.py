@@ -2,23 +2,51 @@
 Repository for Office entity.
 All database operations use raw SQL with asyncpg.
 """
-from typing import List, Optional, Dict, Any
-from api.database import get_pool
+from typing import List, Optional, Dict, Any, AsyncIterator
+from datetime import date
+from decimal import Decimal
+import asyncpg
+from api.database import acquire, statements, instrument_repository
 
 
+# Hot CRUD queries, prepared once per pooled connection
+_CREATE = statements.register("offices.create", """
+    INSERT INTO offices (name, area, floor, position, base_price)
+    VALUES ($1, $2, $3, $4, $5)
+    RETURNING id, name, area, floor, position, base_price
+""")
+_GET_BY_ID = statements.register("offices.get_by_id", "SELECT * FROM offices WHERE id = $1")
+_GET_BY_IDS = statements.register("offices.get_by_ids", "SELECT * FROM offices WHERE id = ANY($1::int[])")
+_LIST_OFFSET = statements.register("offices.list_offset", "SELECT * FROM offices ORDER BY id LIMIT $1 OFFSET $2")
+_LIST_AFTER = statements.register("offices.list_after", "SELECT * FROM offices WHERE id > $2 ORDER BY id LIMIT $1")
+_UPDATE_COLUMNS = ["name", "area", "floor", "position", "base_price"]
+_UPDATE = statements.register("offices.update", statements.update_statement(
+    "offices", "id", _UPDATE_COLUMNS, returning="id, name, area, floor, position, base_price"
+))
+_DELETE = statements.register("offices.delete", "DELETE FROM offices WHERE id = $1 RETURNING id")
+
+# Versions for ETags: updated_at (trigger-maintained) per row; per table, the
+# table_versions counter bumped by a statement trigger on every committed write
+_VERSION = statements.register(
+    "offices.version",
+    "SELECT updated_at::text FROM offices WHERE id = $1"
+)
+_LIST_VERSION = statements.register(
+    "offices.list_version",
+    "SELECT version::text FROM table_versions WHERE table_name = 'offices'"
+)
+
+
+@instrument_repository
 class OfficeRepository:
     """Repository for Office CRUD operations."""
     
-    async def create(self, office_data: Dict[str, Any]) -> Dict[str, Any]:
+    async def create(self, office_data: Dict[str, Any], conn: Optional[asyncpg.Connection] = None) -> Dict[str, Any]:
         """Create a new office."""
-        query = """
-            INSERT INTO offices (name, area, floor, position, base_price)
-            VALUES ($1, $2, $3, $4, $5)
-            RETURNING id, name, area, floor, position, base_price
-        """
-        async with get_pool().acquire() as conn:
-            row = await conn.fetchrow(
-                query,
+        async with acquire(conn) as conn:
+            row = await statements.fetchrow(
+                conn,
+                _CREATE,
                 office_data["name"],
                 office_data["area"],
                 office_data["floor"],
@@ -27,53 +55,72 @@ class OfficeRepository:
             )
             return dict(row)
     
-    async def get_by_id(self, office_id: int) -> Optional[Dict[str, Any]]:
+    async def get_by_id(self, office_id: int, conn: Optional[asyncpg.Connection] = None) -> Optional[Dict[str, Any]]:
         """Get office by ID."""
-        query = "SELECT * FROM offices WHERE id = $1"
-        async with get_pool().acquire() as conn:
-            row = await conn.fetchrow(query, office_id)
+        async with acquire(conn, readonly=True) as conn:
+            row = await statements.fetchrow(conn, _GET_BY_ID, office_id)
             return dict(row) if row else None
     
-    async def get_all(self, skip: int = 0, limit: int = 100) -> List[Dict[str, Any]]:
-        """Get all offices with pagination."""
-        query = "SELECT * FROM offices ORDER BY id LIMIT $1 OFFSET $2"
-        async with get_pool().acquire() as conn:
-            rows = await conn.fetch(query, limit, skip)
+    async def get_by_ids(self, office_ids: List[int], conn: Optional[asyncpg.Connection] = None) -> List[Dict[str, Any]]:
+        """Get offices by IDs in one query (rows in no particular order, unknown IDs skipped)."""
+        async with acquire(conn, readonly=True) as conn:
+            rows = await statements.fetch(conn, _GET_BY_IDS, office_ids)
             return [dict(row) for row in rows]
     
-    async def update(self, office_id: int, office_data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
-        """Update an office."""
-        # Build dynamic update query
-        set_clauses = []
-        values = []
-        param_count = 1
-        
-        for key, value in office_data.items():
-            if value is not None:
-                set_clauses.append(f"{key} = ${param_count}")
-                values.append(value)
-                param_count += 1
+    async def get_all(
+        self,
+        skip: int = 0,
+        limit: int = 100,
+        after_id: Optional[int] = None,
+        conn: Optional[asyncpg.Connection] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Get all offices with pagination.
         
-        if not set_clauses:
-            return await self.get_by_id(office_id)
+        Keyset pagination when after_id is given (constant cost per page),
+        OFFSET pagination otherwise (backward compatibility).
+        """
+        async with acquire(conn, readonly=True) as conn:
+            if after_id is not None:
+                rows = await statements.fetch(conn, _LIST_AFTER, limit, after_id)
+            else:
+                rows = await statements.fetch(conn, _LIST_OFFSET, limit, skip)
+            return [dict(row) for row in rows]
+    
+    async def get_version(self, office_id: int, conn: Optional[asyncpg.Connection] = None) -> Optional[str]:
+        """Row version of an office (None if it does not exist)."""
+        async with acquire(conn, readonly=True) as conn:
+            return await statements.fetchval(conn, _VERSION, office_id)
+    
+    async def get_list_version(self, conn: Optional[asyncpg.Connection] = None) -> str:
+        """Version of the whole offices table."""
+        async with acquire(conn, readonly=True) as conn:
+            return await statements.fetchval(conn, _LIST_VERSION)
+    
+    async def update(
+        self,
+        office_id: int,
+        office_data: Dict[str, Any],
+        conn: Optional[asyncpg.Connection] = None
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Update an office.
         
-        values.append(office_id)
-        query = f"""
-            UPDATE offices 
-            SET {', '.join(set_clauses)}
-            WHERE id = ${param_count}
-            RETURNING id, name, area, floor, position, base_price
+        One canonical statement for any field subset: None keeps the current value.
         """
+        values = [office_data.get(column) for column in _UPDATE_COLUMNS]
+        
+        if all(value is None for value in values):
+            return await self.get_by_id(office_id, conn)
         
-        async with get_pool().acquire() as conn:
-            row = await conn.fetchrow(query, *values)
+        async with acquire(conn) as conn:
+            row = await statements.fetchrow(conn, _UPDATE, *values, office_id)
             return dict(row) if row else None
     
-    async def delete(self, office_id: int) -> bool:
+    async def delete(self, office_id: int, conn: Optional[asyncpg.Connection] = None) -> bool:
         """Delete an office."""
-        query = "DELETE FROM offices WHERE id = $1 RETURNING id"
-        async with get_pool().acquire() as conn:
-            row = await conn.fetchrow(query, office_id)
+        async with acquire(conn) as conn:
+            row = await statements.fetchrow(conn, _DELETE, office_id)
             return row is not None
     
     async def check_availability(
@@ -81,21 +128,21 @@ class OfficeRepository:
         office_id: int, 
         from_date: str, 
         to_date: str,
-        exclude_contract_id: Optional[int] = None
+        exclude_contract_id: Optional[int] = None,
+        conn: Optional[asyncpg.Connection] = None
     ) -> bool:
         """
         Check if office is available for rent in the given date range.
         Returns True if available, False if already rented.
+        
+        Read-only helper: writes rely on the rent_contracts_office_no_overlap
+        exclusion constraint instead of calling this before INSERT/UPDATE.
         """
         query = """
             SELECT COUNT(*) as count FROM rent_contracts
             WHERE office_id = $1 
             AND status = 'active'
-            AND (
-                (from_date <= $2 AND end_date >= $2) OR
-                (from_date <= $3 AND end_date >= $3) OR
-                (from_date >= $2 AND end_date <= $3)
-            )
+            AND daterange(from_date, end_date, '[]') && daterange($2::date, $3::date, '[]')
         """
         
         params = [office_id, from_date, to_date]
@@ -105,6 +152,38 @@ class OfficeRepository:
             query += " AND id != $4"
             params.append(exclude_contract_id)
         
-        async with get_pool().acquire() as conn:
+        async with acquire(conn, readonly=True) as conn:
             row = await conn.fetchrow(query, *params)
             return row["count"] == 0
+    
+    async def iter_available(
+        self,
+        from_date: date,
+        to_date: date,
+        min_area: Optional[Decimal] = None,
+        floor: Optional[int] = None,
+        conn: Optional[asyncpg.Connection] = None
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Stream offices that are free for the whole period [from_date, to_date].
+        
+        Single anti-join against active contracts; each probe is served by the
+        (office_id, daterange) GiST index of rent_contracts_office_no_overlap.
+        """
+        query = """
+            SELECT o.* FROM offices o
+            WHERE ($3::numeric IS NULL OR o.area >= $3)
+            AND ($4::int IS NULL OR o.floor = $4)
+            AND NOT EXISTS (
+                SELECT 1 FROM rent_contracts rc
+                WHERE rc.office_id = o.id
+                AND rc.status = 'active'
+                AND daterange(rc.from_date, rc.end_date, '[]') && daterange($1, $2, '[]')
+            )
+            ORDER BY o.id
+        """
+        async with acquire(conn, readonly=True) as conn:
+            # Server-side cursors need a transaction
+            async with conn.transaction():
+                async for row in conn.cursor(query, from_date, to_date, min_area, floor):
+                    yield dict(row)
@@ -0,0 +1,178 @@
+"""
+Repository for monthly payroll (building employee salaries).
+
+Salaries are computed set-based: service revenue is aggregated once per
+service for the month, then joined to the employees' active assignments, so
+the cost grows with employees + usages instead of employees x usages.
+Closed months are persisted in payroll_runs (migration 006).
+"""
+from datetime import date
+from typing import List, Optional, Dict, Any
+import asyncpg
+from api.database import acquire, statements, instrument_repository
+
+
+# Live payroll for the months of a "live_months" CTE (month_start, month_end).
+# One row per employee and month:
+# bonus = Σ over active assignments (service revenue × bonus_rate),
+# bonus_rate = effective rate (bonus / revenue; the rule's rate when there is no revenue)
+_LIVE_PAYROLL_CTES = """
+    service_revenue AS (
+        SELECT cmu.service_id, date_trunc('month', cmu.from_date)::date AS month_start, SUM(cmu.price) AS revenue
+        FROM company_monthly_usages cmu
+        WHERE cmu.from_date >= (SELECT MIN(month_start) FROM live_months)
+            AND cmu.from_date < (SELECT MAX(month_end) FROM live_months)
+        GROUP BY 1, 2
+    ),
+    assignment_bonus AS (
+        SELECT
+            lm.month_start,
+            ss.employee_id,
+            SUM(COALESCE(rev.revenue, 0)) AS monthly_revenue,
+            SUM(COALESCE(rev.revenue, 0) * COALESCE(sr.bonus_rate, 0)::numeric) AS bonus,
+            MAX(sr.bonus_rate) AS max_bonus_rate
+        FROM live_months lm
+        JOIN service_subscribers ss
+            ON ss.from_date < lm.month_end
+            AND (ss.end_date IS NULL OR ss.end_date >= lm.month_start)
+        JOIN service_role_rules srr ON srr.id = ss.service_role_rules_id
+        LEFT JOIN salary_rules sr ON sr.id = srr.salary_rule_id
+        LEFT JOIN service_revenue rev ON rev.service_id = srr.service_id AND rev.month_start = lm.month_start
+        GROUP BY lm.month_start, ss.employee_id
+    ),
+    live AS (
+        SELECT
+            lm.month_start,
+            be.employee_id,
+            CONCAT(be.first_name, ' ', be.last_name) AS full_name,
+            be.role,
+            be.base_salary,
+            COALESCE(ab.bonus / NULLIF(ab.monthly_revenue, 0), ab.max_bonus_rate, 0)::float AS bonus_rate,
+            COALESCE(ab.monthly_revenue, 0) AS monthly_revenue,
+            ROUND(COALESCE(ab.bonus, 0), 2) AS bonus,
+            COALESCE(be.base_salary, 0) + ROUND(COALESCE(ab.bonus, 0), 2) AS total_salary
+        FROM live_months lm
+        CROSS JOIN building_employees be
+        LEFT JOIN assignment_bonus ab ON ab.employee_id = be.employee_id AND ab.month_start = lm.month_start
+    )
+"""
+
+_PAYROLL_COLUMNS = "employee_id, full_name, role, base_salary, bonus_rate, monthly_revenue, bonus, total_salary"
+
+# One month: $1 = year, $2 = month
+_PAYROLL_SQL = f"""
+    WITH live_months AS (
+        SELECT MAKE_DATE($1, $2, 1) AS month_start,
+               (MAKE_DATE($1, $2, 1) + INTERVAL '1 month')::date AS month_end
+    ),
+    {_LIVE_PAYROLL_CTES}
+    SELECT {_PAYROLL_COLUMNS} FROM live
+"""
+
+_COMPUTE = statements.register("payroll.compute", f"{_PAYROLL_SQL} ORDER BY employee_id")
+_GET_RUN = statements.register("payroll.get_run", f"""
+    SELECT {_PAYROLL_COLUMNS}
+    FROM payroll_runs
+    WHERE year = $1 AND month = $2
+    ORDER BY employee_id
+""")
+# Serialize concurrent runs of the same month (first readers of a closed month)
+_LOCK_RUN = statements.register(
+    "payroll.lock_run",
+    "SELECT pg_advisory_xact_lock(hashtext('payroll_runs'), $1 * 100 + $2)"
+)
+_DELETE_RUN = statements.register("payroll.delete_run", "DELETE FROM payroll_runs WHERE year = $1 AND month = $2")
+_SAVE_RUN = statements.register("payroll.save_run", f"""
+    WITH saved AS (
+        INSERT INTO payroll_runs (year, month, {_PAYROLL_COLUMNS})
+        SELECT $1, $2, {_PAYROLL_COLUMNS}
+        FROM ({_PAYROLL_SQL}) payroll
+        RETURNING {_PAYROLL_COLUMNS}
+    )
+    SELECT * FROM saved ORDER BY employee_id
+""")
+
+# Range of months: $1 = first month, $2 = last month (first days).
+# Months with a stored run read it, the others are computed live; running
+# total and month-over-month change per employee as window functions.
+_SERIES = statements.register("payroll.series", f"""
+    WITH months AS (
+        SELECT m::date AS month_start, (m + INTERVAL '1 month')::date AS month_end
+        FROM generate_series($1::date, $2::date, INTERVAL '1 month') AS m
+    ),
+    stored AS (
+        SELECT MAKE_DATE(pr.year, pr.month, 1) AS month_start, {_PAYROLL_COLUMNS}
+        FROM payroll_runs pr
+        WHERE (pr.year, pr.month) >= (EXTRACT(YEAR FROM $1::date)::int, EXTRACT(MONTH FROM $1::date)::int)
+            AND (pr.year, pr.month) <= (EXTRACT(YEAR FROM $2::date)::int, EXTRACT(MONTH FROM $2::date)::int)
+    ),
+    live_months AS (
+        SELECT ms.* FROM months ms
+        WHERE NOT EXISTS (SELECT 1 FROM stored s WHERE s.month_start = ms.month_start)
+    ),
+    {_LIVE_PAYROLL_CTES},
+    payroll AS (
+        SELECT month_start, {_PAYROLL_COLUMNS} FROM stored
+        UNION ALL
+        SELECT month_start, {_PAYROLL_COLUMNS} FROM live
+    )
+    SELECT
+        month_start,
+        {_PAYROLL_COLUMNS},
+        SUM(total_salary) OVER per_employee AS cumulative_salary,
+        total_salary - LAG(total_salary) OVER per_employee AS salary_change
+    FROM payroll
+    WINDOW per_employee AS (PARTITION BY employee_id ORDER BY month_start ROWS UNBOUNDED PRECEDING)
+    ORDER BY employee_id, month_start
+""")
+
+
+@instrument_repository
+class PayrollRepository:
+    """Repository for payroll computation and stored payroll runs."""
+    
+    async def compute(self, month: int, year: int, conn: Optional[asyncpg.Connection] = None) -> List[Dict[str, Any]]:
+        """Compute salaries of a month without storing them."""
+        async with acquire(conn, readonly=True) as conn:
+            rows = await statements.fetch(conn, _COMPUTE, year, month)
+            return [dict(row) for row in rows]
+    
+    async def compute_series(
+        self,
+        start: date,
+        end: date,
+        conn: Optional[asyncpg.Connection] = None
+    ) -> List[Dict[str, Any]]:
+        """Salaries of every month in [start, end] (first days), one row per employee and month."""
+        async with acquire(conn, readonly=True) as conn:
+            rows = await statements.fetch(conn, _SERIES, start, end)
+            return [dict(row) for row in rows]
+    
+    async def get_run(self, month: int, year: int, conn: Optional[asyncpg.Connection] = None) -> List[Dict[str, Any]]:
+        """Stored salaries of a month (empty if the month was never run)."""
+        async with acquire(conn, readonly=True) as conn:
+            rows = await statements.fetch(conn, _GET_RUN, year, month)
+            return [dict(row) for row in rows]
+    
+    async def save_run(
+        self,
+        month: int,
+        year: int,
+        conn: asyncpg.Connection,
+        rebuild: bool = False
+    ) -> List[Dict[str, Any]]:
+        """
+        Compute and store the salaries of a month.
+        
+        A run stored by a concurrent caller while this one waited for the lock
+        is returned as is; rebuild=True replaces it instead.
+        Must run inside a transaction (the advisory lock is transaction-scoped).
+        """
+        await statements.fetchval(conn, _LOCK_RUN, year, month)
+        if not rebuild:
+            rows = await statements.fetch(conn, _GET_RUN, year, month)
+            if rows:
+                return [dict(row) for row in rows]
+        await statements.fetchval(conn, _DELETE_RUN, year, month)
+        rows = await statements.fetch(conn, _SAVE_RUN, year, month)
+        return [dict(row) for row in rows]
@@ -3,25 +3,65 @@ Repository for RentContract entity.
 All database operations use raw SQL with asyncpg.
 """
 from typing import List, Optional, Dict, Any
-from api.database import get_pool
+import asyncpg
+from api.database import acquire, statements, instrument_repository
 
 
+# Hot CRUD queries, prepared once per pooled connection
+_CREATE = statements.register("rent_contracts.create", """
+    INSERT INTO rent_contracts 
+        (office_id, company_id, invoice_id, from_date, end_date, 
+         signed_date, rent_price, status)
+    VALUES ($1, $2, $3, $4, $5, $6, $7, $8)
+    RETURNING id, office_id, company_id, invoice_id, from_date, 
+              end_date, signed_date, rent_price, status
+""")
+_GET_BY_ID = statements.register("rent_contracts.get_by_id", "SELECT * FROM rent_contracts WHERE id = $1")
+_GET_BY_IDS = statements.register("rent_contracts.get_by_ids", "SELECT * FROM rent_contracts WHERE id = ANY($1::int[])")
+_LIST_OFFSET = statements.register(
+    "rent_contracts.list_offset",
+    "SELECT * FROM rent_contracts ORDER BY id LIMIT $1 OFFSET $2"
+)
+_LIST_AFTER = statements.register(
+    "rent_contracts.list_after",
+    "SELECT * FROM rent_contracts WHERE id > $2 ORDER BY id LIMIT $1"
+)
+_GET_BY_COMPANY = statements.register("rent_contracts.get_by_company", """
+    SELECT * FROM rent_contracts 
+    WHERE company_id = $1 
+    ORDER BY from_date DESC
+""")
+_UPDATE_COLUMNS = [
+    "office_id", "company_id", "invoice_id", "from_date", "end_date",
+    "signed_date", "rent_price", "status"
+]
+_UPDATE = statements.register("rent_contracts.update", statements.update_statement(
+    "rent_contracts", "id", _UPDATE_COLUMNS
+))
+_DELETE = statements.register("rent_contracts.delete", "DELETE FROM rent_contracts WHERE id = $1 RETURNING id")
+
+# Versions for ETags: updated_at (trigger-maintained) per row; per table, the
+# table_versions counter bumped by a statement trigger on every committed write
+_VERSION = statements.register(
+    "rent_contracts.version",
+    "SELECT updated_at::text FROM rent_contracts WHERE id = $1"
+)
+_LIST_VERSION = statements.register(
+    "rent_contracts.list_version",
+    "SELECT version::text FROM table_versions WHERE table_name = 'rent_contracts'"
+)
+
+
+@instrument_repository
 class RentContractRepository:
     """Repository for RentContract CRUD operations."""
     
-    async def create(self, contract_data: Dict[str, Any]) -> Dict[str, Any]:
+    async def create(self, contract_data: Dict[str, Any], conn: Optional[asyncpg.Connection] = None) -> Dict[str, Any]:
         """Create a new rent contract."""
-        query = """
-            INSERT INTO rent_contracts 
-                (office_id, company_id, invoice_id, from_date, end_date, 
-                 signed_date, rent_price, status)
-            VALUES ($1, $2, $3, $4, $5, $6, $7, $8)
-            RETURNING id, office_id, company_id, invoice_id, from_date, 
-                      end_date, signed_date, rent_price, status
-        """
-        async with get_pool().acquire() as conn:
-            row = await conn.fetchrow(
-                query,
+        async with acquire(conn) as conn:
+            row = await statements.fetchrow(
+                conn,
+                _CREATE,
                 contract_data["office_id"],
                 contract_data["company_id"],
                 contract_data.get("invoice_id"),
@@ -33,61 +73,76 @@ class RentContractRepository:
             )
             return dict(row)
     
-    async def get_by_id(self, contract_id: int) -> Optional[Dict[str, Any]]:
+    async def get_by_id(self, contract_id: int, conn: Optional[asyncpg.Connection] = None) -> Optional[Dict[str, Any]]:
         """Get contract by ID."""
-        query = "SELECT * FROM rent_contracts WHERE id = $1"
-        async with get_pool().acquire() as conn:
-            row = await conn.fetchrow(query, contract_id)
+        async with acquire(conn, readonly=True) as conn:
+            row = await statements.fetchrow(conn, _GET_BY_ID, contract_id)
             return dict(row) if row else None
     
-    async def get_all(self, skip: int = 0, limit: int = 100) -> List[Dict[str, Any]]:
-        """Get all contracts with pagination."""
-        query = "SELECT * FROM rent_contracts ORDER BY id LIMIT $1 OFFSET $2"
-        async with get_pool().acquire() as conn:
-            rows = await conn.fetch(query, limit, skip)
+    async def get_by_ids(self, contract_ids: List[int], conn: Optional[asyncpg.Connection] = None) -> List[Dict[str, Any]]:
+        """Get contracts by IDs in one query (rows in no particular order, unknown IDs skipped)."""
+        async with acquire(conn, readonly=True) as conn:
+            rows = await statements.fetch(conn, _GET_BY_IDS, contract_ids)
             return [dict(row) for row in rows]
     
-    async def get_by_company(self, company_id: int) -> List[Dict[str, Any]]:
-        """Get all contracts for a company."""
-        query = """
-            SELECT * FROM rent_contracts 
-            WHERE company_id = $1 
-            ORDER BY from_date DESC
+    async def get_all(
+        self,
+        skip: int = 0,
+        limit: int = 100,
+        after_id: Optional[int] = None,
+        conn: Optional[asyncpg.Connection] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Get all contracts with pagination.
+        
+        Keyset pagination when after_id is given (constant cost per page),
+        OFFSET pagination otherwise (backward compatibility).
         """
-        async with get_pool().acquire() as conn:
-            rows = await conn.fetch(query, company_id)
+        async with acquire(conn, readonly=True) as conn:
+            if after_id is not None:
+                rows = await statements.fetch(conn, _LIST_AFTER, limit, after_id)
+            else:
+                rows = await statements.fetch(conn, _LIST_OFFSET, limit, skip)
             return [dict(row) for row in rows]
     
-    async def update(self, contract_id: int, contract_data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
-        """Update a contract."""
-        set_clauses = []
-        values = []
-        param_count = 1
-        
-        for key, value in contract_data.items():
-            if value is not None:
-                set_clauses.append(f"{key} = ${param_count}")
-                values.append(value)
-                param_count += 1
-        
-        if not set_clauses:
-            return await self.get_by_id(contract_id)
+    async def get_by_company(self, company_id: int, conn: Optional[asyncpg.Connection] = None) -> List[Dict[str, Any]]:
+        """Get all contracts for a company."""
+        async with acquire(conn, readonly=True) as conn:
+            rows = await statements.fetch(conn, _GET_BY_COMPANY, company_id)
+            return [dict(row) for row in rows]
+    
+    async def get_version(self, contract_id: int, conn: Optional[asyncpg.Connection] = None) -> Optional[str]:
+        """Row version of a contract (None if it does not exist)."""
+        async with acquire(conn, readonly=True) as conn:
+            return await statements.fetchval(conn, _VERSION, contract_id)
+    
+    async def get_list_version(self, conn: Optional[asyncpg.Connection] = None) -> str:
+        """Version of the whole contracts table."""
+        async with acquire(conn, readonly=True) as conn:
+            return await statements.fetchval(conn, _LIST_VERSION)
+    
+    async def update(
+        self,
+        contract_id: int,
+        contract_data: Dict[str, Any],
+        conn: Optional[asyncpg.Connection] = None
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Update a contract.
         
-        values.append(contract_id)
-        query = f"""
-            UPDATE rent_contracts 
-            SET {', '.join(set_clauses)}
-            WHERE id = ${param_count}
-            RETURNING *
+        One canonical statement for any field subset: None keeps the current value.
         """
+        values = [contract_data.get(column) for column in _UPDATE_COLUMNS]
+        
+        if all(value is None for value in values):
+            return await self.get_by_id(contract_id, conn)
         
-        async with get_pool().acquire() as conn:
-            row = await conn.fetchrow(query, *values)
+        async with acquire(conn) as conn:
+            row = await statements.fetchrow(conn, _UPDATE, *values, contract_id)
             return dict(row) if row else None
     
-    async def delete(self, contract_id: int) -> bool:
+    async def delete(self, contract_id: int, conn: Optional[asyncpg.Connection] = None) -> bool:
         """Delete a contract."""
-        query = "DELETE FROM rent_contracts WHERE id = $1 RETURNING id"
-        async with get_pool().acquire() as conn:
-            row = await conn.fetchrow(query, contract_id)
+        async with acquire(conn) as conn:
+            row = await statements.fetchrow(conn, _DELETE, contract_id)
             return row is not None
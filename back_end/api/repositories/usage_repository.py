@@ -0,0 +1,54 @@
+"""
+Repository for service usages (company_monthly_usages, employee_daily_usages).
+Bulk loads go through COPY (asyncpg copy_records_to_table).
+"""
+from typing import List, Optional, Sequence, Set, Tuple
+import asyncpg
+from api.database import acquire, statements, instrument_repository
+
+
+# Column order of the records passed to the copy_* methods
+DAILY_USAGE_COLUMNS = ["employee_id", "invoice_id", "service_id", "usage_date", "price", "service_type"]
+MONTHLY_USAGE_COLUMNS = ["company_id", "service_id", "invoice_id", "from_date", "to_date", "quantity", "price"]
+
+# Referenced tables checked before a load (COPY would abort the whole batch on one bad key)
+_EXISTING_IDS = {
+    table: statements.register(f"usages.existing_{table}", f"SELECT id FROM {table} WHERE id = ANY($1::int[])")
+    for table in ("company_employees", "companies", "services", "invoices")
+}
+
+
+@instrument_repository
+class UsageRepository:
+    """Repository for usage bulk operations."""
+    
+    async def existing_ids(
+        self,
+        table: str,
+        ids: Sequence[int],
+        conn: Optional[asyncpg.Connection] = None
+    ) -> Set[int]:
+        """Return the subset of ids present in a referenced table (one query)."""
+        async with acquire(conn) as conn:
+            rows = await statements.fetch(conn, _EXISTING_IDS[table], list(ids))
+            return {row["id"] for row in rows}
+    
+    async def copy_daily_usages(
+        self,
+        records: List[Tuple],
+        conn: Optional[asyncpg.Connection] = None
+    ) -> int:
+        """COPY rows (DAILY_USAGE_COLUMNS order) into employee_daily_usages."""
+        async with acquire(conn) as conn:
+            await conn.copy_records_to_table("employee_daily_usages", records=records, columns=DAILY_USAGE_COLUMNS)
+            return len(records)
+    
+    async def copy_monthly_usages(
+        self,
+        records: List[Tuple],
+        conn: Optional[asyncpg.Connection] = None
+    ) -> int:
+        """COPY rows (MONTHLY_USAGE_COLUMNS order) into company_monthly_usages."""
+        async with acquire(conn) as conn:
+            await conn.copy_records_to_table("company_monthly_usages", records=records, columns=MONTHLY_USAGE_COLUMNS)
+            return len(records)
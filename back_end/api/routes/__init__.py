@@ -1,5 +1,14 @@
 """Routes package initialization."""
-from api.routes import office_routes, company_routes, rent_contract_routes, building_employee_routes, report_routes
+from api.routes import (
+    office_routes,
+    company_routes,
+    rent_contract_routes,
+    building_employee_routes,
+    report_routes,
+    usage_routes,
+    invoice_routes,
+    internal_routes
+)
 
 __all__ = [
     "office_routes",
@@ -7,4 +16,7 @@ __all__ = [
     "rent_contract_routes",
     "building_employee_routes",
     "report_routes",
+    "usage_routes",
+    "invoice_routes",
+    "internal_routes",
 ]
@@ -1,10 +1,13 @@
 """
 Routes for BuildingEmployee endpoints.
 """
-from typing import List
-from fastapi import APIRouter, Query
+from typing import List, Optional
+from fastapi import APIRouter, HTTPException, Query, Request, Response
 from api.models.building_employee import BuildingEmployee, BuildingEmployeeCreate, BuildingEmployeeUpdate
 from api.services.building_employee_service import BuildingEmployeeService
+from api.cache import cached_report, conditional, make_etag
+from api.routes.pagination import MAX_ID, parse_ids, resolve_after_id, set_next_cursor
+from api.routes.periods import MONTH_PATTERN, parse_month_range
 
 router = APIRouter(prefix="/building-employees", tags=["Building Employees"])
 service = BuildingEmployeeService()
@@ -17,18 +20,43 @@ async def create_employee(employee: BuildingEmployeeCreate):
 
 
 @router.get("/{employee_id}", response_model=BuildingEmployee)
-async def get_employee(employee_id: int):
-    """Lấy thông tin nhân viên theo ID."""
+async def get_employee(employee_id: int, request: Request, response: Response):
+    """
+    Lấy thông tin nhân viên theo ID.
+    ETag theo updated_at: If-None-Match trùng thì trả 304.
+    """
+    version = await service.get_employee_version(employee_id)
+    unchanged = conditional(request, response, version and make_etag("employee", employee_id, version))
+    if unchanged:
+        return unchanged
     return await service.get_employee(employee_id)
 
 
 @router.get("", response_model=List[BuildingEmployee])
 async def list_employees(
+    request: Request,
+    response: Response,
     skip: int = Query(0, ge=0),
-    limit: int = Query(100, ge=1, le=1000)
+    limit: int = Query(100, ge=1, le=1000),
+    after_id: Optional[int] = Query(None, ge=0, le=MAX_ID),
+    cursor: Optional[str] = Query(None),
+    ids: Optional[str] = Query(None, description="Lấy theo danh sách ID, vd. 1,2,3")
 ):
-    """Liệt kê tất cả nhân viên tòa nhà."""
-    return await service.list_employees(skip, limit)
+    """
+    Liệt kê tất cả nhân viên tòa nhà.
+    Phân trang keyset: truyền ?cursor= (header X-Next-Cursor) hoặc ?after_id=.
+    ?ids=1,2,3: trả đúng các bản ghi đó theo thứ tự yêu cầu (bỏ qua phân trang).
+    ETag theo phiên bản bảng: If-None-Match trùng thì trả 304.
+    """
+    version = await service.get_employees_version()
+    unchanged = conditional(request, response, make_etag("employees", version, skip, limit, after_id, cursor, ids))
+    if unchanged:
+        return unchanged
+    if ids is not None:
+        return await service.get_employees_by_ids(parse_ids(ids))
+    items = await service.list_employees(skip, limit, resolve_after_id(after_id, cursor))
+    set_next_cursor(response, items, limit, key="employee_id")
+    return items
 
 
 @router.put("/{employee_id}", response_model=BuildingEmployee)
@@ -44,12 +72,35 @@ async def delete_employee(employee_id: int):
 
 
 @router.get("/salaries/monthly")
+@cached_report("employee_salaries", tags=("employees", "usages", "payroll"))
 async def get_employee_salaries(
-    month: int = Query(..., ge=1, le=12),
-    year: int = Query(..., ge=2000, le=2100)
+    month: Optional[int] = Query(None, ge=1, le=12),
+    year: Optional[int] = Query(None, ge=2000, le=2100),
+    from_month: Optional[str] = Query(None, alias="from", pattern=MONTH_PATTERN),
+    to_month: Optional[str] = Query(None, alias="to", pattern=MONTH_PATTERN)
 ):
     """
     Liệt kê lương của tất cả nhân viên tòa nhà trong tháng.
-    Lương = base_salary + (doanh thu * bonus_rate)
+    Lương = base_salary + Σ(doanh thu dịch vụ * bonus_rate) theo các phân công.
+    Tháng đã kết thúc đọc từ bảng chốt lương payroll_runs.
+    
+    from=YYYY-MM&to=YYYY-MM: mỗi nhân viên một dòng cho từng tháng (month), kèm
+    lũy kế (cumulative_salary) và chênh lệch so với tháng trước (salary_change).
     """
+    period = parse_month_range(from_month, to_month, month, year)
+    if period:
+        return await service.get_salary_series(*period)
+    if month is None or year is None:
+        raise HTTPException(status_code=400, detail="Cần month và year, hoặc from và to (YYYY-MM)")
     return await service.get_salaries(month, year)
+
+
+@router.post("/salaries/monthly/run")
+async def run_employee_payroll(
+    month: int = Query(..., ge=1, le=12),
+    year: int = Query(..., ge=2000, le=2100)
+):
+    """
+    Tính lại và chốt lương của một tháng đã kết thúc (ghi đè lần chốt trước).
+    """
+    return await service.run_payroll(month, year)
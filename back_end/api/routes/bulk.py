@@ -0,0 +1,65 @@
+"""
+Request body parsing for bulk endpoints (/usages/*:bulk, /companies/employees:bulk).
+Rows are streamed from NDJSON or CSV bodies so large uploads are never held
+in memory at once.
+"""
+import csv
+from typing import Any, AsyncIterator, List, Tuple
+from fastapi import HTTPException, Request
+
+NDJSON_TYPES = ("application/x-ndjson", "application/jsonl", "application/json")
+CSV_TYPES = ("text/csv",)
+
+
+async def _line_chunks(request: Request) -> AsyncIterator[List[bytes]]:
+    """Complete lines of the request body, grouped per received chunk."""
+    pending = b""
+    async for chunk in request.stream():
+        pending += chunk
+        *lines, pending = pending.split(b"\n")
+        if lines:
+            yield lines
+    if pending:
+        yield [pending]
+
+
+async def _ndjson_rows(request: Request) -> AsyncIterator[Tuple[int, Any]]:
+    """(line, JSON text) per non-empty line; parsing happens during validation."""
+    line = 0
+    async for lines in _line_chunks(request):
+        for raw in lines:
+            line += 1
+            if raw.strip():
+                yield line, raw
+
+
+async def _csv_rows(request: Request) -> AsyncIterator[Tuple[int, Any]]:
+    """
+    (line, dict) per CSV data row; the first line is the header.
+    
+    Empty cells become None. Fields must not contain line breaks.
+    """
+    header = None
+    line = 0
+    async for lines in _line_chunks(request):
+        for row in csv.reader(raw.decode("utf-8-sig").rstrip("\r") for raw in lines):
+            line += 1
+            if not row:
+                continue
+            if header is None:
+                header = [name.strip() for name in row]
+                continue
+            yield line, {name: value if value != "" else None for name, value in zip(header, row)}
+
+
+def bulk_rows(request: Request) -> AsyncIterator[Tuple[int, Any]]:
+    """Pick the parser from Content-Type (NDJSON or CSV)."""
+    content_type = request.headers.get("content-type", "").split(";")[0].strip().lower()
+    if content_type in NDJSON_TYPES:
+        return _ndjson_rows(request)
+    if content_type in CSV_TYPES:
+        return _csv_rows(request)
+    raise HTTPException(
+        status_code=415,
+        detail="Content-Type phải là application/x-ndjson hoặc text/csv"
+    )
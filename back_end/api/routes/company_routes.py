@@ -1,10 +1,13 @@
 """
 Routes for Company endpoints.
 """
-from typing import List
-from fastapi import APIRouter, Query
+from typing import List, Optional
+from fastapi import APIRouter, Query, Request, Response
 from api.models.company import Company, CompanyCreate, CompanyUpdate
 from api.services.company_service import CompanyService
+from api.cache import cached_report, conditional, make_etag
+from api.routes.pagination import MAX_ID, parse_ids, resolve_after_id, set_next_cursor
+from api.routes.bulk import bulk_rows
 
 router = APIRouter(prefix="/companies", tags=["Companies"])
 service = CompanyService()
@@ -16,19 +19,55 @@ async def create_company(company: CompanyCreate):
     return await service.create_company(company)
 
 
+@router.post("/employees:bulk")
+async def bulk_create_employees(request: Request):
+    """
+    Nhập hàng loạt nhân viên công ty.
+    
+    Body: NDJSON hoặc CSV, cột: company_id, full_name, job_title, phone_number,
+    email, status (tùy chọn). Kết quả như /usages/daily:bulk.
+    """
+    return await service.bulk_create_employees(bulk_rows(request))
+
+
 @router.get("/{company_id}", response_model=Company)
-async def get_company(company_id: int):
-    """Lấy thông tin công ty theo ID."""
+async def get_company(company_id: int, request: Request, response: Response):
+    """
+    Lấy thông tin công ty theo ID.
+    ETag theo updated_at: If-None-Match trùng thì trả 304.
+    """
+    version = await service.get_company_version(company_id)
+    unchanged = conditional(request, response, version and make_etag("company", company_id, version))
+    if unchanged:
+        return unchanged
     return await service.get_company(company_id)
 
 
 @router.get("", response_model=List[Company])
 async def list_companies(
+    request: Request,
+    response: Response,
     skip: int = Query(0, ge=0),
-    limit: int = Query(100, ge=1, le=1000)
+    limit: int = Query(100, ge=1, le=1000),
+    after_id: Optional[int] = Query(None, ge=0, le=MAX_ID),
+    cursor: Optional[str] = Query(None),
+    ids: Optional[str] = Query(None, description="Lấy theo danh sách ID, vd. 1,2,3")
 ):
-    """Liệt kê tất cả công ty."""
-    return await service.list_companies(skip, limit)
+    """
+    Liệt kê tất cả công ty.
+    Phân trang keyset: truyền ?cursor= (header X-Next-Cursor) hoặc ?after_id=.
+    ?ids=1,2,3: trả đúng các bản ghi đó theo thứ tự yêu cầu (bỏ qua phân trang).
+    ETag theo phiên bản bảng: If-None-Match trùng thì trả 304.
+    """
+    version = await service.get_companies_version()
+    unchanged = conditional(request, response, make_etag("companies", version, skip, limit, after_id, cursor, ids))
+    if unchanged:
+        return unchanged
+    if ids is not None:
+        return await service.get_companies_by_ids(parse_ids(ids))
+    items = await service.list_companies(skip, limit, resolve_after_id(after_id, cursor))
+    set_next_cursor(response, items, limit, key="id")
+    return items
 
 
 @router.put("/{company_id}", response_model=Company)
@@ -44,6 +83,7 @@ async def delete_company(company_id: int):
 
 
 @router.get("/{company_id}/monthly-costs")
+@cached_report("company_monthly_costs", tags=("companies", "offices", "contracts", "usages"))
 async def get_monthly_costs(
     company_id: int,
     month: int = Query(..., ge=1, le=12),
@@ -57,6 +97,7 @@ async def get_monthly_costs(
 
 
 @router.get("/{company_id}/service-details")
+@cached_report("company_service_details", tags=("companies", "usages"))
 async def get_service_details(
     company_id: int,
     month: int = Query(..., ge=1, le=12),
@@ -0,0 +1,36 @@
+"""
+Internal routes - Runtime diagnostics (connection pool, statement cache).
+"""
+from fastapi import APIRouter
+from api.database import pool_stats, statement_stats
+
+router = APIRouter(prefix="/internal", tags=["Internal"])
+
+
+@router.get("/statements")
+async def get_statement_stats():
+    """
+    Prepared statement registry counters.
+    
+    Returns:
+    - registered: Số câu lệnh đã khai báo
+    - prepared_on_init: Số lần prepare khi mở connection
+    - hits / misses: Lượt dùng lại / phải prepare lúc chạy
+    - hit_ratio: Tỷ lệ hit
+    """
+    return statement_stats()
+
+
+@router.get("/pool")
+async def get_pool_stats():
+    """
+    Connection pool usage.
+    
+    Returns:
+    - size / min_size / max_size: Số connection hiện có và giới hạn
+    - in_use / idle: Connection đang dùng / rảnh
+    - acquires, acquire_wait_ms: Số lần lấy connection và histogram thời gian chờ (ms, cộng dồn)
+    - acquire_timeouts: Số lần chờ quá DB_POOL_ACQUIRE_TIMEOUT
+    - config: Cấu hình pool từ Settings
+    """
+    return pool_stats()
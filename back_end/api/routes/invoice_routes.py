@@ -0,0 +1,26 @@
+"""
+Routes for Invoice endpoints.
+"""
+from fastapi import APIRouter, Query
+from api.services.invoice_service import InvoiceService
+
+router = APIRouter(prefix="/invoices", tags=["Invoices"])
+service = InvoiceService()
+
+
+@router.post("/generate")
+async def generate_invoices(
+    month: int = Query(..., ge=1, le=12),
+    year: int = Query(..., ge=2000, le=2100)
+):
+    """
+    Lập hóa đơn tháng cho tất cả công ty (tiền thuê + dịch vụ tháng + dịch vụ ngày).
+    
+    Gán invoice_id cho company_monthly_usages / employee_daily_usages của tháng.
+    Chạy lại an toàn: hóa đơn chưa thanh toán được cập nhật, không tạo trùng.
+    
+    Returns:
+    - invoices_created / invoices_updated: Số hóa đơn tạo mới / cập nhật
+    - monthly_usages_linked / daily_usages_linked: Số dòng usage được gán hóa đơn
+    """
+    return await service.generate_invoices(month, year)
@@ -1,10 +1,16 @@
 """
 Routes for Office endpoints.
 """
-from typing import List
-from fastapi import APIRouter, Query
+from typing import List, Optional
+from datetime import date
+from decimal import Decimal
+from fastapi import APIRouter, Query, Request, Response
+from fastapi.responses import StreamingResponse
 from api.models.office import Office, OfficeCreate, OfficeUpdate
 from api.services.office_service import OfficeService
+from api.cache import conditional, make_etag
+from api.routes.pagination import MAX_ID, parse_ids, resolve_after_id, set_next_cursor
+from api.routes.streaming import json_array_stream
 
 router = APIRouter(prefix="/offices", tags=["Offices"])
 service = OfficeService()
@@ -16,19 +22,59 @@ async def create_office(office: OfficeCreate):
     return await service.create_office(office)
 
 
+@router.get("/available", response_model=List[Office])
+async def list_available_offices(
+    from_date: date = Query(..., alias="from"),
+    to_date: date = Query(..., alias="to"),
+    min_area: Optional[Decimal] = Query(None, gt=0),
+    floor: Optional[int] = Query(None)
+):
+    """
+    Tìm các văn phòng còn trống trong cả khoảng thời gian [from, to].
+    Kết quả được stream (một truy vấn anti-join duy nhất).
+    """
+    offices = await service.list_available_offices(from_date, to_date, min_area, floor)
+    return StreamingResponse(json_array_stream(offices), media_type="application/json")
+
+
 @router.get("/{office_id}", response_model=Office)
-async def get_office(office_id: int):
-    """Lấy thông tin văn phòng theo ID."""
+async def get_office(office_id: int, request: Request, response: Response):
+    """
+    Lấy thông tin văn phòng theo ID.
+    ETag theo updated_at: If-None-Match trùng thì trả 304.
+    """
+    version = await service.get_office_version(office_id)
+    unchanged = conditional(request, response, version and make_etag("office", office_id, version))
+    if unchanged:
+        return unchanged
     return await service.get_office(office_id)
 
 
 @router.get("", response_model=List[Office])
 async def list_offices(
+    request: Request,
+    response: Response,
     skip: int = Query(0, ge=0),
-    limit: int = Query(100, ge=1, le=1000)
+    limit: int = Query(100, ge=1, le=1000),
+    after_id: Optional[int] = Query(None, ge=0, le=MAX_ID),
+    cursor: Optional[str] = Query(None),
+    ids: Optional[str] = Query(None, description="Lấy theo danh sách ID, vd. 1,2,3")
 ):
-    """Liệt kê tất cả văn phòng."""
-    return await service.list_offices(skip, limit)
+    """
+    Liệt kê tất cả văn phòng.
+    Phân trang keyset: truyền ?cursor= (header X-Next-Cursor) hoặc ?after_id=.
+    ?ids=1,2,3: trả đúng các bản ghi đó theo thứ tự yêu cầu (bỏ qua phân trang).
+    ETag theo phiên bản bảng: If-None-Match trùng thì trả 304.
+    """
+    version = await service.get_offices_version()
+    unchanged = conditional(request, response, make_etag("offices", version, skip, limit, after_id, cursor, ids))
+    if unchanged:
+        return unchanged
+    if ids is not None:
+        return await service.get_offices_by_ids(parse_ids(ids))
+    items = await service.list_offices(skip, limit, resolve_after_id(after_id, cursor))
+    set_next_cursor(response, items, limit, key="id")
+    return items
 
 
 @router.put("/{office_id}", response_model=Office)
@@ -0,0 +1,85 @@
+"""
+Keyset (cursor) pagination helpers for list endpoints.
+The cursor is an opaque, URL-safe token wrapping the last primary key of a page;
+the next page is read with "WHERE id > last_id ORDER BY id LIMIT n", so every
+page costs the same regardless of depth. skip/limit (OFFSET) stays supported
+for backward compatibility.
+
+?ids=1,2,3 fetches a batch by primary key instead of a page (one ANY($1) query).
+"""
+import base64
+import json
+from typing import Any, List, Optional
+from fastapi import HTTPException, Response
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+# Upper bound for ?ids= (same as the page limit)
+MAX_BATCH_IDS = 1000
+
+# Primary keys are SERIAL (int4); larger values cannot be sent as $1::int[]
+MAX_ID = 2**31 - 1
+
+
+def _is_id(value: Any) -> bool:
+    """True for an int primary key value (bool is not an id)."""
+    return isinstance(value, int) and not isinstance(value, bool) and 1 <= value <= MAX_ID
+
+
+def encode_cursor(last_id: int) -> str:
+    """Encode the last id of a page into an opaque cursor."""
+    raw = json.dumps({"after_id": last_id}).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> int:
+    """
+    Decode a cursor produced by encode_cursor().
+    
+    Raises:
+        HTTPException: 400 if the cursor is malformed
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        after_id = json.loads(base64.urlsafe_b64decode(padded))["after_id"]
+        if not _is_id(after_id):
+            raise ValueError("after_id must be an id")
+        return after_id
+    except (ValueError, KeyError, TypeError):
+        raise HTTPException(status_code=400, detail="Cursor không hợp lệ")
+
+
+def resolve_after_id(after_id: Optional[int], cursor: Optional[str]) -> Optional[int]:
+    """Pick the keyset position from ?cursor= (preferred) or ?after_id=."""
+    if cursor:
+        return decode_cursor(cursor)
+    return after_id
+
+
+def parse_ids(ids: str) -> List[int]:
+    """
+    Parse ?ids=1,2,3 into a list of unique ids, keeping the request order.
+    
+    Raises:
+        HTTPException: 400 if an id is not an integer in 1..MAX_ID or there are too many
+    """
+    try:
+        parsed = [int(part) for part in ids.split(",") if part.strip()]
+        if not all(_is_id(value) for value in parsed):
+            raise ValueError("ids must be in 1..MAX_ID")
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Tham số ids không hợp lệ (vd. ids=1,2,3)")
+    unique = list(dict.fromkeys(parsed))
+    if len(unique) > MAX_BATCH_IDS:
+        raise HTTPException(status_code=400, detail=f"Tối đa {MAX_BATCH_IDS} ids mỗi lần")
+    return unique
+
+
+def set_next_cursor(response: Response, items: List[Any], limit: int, key: str = "id") -> None:
+    """
+    Expose the cursor of the next page in the X-Next-Cursor header.
+    
+    The body stays a plain list; the header is omitted on the last page.
+    """
+    if len(items) == limit and items:
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor(getattr(items[-1], key))
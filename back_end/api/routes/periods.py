@@ -0,0 +1,69 @@
+"""
+Report period helpers.
+Reports take either one month (?month=&year=) or a range of months
+(?from=YYYY-MM&to=YYYY-MM, both inclusive), computed as one per-month series.
+"""
+from datetime import date
+from typing import Optional, Tuple
+from fastapi import HTTPException
+
+# Longest accepted ?from=&to= range
+MAX_RANGE_MONTHS = 60
+
+# Pattern for the from/to query parameters
+MONTH_PATTERN = r"^\d{4}-\d{2}$"
+
+
+def parse_month(value: str) -> date:
+    """
+    Parse "YYYY-MM" into the first day of that month.
+    
+    Raises:
+        HTTPException: 400 if the month is invalid
+    """
+    try:
+        year, month = (int(part) for part in value.split("-"))
+        if not 2000 <= year <= 2100:
+            raise ValueError("year out of range")
+        return date(year, month, 1)
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"Tháng không hợp lệ: {value} (định dạng YYYY-MM)")
+
+
+def parse_month_range(
+    from_month: Optional[str],
+    to_month: Optional[str],
+    month: Optional[int] = None,
+    year: Optional[int] = None,
+    min_year: int = 2000
+) -> Optional[Tuple[date, date]]:
+    """
+    Resolve ?from=&to= into (first month, last month), or None for a single-month request.
+    
+    min_year mirrors the route's ?year= lower bound, so both forms accept the same months.
+    
+    Raises:
+        HTTPException: 400 if only one bound is given, the range is reversed,
+            too long or starts before min_year, or it is combined with month/year
+    """
+    if from_month is None and to_month is None:
+        return None
+    if from_month is None or to_month is None:
+        raise HTTPException(status_code=400, detail="Cần cả from và to (YYYY-MM)")
+    if month is not None or year is not None:
+        raise HTTPException(status_code=400, detail="Chỉ dùng month/year hoặc from/to")
+    
+    start, end = parse_month(from_month), parse_month(to_month)
+    if start.year < min_year:
+        raise HTTPException(status_code=400, detail=f"Năm phải từ {min_year}")
+    months = (end.year - start.year) * 12 + end.month - start.month + 1
+    if months < 1:
+        raise HTTPException(status_code=400, detail="from phải trước hoặc bằng to")
+    if months > MAX_RANGE_MONTHS:
+        raise HTTPException(status_code=400, detail=f"Tối đa {MAX_RANGE_MONTHS} tháng mỗi lần")
+    return start, end
+
+
+def format_month(value: date) -> str:
+    """First day of a month as "YYYY-MM"."""
+    return f"{value.year}-{value.month:02d}"
@@ -1,10 +1,12 @@
 """
 Routes for RentContract endpoints.
 """
-from typing import List
-from fastapi import APIRouter, Query
+from typing import List, Optional
+from fastapi import APIRouter, Query, Request, Response
 from api.models.rent_contract import RentContract, RentContractCreate, RentContractUpdate
 from api.services.rent_contract_service import RentContractService
+from api.cache import conditional, make_etag
+from api.routes.pagination import MAX_ID, parse_ids, resolve_after_id, set_next_cursor
 
 router = APIRouter(prefix="/contracts", tags=["Rent Contracts"])
 service = RentContractService()
@@ -17,18 +19,43 @@ async def create_contract(contract: RentContractCreate):
 
 
 @router.get("/{contract_id}", response_model=RentContract)
-async def get_contract(contract_id: int):
-    """Lấy thông tin hợp đồng theo ID."""
+async def get_contract(contract_id: int, request: Request, response: Response):
+    """
+    Lấy thông tin hợp đồng theo ID.
+    ETag theo updated_at: If-None-Match trùng thì trả 304.
+    """
+    version = await service.get_contract_version(contract_id)
+    unchanged = conditional(request, response, version and make_etag("contract", contract_id, version))
+    if unchanged:
+        return unchanged
     return await service.get_contract(contract_id)
 
 
 @router.get("", response_model=List[RentContract])
 async def list_contracts(
+    request: Request,
+    response: Response,
     skip: int = Query(0, ge=0),
-    limit: int = Query(100, ge=1, le=1000)
+    limit: int = Query(100, ge=1, le=1000),
+    after_id: Optional[int] = Query(None, ge=0, le=MAX_ID),
+    cursor: Optional[str] = Query(None),
+    ids: Optional[str] = Query(None, description="Lấy theo danh sách ID, vd. 1,2,3")
 ):
-    """Liệt kê tất cả hợp đồng."""
-    return await service.list_contracts(skip, limit)
+    """
+    Liệt kê tất cả hợp đồng.
+    Phân trang keyset: truyền ?cursor= (header X-Next-Cursor) hoặc ?after_id=.
+    ?ids=1,2,3: trả đúng các bản ghi đó theo thứ tự yêu cầu (bỏ qua phân trang).
+    ETag theo phiên bản bảng: If-None-Match trùng thì trả 304.
+    """
+    version = await service.get_contracts_version()
+    unchanged = conditional(request, response, make_etag("contracts", version, skip, limit, after_id, cursor, ids))
+    if unchanged:
+        return unchanged
+    if ids is not None:
+        return await service.get_contracts_by_ids(parse_ids(ids))
+    items = await service.list_contracts(skip, limit, resolve_after_id(after_id, cursor))
+    set_next_cursor(response, items, limit, key="id")
+    return items
 
 
 @router.get("/company/{company_id}", response_model=List[RentContract])
@@ -1,66 +1,303 @@
 """
 Report routes - Building finance and other reports
 """
+from datetime import date
 from fastapi import APIRouter, HTTPException, Query
+from fastapi.responses import StreamingResponse
 from typing import Optional
+from api.cache import cached_report
+from api.routes.periods import MONTH_PATTERN, format_month, parse_month_range
+from api.routes.streaming import json_array_stream, ndjson_stream, csv_stream
 
 router = APIRouter(tags=["Reports"])
 
 
+# Contract months billed within the period (one row per contract per month).
+# Period comes from the "period" CTE: [start_date, end_date), rent counted until rent_until.
+RENT_LINES_SQL = """
+    SELECT rc.rent_price AS amount
+    FROM period p
+    JOIN rent_contracts rc
+        ON rc.status = 'active'
+        AND daterange(rc.from_date, rc.end_date, '[]') && daterange(p.start_date, p.rent_until)
+    CROSS JOIN LATERAL generate_series(
+        date_trunc('month', GREATEST(rc.from_date, p.start_date)::timestamp),
+        LEAST(rc.end_date, p.rent_until - 1)::timestamp,
+        INTERVAL '1 month'
+    ) AS billed_month
+"""
+
+# Total expense (salaries)
+FINANCE_EXPENSE_SQL = """
+    SELECT COALESCE(SUM(base_salary), 0)
+    FROM building_employees
+    WHERE status = 'working'
+"""
+
+
+def _building_finance_query(month: Optional[int], year: Optional[int], fresh: bool):
+    """
+    Build (query, params) returning totals and revenue breakdown in one row.
+    
+    total_revenue is the sum of the breakdown (rent + monthly + daily services);
+    invoiced_revenue is what the period's invoices bill. Default: service and
+    invoice revenue from monthly_finance_rollup, rent from active contracts.
+    fresh=True: everything from the base tables, split with FILTER aggregates
+    over one UNION ALL of revenue lines.
+    """
+    params = []
+    if month and year:
+        period_cte = """
+            WITH period AS (
+                SELECT MAKE_DATE($1, $2, 1) AS start_date,
+                       (MAKE_DATE($1, $2, 1) + INTERVAL '1 month')::date AS end_date,
+                       (MAKE_DATE($1, $2, 1) + INTERVAL '1 month')::date AS rent_until
+            )
+        """
+        params = [year, month]
+    else:
+        # All time: rent is counted up to the current month
+        period_cte = """
+            WITH period AS (
+                SELECT '-infinity'::date AS start_date,
+                       'infinity'::date AS end_date,
+                       (date_trunc('month', CURRENT_DATE) + INTERVAL '1 month')::date AS rent_until
+            )
+        """
+    
+    if not fresh:
+        rollup_filter = "WHERE r.year = $1 AND r.month = $2" if params else ""
+        query = f"""
+            {period_cte}
+            SELECT 
+                services.monthly_services + services.daily_services + rent.rent as total_revenue,
+                services.invoiced_revenue,
+                services.monthly_services,
+                services.daily_services,
+                rent.rent,
+                ({FINANCE_EXPENSE_SQL}) as total_expense
+            FROM (
+                SELECT 
+                    COALESCE(SUM(r.invoice_revenue), 0) as invoiced_revenue,
+                    COALESCE(SUM(r.monthly_service_revenue), 0) as monthly_services,
+                    COALESCE(SUM(r.daily_service_revenue), 0) as daily_services
+                FROM monthly_finance_rollup r
+                {rollup_filter}
+            ) services,
+            (SELECT COALESCE(SUM(amount), 0) as rent FROM ({RENT_LINES_SQL}) rent_lines) rent
+        """
+        return query, params
+    
+    invoice_filter = """
+        WHERE i.from_date >= (SELECT start_date FROM period)
+        AND i.from_date < (SELECT end_date FROM period)
+    """ if params else ""
+    query = f"""
+        {period_cte},
+        revenue_lines AS (
+            SELECT 'rent' AS source, amount FROM ({RENT_LINES_SQL}) rent_lines
+            UNION ALL
+            SELECT 'monthly_services', cmu.price
+            FROM company_monthly_usages cmu, period p
+            WHERE cmu.from_date >= p.start_date AND cmu.from_date < p.end_date
+            UNION ALL
+            SELECT 'daily_services', edu.price
+            FROM employee_daily_usages edu, period p
+            WHERE edu.usage_date >= p.start_date AND edu.usage_date < p.end_date
+        )
+        SELECT 
+            COALESCE(SUM(amount), 0) as total_revenue,
+            (SELECT COALESCE(SUM(i.total_amount), 0) FROM invoices i {invoice_filter}) as invoiced_revenue,
+            COALESCE(SUM(amount) FILTER (WHERE source = 'monthly_services'), 0) as monthly_services,
+            COALESCE(SUM(amount) FILTER (WHERE source = 'daily_services'), 0) as daily_services,
+            COALESCE(SUM(amount) FILTER (WHERE source = 'rent'), 0) as rent,
+            ({FINANCE_EXPENSE_SQL}) as total_expense
+        FROM revenue_lines
+    """
+    return query, params
+
+
+# Months of a ?from=&to= range: $1 = first month, $2 = last month (first days)
+MONTHS_CTE = """
+    months AS (
+        SELECT m::date AS month_start, (m + INTERVAL '1 month')::date AS month_end
+        FROM generate_series($1::date, $2::date, INTERVAL '1 month') AS m
+    )
+"""
+
+
+def _building_finance_series_query(fresh: bool) -> str:
+    """
+    Build the per-month building finance series for a range ($1, $2).
+    
+    One row per month (generate_series), revenue from the rollup (or the base
+    tables with fresh), running totals and month-over-month deltas as window functions.
+    total_revenue is rent + services, as in _building_finance_query.
+    """
+    if not fresh:
+        revenue_sql = """
+            SELECT MAKE_DATE(r.year, r.month, 1) AS month_start,
+                   r.invoice_revenue AS invoiced_revenue,
+                   r.monthly_service_revenue AS monthly_services,
+                   r.daily_service_revenue AS daily_services
+            FROM monthly_finance_rollup r
+            WHERE (r.year, r.month) >= (EXTRACT(YEAR FROM $1::date)::int, EXTRACT(MONTH FROM $1::date)::int)
+            AND (r.year, r.month) <= (EXTRACT(YEAR FROM $2::date)::int, EXTRACT(MONTH FROM $2::date)::int)
+        """
+    else:
+        revenue_sql = """
+            SELECT month_start,
+                   SUM(amount) FILTER (WHERE source = 'invoices') AS invoiced_revenue,
+                   SUM(amount) FILTER (WHERE source = 'monthly_services') AS monthly_services,
+                   SUM(amount) FILTER (WHERE source = 'daily_services') AS daily_services
+            FROM (
+                SELECT date_trunc('month', i.from_date)::date AS month_start, 'invoices' AS source, i.total_amount AS amount
+                FROM invoices i
+                WHERE i.from_date >= $1::date AND i.from_date < ($2::date + INTERVAL '1 month')::date
+                UNION ALL
+                SELECT date_trunc('month', cmu.from_date)::date, 'monthly_services', cmu.price
+                FROM company_monthly_usages cmu
+                WHERE cmu.from_date >= $1::date AND cmu.from_date < ($2::date + INTERVAL '1 month')::date
+                UNION ALL
+                SELECT date_trunc('month', edu.usage_date)::date, 'daily_services', edu.price
+                FROM employee_daily_usages edu
+                WHERE edu.usage_date >= $1::date AND edu.usage_date < ($2::date + INTERVAL '1 month')::date
+            ) revenue_lines
+            GROUP BY month_start
+        """
+    
+    return f"""
+        WITH {MONTHS_CTE},
+        revenue AS ({revenue_sql}),
+        rent AS (
+            SELECT ms.month_start, SUM(rc.rent_price) AS rent
+            FROM months ms
+            JOIN rent_contracts rc
+                ON rc.status = 'active'
+                AND daterange(rc.from_date, rc.end_date, '[]') && daterange(ms.month_start, ms.month_end)
+            GROUP BY ms.month_start
+        ),
+        series AS (
+            SELECT
+                ms.month_start,
+                COALESCE(rt.rent, 0) + COALESCE(rv.monthly_services, 0) + COALESCE(rv.daily_services, 0) AS total_revenue,
+                COALESCE(rv.invoiced_revenue, 0) AS invoiced_revenue,
+                COALESCE(rt.rent, 0) AS rent,
+                COALESCE(rv.monthly_services, 0) AS monthly_services,
+                COALESCE(rv.daily_services, 0) AS daily_services,
+                ({FINANCE_EXPENSE_SQL}) AS total_expense
+            FROM months ms
+            LEFT JOIN revenue rv ON rv.month_start = ms.month_start
+            LEFT JOIN rent rt ON rt.month_start = ms.month_start
+        )
+        SELECT
+            month_start,
+            total_revenue, invoiced_revenue, rent, monthly_services, daily_services, total_expense,
+            total_revenue - total_expense AS net_profit,
+            SUM(total_revenue) OVER w AS cumulative_revenue,
+            SUM(total_revenue - total_expense) OVER w AS cumulative_net_profit,
+            total_revenue - LAG(total_revenue) OVER w AS revenue_change
+        FROM series
+        WINDOW w AS (ORDER BY month_start ROWS UNBOUNDED PRECEDING)
+        ORDER BY month_start
+    """
+
+
+def _finance_month(row) -> dict:
+    """Format one month of the building finance series."""
+    monthly_services = float(row['monthly_services'])
+    daily_services = float(row['daily_services'])
+    return {
+        "month": format_month(row['month_start']),
+        "total_revenue": float(row['total_revenue']),
+        "invoiced_revenue": float(row['invoiced_revenue']),
+        "revenue_breakdown": {
+            "rent": float(row['rent']),
+            "services": monthly_services + daily_services,
+            "monthly_services": monthly_services,
+            "daily_services": daily_services
+        },
+        "total_expense": float(row['total_expense']),
+        "net_profit": float(row['net_profit']),
+        "cumulative_revenue": float(row['cumulative_revenue']),
+        "cumulative_net_profit": float(row['cumulative_net_profit']),
+        "revenue_change": float(row['revenue_change']) if row['revenue_change'] is not None else None
+    }
+
+
+async def _building_finance_series(start: date, end: date, fresh: bool) -> dict:
+    """Building finance for every month of [start, end] in one query."""
+    from api.database import acquire
+    
+    async with acquire(readonly=True) as conn:
+        rows = await conn.fetch(_building_finance_series_query(fresh), start, end)
+    
+    months = [_finance_month(row) for row in rows]
+    total_revenue = sum(item["total_revenue"] for item in months)
+    total_expense = sum(item["total_expense"] for item in months)
+    return {
+        "from": format_month(start),
+        "to": format_month(end),
+        "total_revenue": total_revenue,
+        "invoiced_revenue": sum(item["invoiced_revenue"] for item in months),
+        "total_expense": total_expense,
+        "net_profit": total_revenue - total_expense,
+        "months": months
+    }
+
+
 @router.get("/reports/building-finance")
+@cached_report("building_finance", tags=("contracts", "usages", "invoices", "employees"), bypass="fresh")
 async def get_building_finance(
     month: Optional[int] = Query(None, ge=1, le=12),
-    year: Optional[int] = Query(None, ge=2020)
+    year: Optional[int] = Query(None, ge=2020),
+    from_month: Optional[str] = Query(None, alias="from", pattern=MONTH_PATTERN),
+    to_month: Optional[str] = Query(None, alias="to", pattern=MONTH_PATTERN),
+    fresh: bool = Query(False)
 ):
     """
     Tổng thu chi tòa nhà.
     
+    Mặc định đọc doanh thu từ bảng monthly_finance_rollup (cập nhật bằng trigger);
+    fresh=true tính lại trực tiếp từ các bảng gốc (không dùng cache).
+    
+    from=YYYY-MM&to=YYYY-MM: chuỗi theo tháng trong một truy vấn (months), kèm
+    lũy kế (cumulative_*) và chênh lệch so với tháng trước (revenue_change).
+    
     Returns:
-    - total_revenue: Tổng thu từ hóa đơn
+    - total_revenue: Tổng thu = tiền thuê + dịch vụ tháng + dịch vụ ngày (tổng của revenue_breakdown)
+    - invoiced_revenue: Tổng tiền trên các hóa đơn của kỳ (theo hóa đơn đã lập)
+    - revenue_breakdown: Thu theo nguồn (tiền thuê, dịch vụ tháng, dịch vụ ngày)
     - total_expense: Tổng chi (lương nhân viên)
     - net_profit: Lợi nhuận
     """
+    period = parse_month_range(from_month, to_month, month, year, min_year=2020)
+    if period:
+        return await _building_finance_series(*period, fresh)
+    
     try:
-        from api.database import get_pool
-        
-        pool = get_pool()
+        from api.database import acquire
         
-        # Build date filter
-        where_clause = ""
-        params = []
-        
-        if month and year:
-            where_clause = "WHERE EXTRACT(MONTH FROM i.from_date) = $1 AND EXTRACT(YEAR FROM i.from_date) = $2"
-            params = [month, year]
-        
-        # Total revenue from invoices
-        revenue_query = f"""
-            SELECT COALESCE(SUM(total_amount), 0) as total_revenue
-            FROM invoices i
-            {where_clause}
-        """
+        query, params = _building_finance_query(month, year, fresh)
         
-        # Total expense (salaries)
-        expense_query = """
-            SELECT COALESCE(SUM(base_salary), 0) as total_expense
-            FROM building_employees
-            WHERE status = 'working'
-        """
-        
-        async with pool.acquire() as conn:
-            revenue_result = await conn.fetchrow(revenue_query, *params)
-            expense_result = await conn.fetchrow(expense_query)
+        async with acquire(readonly=True) as conn:
+            result = await conn.fetchrow(query, *params)
             
-            total_revenue = float(revenue_result['total_revenue'])
-            total_expense = float(expense_result['total_expense'])
+            total_revenue = float(result['total_revenue'])
+            total_expense = float(result['total_expense'])
+            monthly_services = float(result['monthly_services'])
+            daily_services = float(result['daily_services'])
             
             return {
                 "month": month,
                 "year": year,
                 "total_revenue": total_revenue,
+                "invoiced_revenue": float(result['invoiced_revenue']),
                 "revenue_breakdown": {
-                    "rent": total_revenue * 0.65,  # Estimate 65% from rent
-                    "services": total_revenue * 0.35  # Estimate 35% from services
+                    "rent": float(result['rent']),
+                    "services": monthly_services + daily_services,
+                    "monthly_services": monthly_services,
+                    "daily_services": daily_services
                 },
                 "total_expense": total_expense,
                 "net_profit": total_revenue - total_expense
@@ -69,10 +306,158 @@ async def get_building_finance(
         raise HTTPException(status_code=500, detail=f"Error: {str(e)}")
 
 
+# Rows fetched per round trip by the server-side cursor in streaming exports
+STREAM_PREFETCH = 1000
+
+# Column order for format=csv (revenue and expense rows share one header)
+FINANCE_DETAILS_CSV_FIELDS = [
+    "record_type",
+    "invoice_id", "company_name", "tax_code", "total_amount", "from_date", "to_date", "status",
+    "employee_id", "full_name", "position", "base_salary", "bonus_rate", "service_revenue", "total_salary",
+]
+
+
+def _finance_details_queries(month: Optional[int], year: Optional[int]):
+    """Build (revenue_query, expense_query, params) for the finance details report."""
+    # Build date filters (half-open month range, $1 = year, $2 = month)
+    invoice_filter = ""
+    usage_filter = ""
+    params = []
+    
+    if month and year:
+        invoice_filter = """
+            WHERE i.from_date >= MAKE_DATE($1, $2, 1)
+            AND i.from_date < (MAKE_DATE($1, $2, 1) + INTERVAL '1 month')::date
+        """
+        usage_filter = """
+            WHERE cmu.from_date >= MAKE_DATE($1, $2, 1)
+            AND cmu.from_date < (MAKE_DATE($1, $2, 1) + INTERVAL '1 month')::date
+        """
+        params = [year, month]
+    
+    # Revenue details - one row per invoice. Generated invoices carry
+    # company_id; older ones only reach the company through the contract
+    # they pay for.
+    revenue_query = f"""
+        SELECT 
+            i.id as invoice_id,
+            i.total_amount,
+            i.from_date,
+            i.to_date,
+            i.status,
+            c.name as company_name,
+            c.tax_code
+        FROM invoices i
+        LEFT JOIN LATERAL (
+            SELECT company_id FROM rent_contracts WHERE invoice_id = i.id ORDER BY id LIMIT 1
+        ) rc ON true
+        LEFT JOIN companies c ON c.id = COALESCE(i.company_id, rc.company_id)
+        {invoice_filter}
+        ORDER BY i.from_date DESC
+    """
+    
+    # Expense details (salaries)
+    # Usage revenue is aggregated once per service for the period, then summed
+    # over each employee's distinct services: cost grows with
+    # employees + usages instead of employees x usages.
+    expense_query = f"""
+        WITH service_revenue AS (
+            SELECT cmu.service_id, SUM(cmu.price * cmu.quantity) as revenue
+            FROM company_monthly_usages cmu
+            {usage_filter}
+            GROUP BY cmu.service_id
+        ),
+        employee_revenue AS (
+            SELECT ss.employee_id, SUM(sr.revenue) as revenue
+            FROM (SELECT DISTINCT employee_id, service_id FROM service_subscribers) ss
+            JOIN service_revenue sr ON sr.service_id = ss.service_id
+            GROUP BY ss.employee_id
+        )
+        SELECT 
+            be.employee_id as id,
+            CONCAT(be.first_name, ' ', be.last_name) as full_name,
+            be.role as position,
+            be.base_salary,
+            0.05 as bonus_rate,
+            COALESCE(er.revenue, 0) as service_revenue,
+            (be.base_salary + COALESCE(er.revenue, 0) * 0.05) as total_salary
+        FROM building_employees be
+        LEFT JOIN employee_revenue er ON er.employee_id = be.employee_id
+        WHERE be.status = 'working'
+        ORDER BY total_salary DESC
+    """
+    
+    return revenue_query, expense_query, params
+
+
+def _revenue_detail(row) -> dict:
+    """Format one invoice row of the finance details report."""
+    return {
+        "invoice_id": row['invoice_id'],
+        "company_name": row['company_name'],
+        "tax_code": row['tax_code'],
+        "total_amount": float(row['total_amount']),
+        "from_date": row['from_date'].isoformat(),
+        "to_date": row['to_date'].isoformat(),
+        "status": row['status']
+    }
+
+
+def _expense_detail(row) -> dict:
+    """Format one salary row of the finance details report."""
+    return {
+        "employee_id": row['id'],
+        "full_name": row['full_name'],
+        "position": row['position'],
+        "base_salary": float(row['base_salary']),
+        "bonus_rate": float(row['bonus_rate']),
+        "service_revenue": float(row['service_revenue']),
+        "total_salary": float(row['total_salary'])
+    }
+
+
+async def _iter_finance_details(month: Optional[int], year: Optional[int], with_summary: bool):
+    """
+    Yield finance detail records one by one from server-side cursors.
+    
+    Memory stays constant regardless of the number of invoices/employees.
+    With with_summary, a final "summary" record carries the running totals.
+    """
+    from api.database import acquire
+    
+    revenue_query, expense_query, params = _finance_details_queries(month, year)
+    total_revenue = 0.0
+    total_expense = 0.0
+    
+    async with acquire(readonly=True) as conn:
+        # Server-side cursors need a transaction
+        async with conn.transaction():
+            async for row in conn.cursor(revenue_query, *params, prefetch=STREAM_PREFETCH):
+                item = _revenue_detail(row)
+                total_revenue += item["total_amount"]
+                yield {"record_type": "revenue", **item}
+            
+            async for row in conn.cursor(expense_query, *params, prefetch=STREAM_PREFETCH):
+                item = _expense_detail(row)
+                total_expense += item["total_salary"]
+                yield {"record_type": "expense", **item}
+    
+    if with_summary:
+        yield {
+            "record_type": "summary",
+            "month": month,
+            "year": year,
+            "total_revenue": total_revenue,
+            "total_expense": total_expense,
+            "net_profit": total_revenue - total_expense
+        }
+
+
 @router.get("/reports/building-finance/details")
 async def get_building_finance_details(
     month: Optional[int] = Query(None, ge=1, le=12),
-    year: Optional[int] = Query(None, ge=2020)
+    year: Optional[int] = Query(None, ge=2020),
+    format: str = Query("json", pattern="^(json|ndjson|csv)$")
 ):
     """
     Chi tiết thu chi tòa nhà.
@@ -80,71 +465,32 @@ async def get_building_finance_details(
     Returns:
     - revenue_details: Chi tiết từng hóa đơn
     - expense_details: Chi tiết lương nhân viên
+    
+    format=ndjson|csv: stream từng dòng (record_type = revenue/expense),
+    bộ nhớ không phụ thuộc số lượng hóa đơn. NDJSON kết thúc bằng dòng "summary".
     """
+    if format == "ndjson":
+        return StreamingResponse(
+            ndjson_stream(_iter_finance_details(month, year, with_summary=True)),
+            media_type="application/x-ndjson"
+        )
+    
+    if format == "csv":
+        period = f"{year}-{month:02d}" if month and year else "all"
+        return StreamingResponse(
+            csv_stream(_iter_finance_details(month, year, with_summary=False), FINANCE_DETAILS_CSV_FIELDS),
+            media_type="text/csv",
+            headers={"Content-Disposition": f'attachment; filename="building-finance-details-{period}.csv"'}
+        )
+    
     try:
-        from api.database import get_pool
+        from api.database import acquire
         
-        pool = get_pool()
+        revenue_query, expense_query, params = _finance_details_queries(month, year)
         
-        # Build date filter
-        where_clause = ""
-        params = []
-        
-        if month and year:
-            where_clause = "WHERE EXTRACT(MONTH FROM i.from_date) = $1 AND EXTRACT(YEAR FROM i.from_date) = $2"
-            params = [month, year]
-        
-        # Revenue details - Join invoices with rent_contracts to get company
-        revenue_query = f"""
-            SELECT 
-                i.id as invoice_id,
-                i.total_amount,
-                i.from_date,
-                i.to_date,
-                i.status,
-                c.name as company_name,
-                c.tax_code
-            FROM invoices i
-            JOIN rent_contracts rc ON i.id = rc.invoice_id
-            JOIN companies c ON rc.company_id = c.id
-            {where_clause}
-            ORDER BY i.from_date DESC
-        """
-        
-        # Expense details (salaries)
-        expense_query = """
-            SELECT 
-                be.employee_id as id,
-                CONCAT(be.first_name, ' ', be.last_name) as full_name,
-                be.role as position,
-                be.base_salary,
-                0.05 as bonus_rate,
-                COALESCE(
-                    (SELECT SUM(cmu.price * cmu.quantity)
-                     FROM company_monthly_usages cmu
-                     WHERE cmu.service_id IN (
-                         SELECT ss.service_id 
-                         FROM service_subscribers ss 
-                         WHERE ss.employee_id = be.employee_id
-                     )), 0
-                ) as service_revenue,
-                (be.base_salary + COALESCE(
-                    (SELECT SUM(cmu.price * cmu.quantity)
-                     FROM company_monthly_usages cmu
-                     WHERE cmu.service_id IN (
-                         SELECT ss.service_id 
-                         FROM service_subscribers ss 
-                         WHERE ss.employee_id = be.employee_id
-                     )), 0
-                ) * 0.05) as total_salary
-            FROM building_employees be
-            WHERE be.status = 'working'
-            ORDER BY total_salary DESC
-        """
-        
-        async with pool.acquire() as conn:
+        async with acquire(readonly=True) as conn:
             revenue_rows = await conn.fetch(revenue_query, *params)
-            expense_rows = await conn.fetch(expense_query)
+            expense_rows = await conn.fetch(expense_query, *params)
             
             total_revenue = sum(float(row['total_amount']) for row in revenue_rows)
             total_expense = sum(float(row['total_salary']) for row in expense_rows)
@@ -155,30 +501,227 @@ async def get_building_finance_details(
                 "total_revenue": total_revenue,
                 "total_expense": total_expense,
                 "net_profit": total_revenue - total_expense,
-                "revenue_details": [
-                    {
-                        "invoice_id": row['invoice_id'],
-                        "company_name": row['company_name'],
-                        "tax_code": row['tax_code'],
-                        "total_amount": float(row['total_amount']),
-                        "from_date": row['from_date'].isoformat(),
-                        "to_date": row['to_date'].isoformat(),
-                        "status": row['status']
-                    }
-                    for row in revenue_rows
-                ],
-                "expense_details": [
-                    {
-                        "employee_id": row['id'],
-                        "full_name": row['full_name'],
-                        "position": row['position'],
-                        "base_salary": float(row['base_salary']),
-                        "bonus_rate": float(row['bonus_rate']),
-                        "service_revenue": float(row['service_revenue']),
-                        "total_salary": float(row['total_salary'])
-                    }
-                    for row in expense_rows
-                ]
+                "revenue_details": [_revenue_detail(row) for row in revenue_rows],
+                "expense_details": [_expense_detail(row) for row in expense_rows]
             }
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error: {str(e)}")
+
+
+# Costs of every company for one month in one statement ($1 = year, $2 = month, $3 = limit or NULL).
+# Same rules as /companies/{id}/monthly-costs; each source is aggregated once per company.
+COMPANY_COSTS_SQL = """
+    WITH period AS (
+        SELECT MAKE_DATE($1, $2, 1) AS start_date,
+               (MAKE_DATE($1, $2, 1) + INTERVAL '1 month')::date AS end_date
+    ),
+    rent AS (
+        SELECT rc.company_id, SUM(rc.rent_price) AS amount, SUM(o.area) AS total_area
+        FROM rent_contracts rc
+        JOIN offices o ON o.id = rc.office_id
+        CROSS JOIN period p
+        WHERE rc.status = 'active'
+            AND daterange(rc.from_date, rc.end_date, '[]') && daterange(p.start_date, p.end_date)
+        GROUP BY rc.company_id
+    ),
+    monthly AS (
+        SELECT cmu.company_id, SUM(cmu.price) AS amount
+        FROM company_monthly_usages cmu, period p
+        WHERE cmu.from_date >= p.start_date AND cmu.from_date < p.end_date
+        GROUP BY cmu.company_id
+    ),
+    daily AS (
+        SELECT ce.company_id, SUM(edu.price) AS amount
+        FROM employee_daily_usages edu
+        JOIN company_employees ce ON ce.id = edu.employee_id
+        CROSS JOIN period p
+        WHERE edu.usage_date >= p.start_date AND edu.usage_date < p.end_date
+        GROUP BY ce.company_id
+    ),
+    costs AS (
+        SELECT
+            c.id AS company_id,
+            c.name AS company_name,
+            c.tax_code,
+            COALESCE(r.total_area, 0) AS total_area,
+            COALESCE(r.amount, 0) AS rent_cost,
+            COALESCE(m.amount, 0) AS monthly_service_cost,
+            COALESCE(d.amount, 0) AS daily_service_cost,
+            COALESCE(r.amount, 0) + COALESCE(m.amount, 0) + COALESCE(d.amount, 0) AS total_cost
+        FROM companies c
+        LEFT JOIN rent r ON r.company_id = c.id
+        LEFT JOIN monthly m ON m.company_id = c.id
+        LEFT JOIN daily d ON d.company_id = c.id
+    )
+    SELECT * FROM costs
+    ORDER BY {sort} {order}, company_id
+    LIMIT $3
+"""
+
+# Per company and month over a range ($1 = first month, $2 = last month, $3 = top-N companies or NULL).
+# Companies are ranked by {rank_key} (the sort column summed over the range),
+# with a running total and month-over-month change per company.
+COMPANY_COSTS_SERIES_SQL = f"""
+    WITH {MONTHS_CTE},
+    rent AS (
+        SELECT rc.company_id, ms.month_start, SUM(rc.rent_price) AS amount, SUM(o.area) AS total_area
+        FROM months ms
+        JOIN rent_contracts rc
+            ON rc.status = 'active'
+            AND daterange(rc.from_date, rc.end_date, '[]') && daterange(ms.month_start, ms.month_end)
+        JOIN offices o ON o.id = rc.office_id
+        GROUP BY rc.company_id, ms.month_start
+    ),
+    monthly AS (
+        SELECT cmu.company_id, date_trunc('month', cmu.from_date)::date AS month_start, SUM(cmu.price) AS amount
+        FROM company_monthly_usages cmu
+        WHERE cmu.from_date >= $1::date AND cmu.from_date < ($2::date + INTERVAL '1 month')::date
+        GROUP BY 1, 2
+    ),
+    daily AS (
+        SELECT ce.company_id, date_trunc('month', edu.usage_date)::date AS month_start, SUM(edu.price) AS amount
+        FROM employee_daily_usages edu
+        JOIN company_employees ce ON ce.id = edu.employee_id
+        WHERE edu.usage_date >= $1::date AND edu.usage_date < ($2::date + INTERVAL '1 month')::date
+        GROUP BY 1, 2
+    ),
+    costs AS (
+        SELECT
+            c.id AS company_id,
+            c.name AS company_name,
+            c.tax_code,
+            ms.month_start,
+            COALESCE(r.total_area, 0) AS total_area,
+            COALESCE(r.amount, 0) AS rent_cost,
+            COALESCE(m.amount, 0) AS monthly_service_cost,
+            COALESCE(d.amount, 0) AS daily_service_cost,
+            COALESCE(r.amount, 0) + COALESCE(m.amount, 0) + COALESCE(d.amount, 0) AS total_cost
+        FROM companies c
+        CROSS JOIN months ms
+        LEFT JOIN rent r ON r.company_id = c.id AND r.month_start = ms.month_start
+        LEFT JOIN monthly m ON m.company_id = c.id AND m.month_start = ms.month_start
+        LEFT JOIN daily d ON d.company_id = c.id AND d.month_start = ms.month_start
+    ),
+    series AS (
+        SELECT
+            costs.*,
+            SUM(total_cost) OVER per_company AS cumulative_cost,
+            total_cost - LAG(total_cost) OVER per_company AS cost_change,
+            {{rank_key}} AS rank_key
+        FROM costs
+        WINDOW per_company AS (PARTITION BY company_id ORDER BY month_start ROWS UNBOUNDED PRECEDING)
+    ),
+    ranked AS (
+        SELECT series.*, DENSE_RANK() OVER (ORDER BY rank_key {{order}}, company_id) AS company_rank
+        FROM series
+    )
+    SELECT * FROM ranked
+    WHERE $3::int IS NULL OR company_rank <= $3
+    ORDER BY company_rank, month_start
+"""
+
+# Sortable columns of /reports/company-costs (whitelist: the value is put into ORDER BY)
+COMPANY_COSTS_SORTS = ("total_cost", "rent_cost", "monthly_service_cost", "daily_service_cost", "company_name", "company_id")
+
+COMPANY_COSTS_CSV_FIELDS = [
+    "company_id", "company_name", "tax_code", "total_area",
+    "rent_cost", "monthly_service_cost", "daily_service_cost", "total_cost",
+]
+
+# With from/to: one row per company and month
+COMPANY_COSTS_SERIES_CSV_FIELDS = [
+    "company_id", "company_name", "tax_code", "month", "total_area",
+    "rent_cost", "monthly_service_cost", "daily_service_cost", "total_cost",
+    "cumulative_cost", "cost_change",
+]
+
+
+def _company_costs_rank_key(sort: str) -> str:
+    """Range ranking: cost columns are summed per company, identity columns used as is."""
+    if sort in ("company_name", "company_id"):
+        return sort
+    return f"SUM({sort}) OVER (PARTITION BY company_id)"
+
+
+def _company_cost(row) -> dict:
+    """Format one company row of the company costs report."""
+    return {
+        "company_id": row['company_id'],
+        "company_name": row['company_name'],
+        "tax_code": row['tax_code'],
+        "total_area": float(row['total_area']),
+        "rent_cost": float(row['rent_cost']),
+        "monthly_service_cost": float(row['monthly_service_cost']),
+        "daily_service_cost": float(row['daily_service_cost']),
+        "total_cost": float(row['total_cost'])
+    }
+
+
+def _company_cost_month(row) -> dict:
+    """Format one (company, month) row of the company costs series."""
+    return {
+        **_company_cost(row),
+        "month": format_month(row['month_start']),
+        "cumulative_cost": float(row['cumulative_cost']),
+        "cost_change": float(row['cost_change']) if row['cost_change'] is not None else None
+    }
+
+
+async def _iter_company_costs(query: str, params: list, format_row):
+    """Yield company cost rows from a server-side cursor (constant memory for any tenant count)."""
+    from api.database import acquire
+    
+    async with acquire(readonly=True) as conn:
+        # Server-side cursors need a transaction
+        async with conn.transaction():
+            async for row in conn.cursor(query, *params, prefetch=STREAM_PREFETCH):
+                yield format_row(row)
+
+
+@router.get("/reports/company-costs")
+async def get_company_costs(
+    month: Optional[int] = Query(None, ge=1, le=12),
+    year: Optional[int] = Query(None, ge=2020),
+    from_month: Optional[str] = Query(None, alias="from", pattern=MONTH_PATTERN),
+    to_month: Optional[str] = Query(None, alias="to", pattern=MONTH_PATTERN),
+    sort: str = Query("total_cost", pattern=f"^({'|'.join(COMPANY_COSTS_SORTS)})$"),
+    order: str = Query("desc", pattern="^(asc|desc)$"),
+    limit: Optional[int] = Query(None, ge=1, description="Top-N công ty theo sort"),
+    format: str = Query("json", pattern="^(json|ndjson|csv)$")
+):
+    """
+    Chi phí tháng của tất cả công ty trong một truy vấn.
+    
+    Mỗi dòng: rent_cost, monthly_service_cost, daily_service_cost, total_cost
+    (cùng cách tính với /companies/{id}/monthly-costs). Sắp xếp theo sort/order,
+    limit lấy top-N. Kết quả được stream (json: mảng, ndjson, csv).
+    
+    from=YYYY-MM&to=YYYY-MM: mỗi công ty một dòng cho từng tháng (month), kèm
+    lũy kế (cumulative_cost) và chênh lệch so với tháng trước (cost_change);
+    sort/limit xếp hạng công ty theo tổng cả khoảng.
+    """
+    period = parse_month_range(from_month, to_month, month, year, min_year=2020)
+    if period:
+        query = COMPANY_COSTS_SERIES_SQL.format(rank_key=_company_costs_rank_key(sort), order=order.upper())
+        rows = _iter_company_costs(query, [*period, limit], _company_cost_month)
+        csv_fields = COMPANY_COSTS_SERIES_CSV_FIELDS
+        filename = f"company-costs-{format_month(period[0])}-{format_month(period[1])}.csv"
+    elif month and year:
+        query = COMPANY_COSTS_SQL.format(sort=sort, order=order.upper())
+        rows = _iter_company_costs(query, [year, month, limit], _company_cost)
+        csv_fields = COMPANY_COSTS_CSV_FIELDS
+        filename = f"company-costs-{year}-{month:02d}.csv"
+    else:
+        raise HTTPException(status_code=400, detail="Cần month và year, hoặc from và to (YYYY-MM)")
+    
+    if format == "ndjson":
+        return StreamingResponse(ndjson_stream(rows), media_type="application/x-ndjson")
+    
+    if format == "csv":
+        return StreamingResponse(
+            csv_stream(rows, csv_fields),
+            media_type="text/csv",
+            headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+        )
+    
+    return StreamingResponse(json_array_stream(rows), media_type="application/json")
@@ -0,0 +1,59 @@
+"""
+Streaming response helpers.
+Encode rows from repository async generators chunk by chunk, so large
+results are never materialized as one document in memory.
+"""
+import csv
+import io
+import json
+from typing import Any, AsyncIterator, Dict, List
+from fastapi.encoders import jsonable_encoder
+from pydantic import BaseModel
+
+
+def _to_json(item: Any) -> str:
+    """Serialize a Pydantic model or a plain dict row to JSON."""
+    if isinstance(item, BaseModel):
+        return item.model_dump_json()
+    return json.dumps(jsonable_encoder(item), ensure_ascii=False)
+
+
+async def json_array_stream(items: AsyncIterator[Any]) -> AsyncIterator[bytes]:
+    """
+    Stream items as one JSON array: [item, item, ...].
+    
+    Clients see the same payload as a regular list endpoint.
+    """
+    yield b"["
+    first = True
+    async for item in items:
+        if not first:
+            yield b","
+        yield _to_json(item).encode("utf-8")
+        first = False
+    yield b"]"
+
+
+async def ndjson_stream(items: AsyncIterator[Any]) -> AsyncIterator[bytes]:
+    """Stream items as newline-delimited JSON (one object per line)."""
+    async for item in items:
+        yield (_to_json(item) + "\n").encode("utf-8")
+
+
+async def csv_stream(items: AsyncIterator[Dict[str, Any]], fieldnames: List[str]) -> AsyncIterator[bytes]:
+    """
+    Stream dict rows as CSV with a header line.
+    
+    Keys missing from a row are written as empty cells.
+    """
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=fieldnames, extrasaction="ignore")
+    writer.writeheader()
+    async for item in items:
+        writer.writerow(jsonable_encoder(item))
+        # Flush roughly every 64 KB to keep chunks reasonably sized
+        if buffer.tell() >= 65536:
+            yield buffer.getvalue().encode("utf-8")
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue().encode("utf-8")
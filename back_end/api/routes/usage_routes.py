@@ -0,0 +1,36 @@
+"""
+Routes for service usage endpoints (bulk ingestion).
+"""
+from fastapi import APIRouter, Request
+from api.services.usage_service import UsageService
+from api.routes.bulk import bulk_rows
+
+router = APIRouter(prefix="/usages", tags=["Usages"])
+service = UsageService()
+
+
+@router.post("/daily:bulk")
+async def bulk_create_daily_usages(request: Request):
+    """
+    Nhập hàng loạt lượt dùng dịch vụ theo ngày (gửi xe, ăn trưa...).
+    
+    Body: NDJSON (mỗi dòng một object) hoặc CSV có dòng tiêu đề, cột:
+    employee_id, service_id, usage_date, price, service_type, invoice_id (tùy chọn).
+    
+    Returns:
+    - inserted: Số dòng đã nhập (COPY)
+    - failed: Số dòng bị từ chối
+    - errors: Lỗi theo dòng [{line, errors}] (tối đa BULK_MAX_ERRORS)
+    """
+    return await service.bulk_create_daily_usages(bulk_rows(request))
+
+
+@router.post("/monthly:bulk")
+async def bulk_create_monthly_usages(request: Request):
+    """
+    Nhập hàng loạt chi phí dịch vụ theo tháng của công ty.
+    
+    Body: NDJSON hoặc CSV, cột: company_id, service_id, from_date, to_date,
+    quantity, price, invoice_id (tùy chọn). Kết quả như /usages/daily:bulk.
+    """
+    return await service.bulk_create_monthly_usages(bulk_rows(request))
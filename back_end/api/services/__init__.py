@@ -3,10 +3,14 @@ from api.services.office_service import OfficeService
 from api.services.company_service import CompanyService
 from api.services.rent_contract_service import RentContractService
 from api.services.building_employee_service import BuildingEmployeeService
+from api.services.usage_service import UsageService
+from api.services.invoice_service import InvoiceService
 
 __all__ = [
     "OfficeService",
     "CompanyService",
     "RentContractService",
     "BuildingEmployeeService",
+    "UsageService",
+    "InvoiceService",
 ]
@@ -2,10 +2,21 @@
 Service layer for BuildingEmployee entity.
 Contains business logic.
 """
-from typing import List
+from datetime import date
+from typing import List, Optional
 from fastapi import HTTPException
+from api import cache
+from api.database import transaction
 from api.models.building_employee import BuildingEmployee, BuildingEmployeeCreate, BuildingEmployeeUpdate
 from api.repositories.building_employee_repository import BuildingEmployeeRepository
+from api.repositories.loaders import get_loaders
+from api.repositories.payroll_repository import PayrollRepository
+
+
+def _is_closed_month(month: int, year: int) -> bool:
+    """A month is closed once it has ended."""
+    today = date.today()
+    return (year, month) < (today.year, today.month)
 
 
 class BuildingEmployeeService:
@@ -13,11 +24,13 @@ class BuildingEmployeeService:
     
     def __init__(self):
         self.repository = BuildingEmployeeRepository()
+        self.payroll_repository = PayrollRepository()
     
     async def create_employee(self, employee: BuildingEmployeeCreate) -> BuildingEmployee:
         """Create a new building employee."""
         employee_data = employee.model_dump()
         created = await self.repository.create(employee_data)
+        await cache.invalidate("employees")
         return BuildingEmployee(**created)
     
     async def get_employee(self, employee_id: int) -> BuildingEmployee:
@@ -27,24 +40,44 @@ class BuildingEmployeeService:
             raise HTTPException(status_code=404, detail="Nhân viên không tồn tại")
         return BuildingEmployee(**employee)
     
-    async def list_employees(self, skip: int = 0, limit: int = 100) -> List[BuildingEmployee]:
+    async def get_employees_by_ids(self, employee_ids: List[int]) -> List[BuildingEmployee]:
+        """Get several employees through the request loaders, in the requested order (unknown IDs are skipped)."""
+        rows = await get_loaders().employees.load_many(employee_ids)
+        return [BuildingEmployee(**row) for row in rows if row is not None]
+    
+    async def list_employees(
+        self,
+        skip: int = 0,
+        limit: int = 100,
+        after_id: Optional[int] = None
+    ) -> List[BuildingEmployee]:
         """List all employees."""
-        employees = await self.repository.get_all(skip, limit)
+        employees = await self.repository.get_all(skip, limit, after_id)
         return [BuildingEmployee(**employee) for employee in employees]
     
+    async def get_employee_version(self, employee_id: int) -> Optional[str]:
+        """Row version for ETags (None if the employee does not exist)."""
+        return await self.repository.get_version(employee_id)
+    
+    async def get_employees_version(self) -> str:
+        """Table version for list ETags."""
+        return await self.repository.get_list_version()
+    
     async def update_employee(self, employee_id: int, employee: BuildingEmployeeUpdate) -> BuildingEmployee:
         """Update an employee."""
-        # Check if employee exists
-        existing = await self.repository.get_by_id(employee_id)
-        if not existing:
-            raise HTTPException(status_code=404, detail="Nhân viên không tồn tại")
-        
-        employee_data = employee.model_dump(exclude_unset=True)
-        updated = await self.repository.update(employee_id, employee_data)
-        
-        if not updated:
-            raise HTTPException(status_code=500, detail="Lỗi khi cập nhật nhân viên")
+        async with transaction() as conn:
+            # Check if employee exists
+            existing = await self.repository.get_by_id(employee_id, conn)
+            if not existing:
+                raise HTTPException(status_code=404, detail="Nhân viên không tồn tại")
+            
+            employee_data = employee.model_dump(exclude_unset=True)
+            updated = await self.repository.update(employee_id, employee_data, conn)
+            
+            if not updated:
+                raise HTTPException(status_code=500, detail="Lỗi khi cập nhật nhân viên")
         
+        await cache.invalidate("employees")
         return BuildingEmployee(**updated)
     
     async def delete_employee(self, employee_id: int) -> dict:
@@ -52,15 +85,58 @@ class BuildingEmployeeService:
         deleted = await self.repository.delete(employee_id)
         if not deleted:
             raise HTTPException(status_code=404, detail="Nhân viên không tồn tại")
+        # Usages recorded by the employee are deleted with them
+        await cache.invalidate("employees", "usages")
         return {"message": "Xóa nhân viên thành công"}
     
-    async def get_salaries(self, month: int, year: int) -> List[dict]:
-        """Get employee salaries for a specific month."""
+    def _validate_period(self, month: int, year: int) -> None:
         if month < 1 or month > 12:
             raise HTTPException(status_code=400, detail="Tháng không hợp lệ (1-12)")
         
         if year < 2000 or year > 2100:
             raise HTTPException(status_code=400, detail="Năm không hợp lệ")
+    
+    async def get_salaries(self, month: int, year: int) -> List[dict]:
+        """
+        Get employee salaries for a specific month.
+        
+        The current (and future) month is computed live. A closed month is read
+        from its payroll run, which is computed and stored on first access.
+        """
+        self._validate_period(month, year)
+        
+        if not _is_closed_month(month, year):
+            return await self.payroll_repository.compute(month, year)
+        
+        salaries = await self.payroll_repository.get_run(month, year)
+        if salaries:
+            return salaries
+        async with transaction() as conn:
+            return await self.payroll_repository.save_run(month, year, conn)
+    
+    async def get_salary_series(self, start: date, end: date) -> List[dict]:
+        """
+        Get employee salaries for every month from start to end (first days).
+        
+        One row per employee and month, with the running total (cumulative_salary)
+        and the change from the previous month (salary_change). Months with a
+        payroll run are read from it, the others are computed live.
+        """
+        rows = await self.payroll_repository.compute_series(start, end)
+        for row in rows:
+            month_start = row.pop("month_start")
+            row["month"] = f"{month_start.year}-{month_start.month:02d}"
+        return rows
+    
+    async def run_payroll(self, month: int, year: int) -> List[dict]:
+        """Recompute and store the payroll of a closed month (e.g. after late usages)."""
+        self._validate_period(month, year)
+        
+        if not _is_closed_month(month, year):
+            raise HTTPException(status_code=400, detail="Chỉ chốt lương cho tháng đã kết thúc")
+        
+        async with transaction() as conn:
+            salaries = await self.payroll_repository.save_run(month, year, conn, rebuild=True)
         
-        salaries = await self.repository.get_salaries(month, year)
+        await cache.invalidate("payroll")
         return salaries
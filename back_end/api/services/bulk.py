@@ -0,0 +1,120 @@
+"""
+Bulk ingestion shared by the usage and company employee loads.
+Batches are validated with the Pydantic create schemas, references are checked
+set-wise, and valid rows are loaded with COPY, all in one transaction.
+"""
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Set, Tuple, Type
+import asyncpg
+from fastapi import HTTPException
+from pydantic import BaseModel, ValidationError
+from api import cache
+from api.config import settings
+from api.database import transaction
+from api.repositories.usage_repository import UsageRepository
+
+# (line number, JSON text or already parsed dict)
+BulkRow = Tuple[int, Any]
+
+_repository = UsageRepository()
+
+
+class BulkLoad:
+    """State of one bulk request: counters, reported errors and checked references."""
+    
+    def __init__(
+        self,
+        model: Type[BaseModel],
+        columns: List[str],
+        references: Dict[str, str],
+        copy: Callable[[List[Tuple], asyncpg.Connection], Awaitable[int]],
+        tags: Tuple[str, ...]
+    ):
+        self.model = model
+        self.columns = columns
+        self.references = references
+        self.copy = copy
+        self.tags = tags
+        self.inserted = 0
+        self.failed = 0
+        self.errors: List[Dict[str, Any]] = []
+        # Per referenced table: ids already looked up / ids found
+        self.checked: Dict[str, Set[int]] = {table: set() for table in references.values()}
+        self.existing: Dict[str, Set[int]] = {table: set() for table in references.values()}
+    
+    def fail(self, line: int, messages: List[str]) -> None:
+        """Count a rejected row; keep its messages up to BULK_MAX_ERRORS."""
+        self.failed += 1
+        if len(self.errors) < settings.BULK_MAX_ERRORS:
+            self.errors.append({"line": line, "errors": messages})
+    
+    def result(self) -> dict:
+        return {
+            "inserted": self.inserted,
+            "failed": self.failed,
+            "errors": sorted(self.errors, key=lambda error: error["line"]),
+            "errors_truncated": self.failed > len(self.errors)
+        }
+
+
+async def bulk_load(rows: AsyncIterator[BulkRow], load: BulkLoad) -> dict:
+    """
+    Validate and COPY rows batch by batch in one transaction.
+    
+    Invalid rows (schema or unknown reference) are reported per line and
+    skipped; a database error rolls back the whole request.
+    """
+    try:
+        async with transaction() as conn:
+            batch: List[BulkRow] = []
+            async for row in rows:
+                batch.append(row)
+                if len(batch) >= settings.BULK_BATCH_SIZE:
+                    await _load_batch(conn, batch, load)
+                    batch = []
+            if batch:
+                await _load_batch(conn, batch, load)
+    except asyncpg.PostgresError as e:
+        raise HTTPException(status_code=400, detail=f"Lỗi khi nhập dữ liệu: {e}")
+    
+    if load.inserted:
+        await cache.invalidate(*load.tags)
+    return load.result()
+
+
+async def _load_batch(conn: asyncpg.Connection, batch: List[BulkRow], load: BulkLoad) -> None:
+    """Validate one batch, check its references with one query per table, COPY the rest."""
+    valid: List[Tuple[int, BaseModel]] = []
+    for line, raw in batch:
+        try:
+            if isinstance(raw, (str, bytes)):
+                item = load.model.model_validate_json(raw)
+            else:
+                item = load.model.model_validate(raw)
+        except ValidationError as e:
+            load.fail(line, [
+                f"{'.'.join(str(part) for part in error['loc']) or 'row'}: {error['msg']}"
+                for error in e.errors()
+            ])
+            continue
+        valid.append((line, item))
+    
+    for field, table in load.references.items():
+        ids = {getattr(item, field) for _, item in valid} - load.checked[table] - {None}
+        if ids:
+            load.existing[table] |= await _repository.existing_ids(table, ids, conn)
+            load.checked[table] |= ids
+    
+    records = []
+    for line, item in valid:
+        missing = [
+            f"{field}: {getattr(item, field)} không tồn tại"
+            for field, table in load.references.items()
+            if getattr(item, field) is not None and getattr(item, field) not in load.existing[table]
+        ]
+        if missing:
+            load.fail(line, missing)
+            continue
+        records.append(tuple(getattr(item, column) for column in load.columns))
+    
+    if records:
+        load.inserted += await load.copy(records, conn)
@@ -2,10 +2,15 @@
 Service layer for Company entity.
 Contains business logic.
 """
-from typing import List, Optional
+from typing import AsyncIterator, List, Optional
 from fastapi import HTTPException
+from api import cache
+from api.database import acquire, transaction
 from api.models.company import Company, CompanyCreate, CompanyUpdate
-from api.repositories.company_repository import CompanyRepository
+from api.models.company_employee import CompanyEmployeeCreate
+from api.repositories.company_repository import CompanyRepository, EMPLOYEE_COLUMNS
+from api.repositories.loaders import get_loaders
+from api.services.bulk import BulkLoad, BulkRow, bulk_load
 
 
 class CompanyService:
@@ -16,16 +21,18 @@ class CompanyService:
     
     async def create_company(self, company: CompanyCreate) -> Company:
         """Create a new company."""
-        # Check if tax_code already exists
-        existing = await self.repository.get_by_tax_code(company.tax_code)
-        if existing:
-            raise HTTPException(
-                status_code=400, 
-                detail=f"Mã số thuế {company.tax_code} đã tồn tại"
-            )
-        
-        company_data = company.model_dump()
-        created = await self.repository.create(company_data)
+        async with transaction() as conn:
+            # Check if tax_code already exists
+            existing = await self.repository.get_by_tax_code(company.tax_code, conn)
+            if existing:
+                raise HTTPException(
+                    status_code=400, 
+                    detail=f"Mã số thuế {company.tax_code} đã tồn tại"
+                )
+            
+            company_data = company.model_dump()
+            created = await self.repository.create(company_data, conn)
+        await cache.invalidate("companies")
         return Company(**created)
     
     async def get_company(self, company_id: int) -> Company:
@@ -35,33 +42,53 @@ class CompanyService:
             raise HTTPException(status_code=404, detail="Công ty không tồn tại")
         return Company(**company)
     
-    async def list_companies(self, skip: int = 0, limit: int = 100) -> List[Company]:
+    async def get_companies_by_ids(self, company_ids: List[int]) -> List[Company]:
+        """Get several companies through the request loaders, in the requested order (unknown IDs are skipped)."""
+        rows = await get_loaders().companies.load_many(company_ids)
+        return [Company(**row) for row in rows if row is not None]
+    
+    async def list_companies(
+        self,
+        skip: int = 0,
+        limit: int = 100,
+        after_id: Optional[int] = None
+    ) -> List[Company]:
         """List all companies."""
-        companies = await self.repository.get_all(skip, limit)
+        companies = await self.repository.get_all(skip, limit, after_id)
         return [Company(**company) for company in companies]
     
+    async def get_company_version(self, company_id: int) -> Optional[str]:
+        """Row version for ETags (None if the company does not exist)."""
+        return await self.repository.get_version(company_id)
+    
+    async def get_companies_version(self) -> str:
+        """Table version for list ETags."""
+        return await self.repository.get_list_version()
+    
     async def update_company(self, company_id: int, company: CompanyUpdate) -> Company:
         """Update a company."""
-        # Check if company exists
-        existing = await self.repository.get_by_id(company_id)
-        if not existing:
-            raise HTTPException(status_code=404, detail="Công ty không tồn tại")
-        
-        # Check if new tax_code conflicts
-        if company.tax_code:
-            existing_tax = await self.repository.get_by_tax_code(company.tax_code)
-            if existing_tax and existing_tax["id"] != company_id:
-                raise HTTPException(
-                    status_code=400,
-                    detail=f"Mã số thuế {company.tax_code} đã tồn tại"
-                )
-        
-        company_data = company.model_dump(exclude_unset=True)
-        updated = await self.repository.update(company_id, company_data)
-        
-        if not updated:
-            raise HTTPException(status_code=500, detail="Lỗi khi cập nhật công ty")
+        async with transaction() as conn:
+            # Check if company exists
+            existing = await self.repository.get_by_id(company_id, conn)
+            if not existing:
+                raise HTTPException(status_code=404, detail="Công ty không tồn tại")
+            
+            # Check if new tax_code conflicts
+            if company.tax_code:
+                existing_tax = await self.repository.get_by_tax_code(company.tax_code, conn)
+                if existing_tax and existing_tax["id"] != company_id:
+                    raise HTTPException(
+                        status_code=400,
+                        detail=f"Mã số thuế {company.tax_code} đã tồn tại"
+                    )
+            
+            company_data = company.model_dump(exclude_unset=True)
+            updated = await self.repository.update(company_id, company_data, conn)
+            
+            if not updated:
+                raise HTTPException(status_code=500, detail="Lỗi khi cập nhật công ty")
         
+        await cache.invalidate("companies")
         return Company(**updated)
     
     async def delete_company(self, company_id: int) -> dict:
@@ -69,24 +96,39 @@ class CompanyService:
         deleted = await self.repository.delete(company_id)
         if not deleted:
             raise HTTPException(status_code=404, detail="Công ty không tồn tại")
+        # Contracts, usages and invoices of the company are deleted with it
+        await cache.invalidate("companies", "contracts", "usages", "invoices")
         return {"message": "Xóa công ty thành công"}
     
+    async def bulk_create_employees(self, rows: AsyncIterator[BulkRow]) -> dict:
+        """Load company employees in bulk (validated per row, COPY per batch)."""
+        load = BulkLoad(
+            CompanyEmployeeCreate,
+            EMPLOYEE_COLUMNS,
+            {"company_id": "companies"},
+            self.repository.copy_employees,
+            ("companies",)
+        )
+        return await bulk_load(rows, load)
+    
     async def get_monthly_costs(self, company_id: int, month: int, year: int) -> dict:
         """Get company's monthly costs."""
-        # Check if company exists
-        company = await self.repository.get_by_id(company_id)
-        if not company:
-            raise HTTPException(status_code=404, detail="Công ty không tồn tại")
-        
-        costs = await self.repository.get_monthly_costs(company_id, month, year)
+        async with acquire(readonly=True) as conn:
+            # Check if company exists
+            company = await self.repository.get_by_id(company_id, conn)
+            if not company:
+                raise HTTPException(status_code=404, detail="Công ty không tồn tại")
+            
+            costs = await self.repository.get_monthly_costs(company_id, month, year, conn)
         return costs
     
     async def get_service_details(self, company_id: int, month: int, year: int) -> dict:
         """Get detailed service usage and costs for a company."""
-        # Check if company exists
-        company = await self.repository.get_by_id(company_id)
-        if not company:
-            raise HTTPException(status_code=404, detail="Công ty không tồn tại")
-        
-        details = await self.repository.get_service_details(company_id, month, year)
+        async with acquire(readonly=True) as conn:
+            # Check if company exists
+            company = await self.repository.get_by_id(company_id, conn)
+            if not company:
+                raise HTTPException(status_code=404, detail="Công ty không tồn tại")
+            
+            details = await self.repository.get_service_details(company_id, month, year, conn)
         return details
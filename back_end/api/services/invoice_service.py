@@ -0,0 +1,78 @@
+"""
+Service layer for Invoice entity.
+Month-close invoice generation, run as concurrent per-shard transactions.
+"""
+import asyncio
+from datetime import date
+from fastapi import HTTPException
+from api import cache
+from api.config import settings
+from api.database import transaction
+from api.repositories.invoice_repository import InvoiceRepository
+
+
+class InvoiceService:
+    """Service for Invoice business logic."""
+    
+    def __init__(self):
+        self.repository = InvoiceRepository()
+    
+    async def generate_invoices(self, month: int, year: int) -> dict:
+        """
+        Generate the invoices of a month for all companies.
+        
+        Companies are split into INVOICE_JOB_SHARDS shards (company_id % shards),
+        each committed in its own transaction, at most INVOICE_JOB_CONCURRENCY at
+        a time. Idempotent: a rerun skips unchanged invoices, refreshes unpaid
+        ones and only links usages that are not billed yet, so a month that
+        failed halfway can simply be run again.
+        """
+        if month < 1 or month > 12:
+            raise HTTPException(status_code=400, detail="Tháng không hợp lệ (1-12)")
+        
+        if year < 2000 or year > 2100:
+            raise HTTPException(status_code=400, detail="Năm không hợp lệ")
+        
+        today = date.today()
+        if (year, month) > (today.year, today.month):
+            raise HTTPException(status_code=400, detail="Không thể lập hóa đơn cho tháng trong tương lai")
+        
+        shards = settings.INVOICE_JOB_SHARDS
+        semaphore = asyncio.Semaphore(settings.INVOICE_JOB_CONCURRENCY)
+        
+        async def run_shard(shard: int) -> dict:
+            async with semaphore:
+                async with transaction() as conn:
+                    return await self.repository.generate_shard(month, year, shards, shard, conn)
+        
+        results = await asyncio.gather(*(run_shard(shard) for shard in range(shards)), return_exceptions=True)
+        
+        summary = {
+            "month": month,
+            "year": year,
+            "shards": shards,
+            "shards_failed": 0,
+            "invoices_created": 0,
+            "invoices_updated": 0,
+            "monthly_usages_linked": 0,
+            "daily_usages_linked": 0
+        }
+        errors = []
+        for result in results:
+            if isinstance(result, BaseException):
+                summary["shards_failed"] += 1
+                errors.append(result)
+                continue
+            for key, value in result.items():
+                summary[key] += value
+        
+        # Committed shards are visible even if others failed
+        if summary["invoices_created"] or summary["invoices_updated"]:
+            await cache.invalidate("invoices")
+        
+        if errors:
+            raise HTTPException(
+                status_code=500,
+                detail=f"Lập hóa đơn lỗi ở {len(errors)}/{shards} nhóm công ty, chạy lại để hoàn tất: {errors[0]}"
+            )
+        return summary
@@ -2,10 +2,15 @@
 Service layer for Office entity.
 Contains business logic.
 """
-from typing import List, Optional
+from typing import List, Optional, AsyncIterator
+from datetime import date
+from decimal import Decimal
 from fastapi import HTTPException
+from api import cache
+from api.database import transaction
 from api.models.office import Office, OfficeCreate, OfficeUpdate
 from api.repositories.office_repository import OfficeRepository
+from api.repositories.loaders import get_loaders
 
 
 class OfficeService:
@@ -18,6 +23,7 @@ class OfficeService:
         """Create a new office."""
         office_data = office.model_dump()
         created = await self.repository.create(office_data)
+        await cache.invalidate("offices")
         return Office(**created)
     
     async def get_office(self, office_id: int) -> Office:
@@ -27,24 +33,44 @@ class OfficeService:
             raise HTTPException(status_code=404, detail="Văn phòng không tồn tại")
         return Office(**office)
     
-    async def list_offices(self, skip: int = 0, limit: int = 100) -> List[Office]:
+    async def get_offices_by_ids(self, office_ids: List[int]) -> List[Office]:
+        """Get several offices through the request loaders, in the requested order (unknown IDs are skipped)."""
+        rows = await get_loaders().offices.load_many(office_ids)
+        return [Office(**row) for row in rows if row is not None]
+    
+    async def list_offices(
+        self,
+        skip: int = 0,
+        limit: int = 100,
+        after_id: Optional[int] = None
+    ) -> List[Office]:
         """List all offices."""
-        offices = await self.repository.get_all(skip, limit)
+        offices = await self.repository.get_all(skip, limit, after_id)
         return [Office(**office) for office in offices]
     
+    async def get_office_version(self, office_id: int) -> Optional[str]:
+        """Row version for ETags (None if the office does not exist)."""
+        return await self.repository.get_version(office_id)
+    
+    async def get_offices_version(self) -> str:
+        """Table version for list ETags."""
+        return await self.repository.get_list_version()
+    
     async def update_office(self, office_id: int, office: OfficeUpdate) -> Office:
         """Update an office."""
-        # Check if office exists
-        existing = await self.repository.get_by_id(office_id)
-        if not existing:
-            raise HTTPException(status_code=404, detail="Văn phòng không tồn tại")
-        
-        office_data = office.model_dump(exclude_unset=True)
-        updated = await self.repository.update(office_id, office_data)
-        
-        if not updated:
-            raise HTTPException(status_code=500, detail="Lỗi khi cập nhật văn phòng")
+        async with transaction() as conn:
+            # Check if office exists
+            existing = await self.repository.get_by_id(office_id, conn)
+            if not existing:
+                raise HTTPException(status_code=404, detail="Văn phòng không tồn tại")
+            
+            office_data = office.model_dump(exclude_unset=True)
+            updated = await self.repository.update(office_id, office_data, conn)
+            
+            if not updated:
+                raise HTTPException(status_code=500, detail="Lỗi khi cập nhật văn phòng")
         
+        await cache.invalidate("offices")
         return Office(**updated)
     
     async def delete_office(self, office_id: int) -> dict:
@@ -52,4 +78,23 @@ class OfficeService:
         deleted = await self.repository.delete(office_id)
         if not deleted:
             raise HTTPException(status_code=404, detail="Văn phòng không tồn tại")
+        # Contracts of the office are deleted with it
+        await cache.invalidate("offices", "contracts")
         return {"message": "Xóa văn phòng thành công"}
+    
+    async def list_available_offices(
+        self,
+        from_date: date,
+        to_date: date,
+        min_area: Optional[Decimal] = None,
+        floor: Optional[int] = None
+    ) -> AsyncIterator[Office]:
+        """List offices free for the whole period (streamed)."""
+        if to_date < from_date:
+            raise HTTPException(status_code=400, detail="Ngày kết thúc phải sau ngày bắt đầu")
+        
+        async def stream() -> AsyncIterator[Office]:
+            async for office in self.repository.iter_available(from_date, to_date, min_area, floor):
+                yield Office(**office)
+        
+        return stream()
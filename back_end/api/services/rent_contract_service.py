@@ -2,12 +2,15 @@
 Service layer for RentContract entity.
 Contains business logic.
 """
-from typing import List
+from typing import List, Optional
+import asyncio
+import asyncpg
 from fastapi import HTTPException
+from api import cache
+from api.database import transaction
 from api.models.rent_contract import RentContract, RentContractCreate, RentContractUpdate
 from api.repositories.rent_contract_repository import RentContractRepository
-from api.repositories.office_repository import OfficeRepository
-from api.repositories.company_repository import CompanyRepository
+from api.repositories.loaders import get_loaders
 
 
 class RentContractService:
@@ -15,36 +18,35 @@ class RentContractService:
     
     def __init__(self):
         self.repository = RentContractRepository()
-        self.office_repository = OfficeRepository()
-        self.company_repository = CompanyRepository()
     
     async def create_contract(self, contract: RentContractCreate) -> RentContract:
-        """Create a new rent contract."""
-        # Validate office exists
-        office = await self.office_repository.get_by_id(contract.office_id)
-        if not office:
-            raise HTTPException(status_code=404, detail="Văn phòng không tồn tại")
-        
-        # Validate company exists
-        company = await self.company_repository.get_by_id(contract.company_id)
-        if not company:
-            raise HTTPException(status_code=404, detail="Công ty không tồn tại")
-        
-        # Check office availability (no overlap with existing active contracts)
-        is_available = await self.office_repository.check_availability(
-            contract.office_id,
-            str(contract.from_date),
-            str(contract.end_date)
-        )
-        
-        if not is_available:
-            raise HTTPException(
-                status_code=400,
-                detail="Văn phòng đã được thuê trong khoảng thời gian này"
+        """Create a new rent contract (lookups and insert on one connection, one transaction)."""
+        async with transaction() as conn:
+            # Validate office and company exist (batched loaders bound to the transaction)
+            loaders = get_loaders(conn=conn)
+            office, company = await asyncio.gather(
+                loaders.offices.load(contract.office_id),
+                loaders.companies.load(contract.company_id)
             )
-        
-        contract_data = contract.model_dump()
-        created = await self.repository.create(contract_data)
+            if not office:
+                raise HTTPException(status_code=404, detail="Văn phòng không tồn tại")
+            if not company:
+                raise HTTPException(status_code=404, detail="Công ty không tồn tại")
+            
+            # Office availability is enforced by the exclusion constraint
+            # rent_contracts_office_no_overlap (no overlap with active contracts)
+            contract_data = contract.model_dump()
+            try:
+                created = await self.repository.create(contract_data, conn)
+            except asyncpg.exceptions.ExclusionViolationError:
+                raise HTTPException(
+                    status_code=400,
+                    detail="Văn phòng đã được thuê trong khoảng thời gian này"
+                )
+            except asyncpg.exceptions.ForeignKeyViolationError:
+                # Office or company deleted after the check above
+                raise HTTPException(status_code=404, detail="Văn phòng hoặc công ty không tồn tại")
+        await cache.invalidate("contracts")
         return RentContract(**created)
     
     async def get_contract(self, contract_id: int) -> RentContract:
@@ -54,9 +56,19 @@ class RentContractService:
             raise HTTPException(status_code=404, detail="Hợp đồng không tồn tại")
         return RentContract(**contract)
     
-    async def list_contracts(self, skip: int = 0, limit: int = 100) -> List[RentContract]:
+    async def get_contracts_by_ids(self, contract_ids: List[int]) -> List[RentContract]:
+        """Get several contracts through the request loaders, in the requested order (unknown IDs are skipped)."""
+        rows = await get_loaders().contracts.load_many(contract_ids)
+        return [RentContract(**row) for row in rows if row is not None]
+    
+    async def list_contracts(
+        self,
+        skip: int = 0,
+        limit: int = 100,
+        after_id: Optional[int] = None
+    ) -> List[RentContract]:
         """List all contracts."""
-        contracts = await self.repository.get_all(skip, limit)
+        contracts = await self.repository.get_all(skip, limit, after_id)
         return [RentContract(**contract) for contract in contracts]
     
     async def get_contracts_by_company(self, company_id: int) -> List[RentContract]:
@@ -64,38 +76,36 @@ class RentContractService:
         contracts = await self.repository.get_by_company(company_id)
         return [RentContract(**contract) for contract in contracts]
     
+    async def get_contract_version(self, contract_id: int) -> Optional[str]:
+        """Row version for ETags (None if the contract does not exist)."""
+        return await self.repository.get_version(contract_id)
+    
+    async def get_contracts_version(self) -> str:
+        """Table version for list ETags."""
+        return await self.repository.get_list_version()
+    
     async def update_contract(self, contract_id: int, contract: RentContractUpdate) -> RentContract:
-        """Update a contract."""
-        # Check if contract exists
-        existing = await self.repository.get_by_id(contract_id)
-        if not existing:
-            raise HTTPException(status_code=404, detail="Hợp đồng không tồn tại")
-        
-        # If dates are being updated, check availability
-        if contract.from_date or contract.end_date or contract.office_id:
-            from_date = contract.from_date or existing["from_date"]
-            end_date = contract.end_date or existing["end_date"]
-            office_id = contract.office_id or existing["office_id"]
+        """Update a contract (one connection, one transaction)."""
+        async with transaction() as conn:
+            # Check if contract exists
+            existing = await self.repository.get_by_id(contract_id, conn)
+            if not existing:
+                raise HTTPException(status_code=404, detail="Hợp đồng không tồn tại")
             
-            is_available = await self.office_repository.check_availability(
-                office_id,
-                str(from_date),
-                str(end_date),
-                exclude_contract_id=contract_id
-            )
-            
-            if not is_available:
+            # Changed dates/office are checked by rent_contracts_office_no_overlap
+            contract_data = contract.model_dump(exclude_unset=True)
+            try:
+                updated = await self.repository.update(contract_id, contract_data, conn)
+            except asyncpg.exceptions.ExclusionViolationError:
                 raise HTTPException(
                     status_code=400,
                     detail="Văn phòng đã được thuê trong khoảng thời gian này"
                 )
+            
+            if not updated:
+                raise HTTPException(status_code=500, detail="Lỗi khi cập nhật hợp đồng")
         
-        contract_data = contract.model_dump(exclude_unset=True)
-        updated = await self.repository.update(contract_id, contract_data)
-        
-        if not updated:
-            raise HTTPException(status_code=500, detail="Lỗi khi cập nhật hợp đồng")
-        
+        await cache.invalidate("contracts")
         return RentContract(**updated)
     
     async def delete_contract(self, contract_id: int) -> dict:
@@ -103,4 +113,5 @@ class RentContractService:
         deleted = await self.repository.delete(contract_id)
         if not deleted:
             raise HTTPException(status_code=404, detail="Hợp đồng không tồn tại")
+        await cache.invalidate("contracts")
         return {"message": "Xóa hợp đồng thành công"}
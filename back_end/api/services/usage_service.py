@@ -0,0 +1,39 @@
+"""
+Service layer for service usages.
+Bulk ingestion goes through api/services/bulk.py (validation, set-wise
+reference checks, COPY).
+"""
+from typing import AsyncIterator
+from api.models.employee_daily_usage import EmployeeDailyUsageCreate
+from api.models.company_monthly_usage import CompanyMonthlyUsageCreate
+from api.repositories.usage_repository import UsageRepository, DAILY_USAGE_COLUMNS, MONTHLY_USAGE_COLUMNS
+from api.services.bulk import BulkLoad, BulkRow, bulk_load
+
+
+class UsageService:
+    """Service for usage business logic."""
+    
+    def __init__(self):
+        self.repository = UsageRepository()
+    
+    async def bulk_create_daily_usages(self, rows: AsyncIterator[BulkRow]) -> dict:
+        """Load employee daily usages (parking, meals...) in bulk."""
+        load = BulkLoad(
+            EmployeeDailyUsageCreate,
+            DAILY_USAGE_COLUMNS,
+            {"employee_id": "company_employees", "service_id": "services", "invoice_id": "invoices"},
+            self.repository.copy_daily_usages,
+            ("usages",)
+        )
+        return await bulk_load(rows, load)
+    
+    async def bulk_create_monthly_usages(self, rows: AsyncIterator[BulkRow]) -> dict:
+        """Load company monthly usages in bulk."""
+        load = BulkLoad(
+            CompanyMonthlyUsageCreate,
+            MONTHLY_USAGE_COLUMNS,
+            {"company_id": "companies", "service_id": "services", "invoice_id": "invoices"},
+            self.repository.copy_monthly_usages,
+            ("usages",)
+        )
+        return await bulk_load(rows, load)
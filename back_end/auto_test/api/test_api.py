@@ -21,9 +21,11 @@ Cách dùng:
     await tests.teardown()
 """
 import asyncio
+import base64
 import sys
 import os
 import json
+from datetime import date
 
 # Add parent directory to path
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../../')))
@@ -53,6 +55,28 @@ ALL_TESTS = [
     "test_company_service_details",
     "test_building_finance",
     "test_building_finance_details",
+    "test_create_overlapping_contract",
+    "test_available_offices",
+    "test_keyset_pagination",
+    "test_building_finance_details_export",
+    "test_building_finance_rollup",
+    "test_building_finance_breakdown",
+    "test_statement_cache",
+    "test_pool_stats",
+    "test_replica_routing",
+    "test_metrics_endpoint",
+    "test_report_cache",
+    "test_conditional_get",
+    "test_bulk_daily_usages",
+    "test_batch_get_by_ids",
+    "test_contract_validation_loaders",
+    "test_payroll_runs",
+    "test_generate_invoices",
+    "test_company_costs_report",
+    "test_report_month_ranges",
+    "test_slow_query_log_rules",
+    "test_bulk_company_employees",
+    "test_request_loaders",
 ]
 
 
@@ -475,6 +499,785 @@ class APITests:
                 self.assert_true("employee_name" in exp, "expense detail has 'employee_name'")
                 self.assert_true("total_salary" in exp, "expense detail has 'total_salary'")
     
+    async def test_create_overlapping_contract(self):
+        """Test 19: Overlapping contract is rejected with 400."""
+        print("\n🧪 Test 19: Create Overlapping Contract")
+        
+        # Office 1 is rented by company 1 from 2025-11-01 to 2026-10-31
+        contract_data = {
+            "office_id": 1,
+            "company_id": 2,
+            "from_date": "2026-03-01",
+            "end_date": "2026-08-31",
+            "rent_price": 15000000
+        }
+        
+        response = await self.client.post(f"{self.base_url}/contracts", json=contract_data)
+        self.assert_status(response, 400, "Overlapping contract returns 400")
+        
+        if response.status_code == 201:
+            # Cleanup if the constraint did not fire
+            await self.client.delete(f"{self.base_url}/contracts/{response.json()['id']}")
+    
+    async def test_available_offices(self):
+        """Test 20: Batch office availability search."""
+        print("\n🧪 Test 20: Available Offices")
+        
+        response = await self.client.get(
+            f"{self.base_url}/offices/available?from=2026-01-01&to=2026-01-31"
+        )
+        self.assert_status(response, 200, "Available offices returns 200")
+        
+        if response.status_code == 200:
+            data = response.json()
+            ids = [office["id"] for office in data]
+            self.assert_true(isinstance(data, list), "Response is a list")
+            # Offices 1, 2, 3, 5 have active contracts in January 2026
+            self.assert_true(1 not in ids and 5 not in ids, "Rented offices excluded")
+            self.assert_true(4 in ids and 6 in ids, "Free offices included")
+        
+        response = await self.client.get(
+            f"{self.base_url}/offices/available?from=2026-01-01&to=2026-01-31&floor=2&min_area=70"
+        )
+        if response.status_code == 200:
+            data = response.json()
+            self.assert_true(
+                all(o["floor"] == 2 and float(o["area"]) >= 70 for o in data),
+                "floor/min_area filters applied"
+            )
+        
+        response = await self.client.get(
+            f"{self.base_url}/offices/available?from=2026-02-01&to=2026-01-01"
+        )
+        self.assert_status(response, 400, "Reversed period returns 400")
+    
+    async def test_keyset_pagination(self):
+        """Test 21: Keyset (cursor) pagination."""
+        print("\n🧪 Test 21: Keyset Pagination")
+        
+        response = await self.client.get(f"{self.base_url}/offices?limit=2")
+        self.assert_status(response, 200, "First page returns 200")
+        cursor = response.headers.get("X-Next-Cursor")
+        self.assert_true(cursor is not None, "First page has X-Next-Cursor header")
+        
+        if response.status_code == 200 and cursor:
+            first_ids = [office["id"] for office in response.json()]
+            
+            response = await self.client.get(f"{self.base_url}/offices?limit=2&cursor={cursor}")
+            self.assert_status(response, 200, "Next page returns 200")
+            next_ids = [office["id"] for office in response.json()]
+            self.assert_true(
+                len(next_ids) > 0 and min(next_ids) > max(first_ids),
+                f"Next page continues after last id ({first_ids} → {next_ids})"
+            )
+            
+            response = await self.client.get(f"{self.base_url}/offices?limit=2&after_id={max(first_ids)}")
+            self.assert_true(
+                [office["id"] for office in response.json()] == next_ids,
+                "after_id gives the same page as cursor"
+            )
+        
+        response = await self.client.get(f"{self.base_url}/offices?cursor=not-a-cursor")
+        self.assert_status(response, 400, "Invalid cursor returns 400")
+        for after_id in (True, 2**31, 0):
+            forged = base64.urlsafe_b64encode(json.dumps({"after_id": after_id}).encode()).decode().rstrip("=")
+            response = await self.client.get(f"{self.base_url}/offices?cursor={forged}")
+            self.assert_status(response, 400, f"Cursor with after_id={after_id} returns 400")
+    
+    async def test_building_finance_details_export(self):
+        """Test 22: Streaming NDJSON/CSV export of finance details."""
+        print("\n🧪 Test 22: Building Finance Details Export")
+        
+        url = f"{self.base_url}/reports/building-finance/details?month=1&year=2026"
+        
+        response = await self.client.get(f"{url}&format=ndjson")
+        self.assert_status(response, 200, "NDJSON export returns 200")
+        if response.status_code == 200:
+            records = [json.loads(line) for line in response.text.splitlines() if line]
+            self.assert_true(len(records) > 0, "NDJSON has records")
+            self.assert_true(records[-1]["record_type"] == "summary", "NDJSON ends with summary record")
+        
+        response = await self.client.get(f"{url}&format=csv")
+        self.assert_status(response, 200, "CSV export returns 200")
+        if response.status_code == 200:
+            header = response.text.splitlines()[0]
+            self.assert_true(header.startswith("record_type,"), "CSV has header line")
+            self.assert_true("text/csv" in response.headers.get("content-type", ""), "CSV content type")
+        
+        response = await self.client.get(f"{url}&format=xml")
+        self.assert_status(response, 422, "Unknown format returns 422")
+    
+    async def test_building_finance_rollup(self):
+        """Test 23: Rollup-backed finance report matches fresh computation."""
+        print("\n🧪 Test 23: Building Finance Rollup")
+        
+        for query in ("month=1&year=2026", "month=12&year=2025", ""):
+            rollup = await self.client.get(f"{self.base_url}/reports/building-finance?{query}")
+            fresh = await self.client.get(f"{self.base_url}/reports/building-finance?{query}&fresh=true")
+            self.assert_status(fresh, 200, f"fresh=true returns 200 ({query or 'all'})")
+            
+            if rollup.status_code == 200 and fresh.status_code == 200:
+                self.assert_true(
+                    abs(rollup.json()["total_revenue"] - fresh.json()["total_revenue"]) < 0.01,
+                    f"Rollup revenue equals fresh revenue ({query or 'all'})"
+                )
+    
+    async def test_building_finance_breakdown(self):
+        """Test 24: Revenue breakdown comes from contracts and usages, not a fixed split."""
+        print("\n🧪 Test 24: Building Finance Revenue Breakdown")
+        
+        for query in ("month=1&year=2026", "month=12&year=2025", ""):
+            rollup = await self.client.get(f"{self.base_url}/reports/building-finance?{query}")
+            fresh = await self.client.get(f"{self.base_url}/reports/building-finance?{query}&fresh=true")
+            self.assert_status(rollup, 200, f"Building finance returns 200 ({query or 'all'})")
+            
+            if rollup.status_code == 200 and fresh.status_code == 200:
+                breakdown = rollup.json()["revenue_breakdown"]
+                self.assert_true(
+                    abs(breakdown["services"] - breakdown["monthly_services"] - breakdown["daily_services"]) < 0.01,
+                    f"Services = monthly + daily ({query or 'all'})"
+                )
+                self.assert_true(
+                    all(abs(breakdown[key] - fresh.json()["revenue_breakdown"][key]) < 0.01 for key in breakdown),
+                    f"Rollup breakdown equals fresh breakdown ({query or 'all'})"
+                )
+                self.assert_true(
+                    abs(breakdown["rent"] + breakdown["services"] - rollup.json()["total_revenue"]) < 0.01,
+                    f"Rent + services = total_revenue ({query or 'all'})"
+                )
+        
+        # After month close, the invoices bill exactly the revenue lines of the breakdown
+        response = await self.client.post(f"{self.base_url}/invoices/generate?month=2&year=2026")
+        self.assert_status(response, 200, "Invoices generated for 02/2026")
+        for query in ("month=2&year=2026", "month=2&year=2026&fresh=true"):
+            data = (await self.client.get(f"{self.base_url}/reports/building-finance?{query}")).json()
+            breakdown = data["revenue_breakdown"]
+            self.assert_true(
+                abs(breakdown["rent"] + breakdown["services"] - data["total_revenue"]) < 0.01
+                and abs(data["invoiced_revenue"] - data["total_revenue"]) < 0.01 and data["total_revenue"] > 0,
+                f"Generated month: rent + services = total_revenue = invoiced_revenue ({query})"
+            )
+        
+        # Rent for a month equals the active contracts overlapping it
+        response = await self.client.get(f"{self.base_url}/reports/building-finance?month=1&year=2026")
+        contracts = await self.client.get(f"{self.base_url}/contracts?limit=1000")
+        if response.status_code == 200 and contracts.status_code == 200:
+            expected_rent = sum(
+                float(c["rent_price"]) for c in contracts.json()
+                if c["status"] == "active" and c["from_date"] <= "2026-01-31" and c["end_date"] >= "2026-01-01"
+            )
+            self.assert_true(
+                abs(response.json()["revenue_breakdown"]["rent"] - expected_rent) < 0.01,
+                f"Rent for 01/2026 matches active contracts ({expected_rent:,.0f})"
+            )
+    
+    async def test_statement_cache(self):
+        """Test 25: CRUD calls reuse statements prepared on connection init."""
+        print("\n🧪 Test 25: Prepared Statement Cache")
+        
+        before = await self.client.get(f"{self.base_url}/internal/statements")
+        self.assert_status(before, 200, "Statement stats returns 200")
+        if before.status_code != 200:
+            return
+        
+        self.assert_true(before.json()["registered"] > 0, "Repository queries are registered")
+        
+        for _ in range(5):
+            await self.client.get(f"{self.base_url}/offices/1")
+        # Partial update goes through the canonical UPDATE statement
+        office = (await self.client.get(f"{self.base_url}/offices/1")).json()
+        response = await self.client.put(f"{self.base_url}/offices/1", json={"floor": office["floor"]})
+        self.assert_status(response, 200, "Partial update returns 200")
+        if response.status_code == 200:
+            self.assert_true(response.json()["name"] == office["name"], "Fields not sent keep their value")
+        
+        after = (await self.client.get(f"{self.base_url}/internal/statements")).json()
+        self.assert_true(
+            after["hits"] - before.json()["hits"] >= 7,
+            f"Statement cache hits grow ({before.json()['hits']} → {after['hits']})"
+        )
+        self.assert_true(after["misses"] == before.json()["misses"], "No statement cache misses")
+    
+    async def test_pool_stats(self):
+        """Test 26: Pool endpoint reports usage and acquire wait histogram."""
+        print("\n🧪 Test 26: Connection Pool Stats")
+        
+        before = await self.client.get(f"{self.base_url}/internal/pool")
+        self.assert_status(before, 200, "Pool stats returns 200")
+        if before.status_code != 200:
+            return
+        
+        await asyncio.gather(*[self.client.get(f"{self.base_url}/offices/1") for _ in range(10)])
+        
+        stats = (await self.client.get(f"{self.base_url}/internal/pool")).json()
+        self.assert_true(stats["in_use"] + stats["idle"] == stats["size"], "in_use + idle = size")
+        self.assert_true(stats["min_size"] <= stats["size"] <= stats["max_size"], "Pool size within limits")
+        
+        # Reads may be served by the replica pool
+        def total_acquires(data):
+            return data["acquires"] + (data["replica"]["acquires"] if data["replica"] else 0)
+        
+        self.assert_true(
+            total_acquires(stats) - total_acquires(before.json()) >= 10,
+            f"Acquires counted ({total_acquires(before.json())} → {total_acquires(stats)})"
+        )
+        self.assert_true(
+            stats["acquire_wait_ms"]["buckets"]["+Inf"] == stats["acquires"],
+            "Histogram covers every acquire"
+        )
+    
+    async def test_replica_routing(self):
+        """Test 27: Reads use the replica when configured, writes stay on the primary."""
+        print("\n🧪 Test 27: Read Replica Routing")
+        
+        before = (await self.client.get(f"{self.base_url}/internal/pool")).json()
+        await self.client.get(f"{self.base_url}/offices/1")
+        await self.client.get(f"{self.base_url}/reports/building-finance?month=1&year=2026&fresh=true")
+        office = (await self.client.get(f"{self.base_url}/offices/1")).json()
+        response = await self.client.put(f"{self.base_url}/offices/1", json={"floor": office["floor"]})
+        self.assert_status(response, 200, "Update returns 200")
+        after = (await self.client.get(f"{self.base_url}/internal/pool")).json()
+        
+        if after["replica"] is None:
+            self.assert_true(after["acquires"] - before["acquires"] >= 4, "No replica: everything on the primary")
+            return
+        
+        replica_reads = after["replica"]["acquires"] - before["replica"]["acquires"]
+        served_by_primary = after["replica"]["fallbacks"] - before["replica"]["fallbacks"]
+        self.assert_true(
+            replica_reads + served_by_primary >= 3,
+            f"Reads routed to replica ({replica_reads}) or fell back ({served_by_primary})"
+        )
+        self.assert_true(after["acquires"] - before["acquires"] >= 1, "Update acquired from the primary")
+    
+    async def test_metrics_endpoint(self):
+        """Test 28: /metrics exposes route latency and per-repository SQL timing."""
+        print("\n🧪 Test 28: Prometheus Metrics")
+        
+        await self.client.get(f"{self.base_url}/companies/1/monthly-costs?month=1&year=2026")
+        await self.client.get(f"{self.base_url}/reports/building-finance?month=1&year=2026&fresh=true")
+        
+        response = await self.client.get(f"http://localhost:{os.getenv('APP_PORT', '8222')}/metrics")
+        self.assert_status(response, 200, "Metrics returns 200")
+        if response.status_code != 200:
+            return
+        
+        body = response.text
+        self.assert_true(
+            'http_request_duration_seconds_count{method="GET",route="/api/companies/{company_id}/monthly-costs"' in body,
+            "Request latency labelled by route template"
+        )
+        self.assert_true(
+            'db_query_duration_seconds_count{caller="CompanyRepository.get_monthly_costs"' in body,
+            "SQL timing labelled by repository method"
+        )
+        self.assert_true(
+            'db_query_duration_seconds_count{caller="GET /api/reports/building-finance"' in body,
+            "Inline report SQL labelled by route"
+        )
+        self.assert_true('db_query_rows_total{caller="CompanyRepository.get_monthly_costs"}' in body, "Row counts exposed")
+        self.assert_true("# TYPE db_query_errors_total counter" in body, "Error counter exposed")
+        self.assert_true('db_pool_connections{pool="primary",state="idle"}' in body, "Pool gauges exposed")
+    
+    async def _cache_count(self, report: str, result: str) -> float:
+        """Read report_cache_requests_total for one report/result from /metrics."""
+        response = await self.client.get(f"http://localhost:{os.getenv('APP_PORT', '8222')}/metrics")
+        prefix = f'report_cache_requests_total{{report="{report}",result="{result}"}} '
+        for line in response.text.splitlines():
+            if line.startswith(prefix):
+                return float(line[len(prefix):])
+        return 0.0
+    
+    async def test_report_cache(self):
+        """Test 29: Report responses are cached and dropped when contracts change."""
+        print("\n🧪 Test 29: Report Cache")
+        
+        url = f"{self.base_url}/companies/1/monthly-costs?month=1&year=2024"
+        first = await self.client.get(url)
+        self.assert_status(first, 200, "Monthly costs returns 200")
+        if first.status_code != 200:
+            return
+        
+        hits = await self._cache_count("company_monthly_costs", "hit")
+        second = await self.client.get(url)
+        self.assert_true(second.json() == first.json(), "Cached response matches")
+        self.assert_true(
+            await self._cache_count("company_monthly_costs", "hit") == hits + 1,
+            "Second call served from cache"
+        )
+        
+        # Any contract write invalidates reports tagged "contracts"
+        contracts = await self.client.get(f"{self.base_url}/contracts?limit=1")
+        contract = contracts.json()[0]
+        response = await self.client.put(
+            f"{self.base_url}/contracts/{contract['id']}",
+            json={"rent_price": contract["rent_price"]}
+        )
+        self.assert_status(response, 200, "Contract update returns 200")
+        
+        misses = await self._cache_count("company_monthly_costs", "miss")
+        third = await self.client.get(url)
+        self.assert_true(third.json() == first.json(), "Recomputed response unchanged")
+        self.assert_true(
+            await self._cache_count("company_monthly_costs", "miss") == misses + 1,
+            "Contract write invalidates the cached report"
+        )
+        
+        # Tag versions are shared through the database: an invalidation from
+        # another process (here the test process, like generate_invoices.py) counts
+        from api import cache
+        from api.config import settings
+        from api.database import create_pool, close_pool
+        if settings.REPORT_CACHE_SHARED_TAGS:
+            await create_pool()
+            try:
+                await cache.invalidate("contracts")
+            finally:
+                await close_pool()
+            misses = await self._cache_count("company_monthly_costs", "miss")
+            await self.client.get(url)
+            self.assert_true(
+                await self._cache_count("company_monthly_costs", "miss") == misses + 1,
+                "Invalidation from another process reaches the API cache"
+            )
+        
+        fresh_hits = await self._cache_count("building_finance", "hit")
+        await self.client.get(f"{self.base_url}/reports/building-finance?month=1&year=2024&fresh=true")
+        await self.client.get(f"{self.base_url}/reports/building-finance?month=1&year=2024&fresh=true")
+        self.assert_true(
+            await self._cache_count("building_finance", "hit") == fresh_hits,
+            "fresh=true bypasses the cache"
+        )
+    
+    async def test_conditional_get(self):
+        """Test 30: Weak ETags; If-None-Match returns 304 until the data changes."""
+        print("\n🧪 Test 30: Conditional GET (ETag)")
+        
+        for path in ["/offices/1", "/companies/1", "/offices?limit=5", "/reports/building-finance?month=1&year=2024"]:
+            response = await self.client.get(f"{self.base_url}{path}")
+            etag = response.headers.get("etag")
+            self.assert_true(etag is not None and etag.startswith('W/"'), f"{path} has a weak ETag")
+            if not etag:
+                continue
+            
+            again = await self.client.get(f"{self.base_url}{path}", headers={"If-None-Match": etag})
+            self.assert_status(again, 304, f"{path} unchanged -> 304")
+            self.assert_true(again.content == b"", f"{path} 304 has no body")
+        
+        # An update bumps updated_at and the table version, so the old ETags no longer match
+        office = await self.client.get(f"{self.base_url}/offices/1")
+        list_etag = (await self.client.get(f"{self.base_url}/offices?limit=5")).headers.get("etag")
+        await self.client.put(f"{self.base_url}/offices/1", json={"floor": office.json()["floor"]})
+        
+        response = await self.client.get(f"{self.base_url}/offices/1", headers={"If-None-Match": office.headers["etag"]})
+        self.assert_status(response, 200, "Entity changed -> 200")
+        self.assert_true(response.headers.get("etag") != office.headers["etag"], "Entity ETag changed")
+        
+        response = await self.client.get(f"{self.base_url}/offices?limit=5", headers={"If-None-Match": list_etag})
+        self.assert_status(response, 200, "List changed -> 200")
+        
+        response = await self.client.get(f"{self.base_url}/offices/999999", headers={"If-None-Match": "*"})
+        self.assert_status(response, 404, "Unknown id still 404")
+    
+    async def test_bulk_daily_usages(self):
+        """Test 31: Bulk usage ingestion (NDJSON / CSV) with per-row errors."""
+        print("\n🧪 Test 31: Bulk Daily Usages")
+        
+        report_url = f"{self.base_url}/reports/building-finance?month=1&year=2020"
+        before = (await self.client.get(report_url)).json()["revenue_breakdown"]["daily_services"]
+        
+        ndjson = "\n".join([
+            json.dumps({"employee_id": 1, "service_id": 1, "usage_date": "2020-01-02", "price": 1000, "service_type": "meal"}),
+            json.dumps({"employee_id": 999999, "service_id": 1, "usage_date": "2020-01-02"}),
+            "{not json",
+            json.dumps({"employee_id": 1, "service_id": 1}),
+        ])
+        response = await self.client.post(
+            f"{self.base_url}/usages/daily:bulk",
+            content=ndjson,
+            headers={"Content-Type": "application/x-ndjson"}
+        )
+        self.assert_status(response, 200, "NDJSON bulk returns 200")
+        result = response.json()
+        self.assert_true(result["inserted"] == 1 and result["failed"] == 3, f"1 inserted, 3 rejected ({result['inserted']}/{result['failed']})")
+        self.assert_true([error["line"] for error in result["errors"]] == [2, 3, 4], "Errors reported per line")
+        
+        csv_body = "employee_id,service_id,usage_date,price,service_type\n1,1,2020-01-03,500,parking\n1,1,not-a-date,,\n"
+        response = await self.client.post(
+            f"{self.base_url}/usages/daily:bulk",
+            content=csv_body,
+            headers={"Content-Type": "text/csv"}
+        )
+        self.assert_status(response, 200, "CSV bulk returns 200")
+        result = response.json()
+        self.assert_true(result["inserted"] == 1 and result["errors"][0]["line"] == 3, "CSV row errors use file line numbers")
+        
+        after = (await self.client.get(report_url)).json()["revenue_breakdown"]["daily_services"]
+        self.assert_true(after - before == 1500, f"Loaded rows reach the (cached) report ({before} -> {after})")
+        
+        response = await self.client.post(
+            f"{self.base_url}/usages/daily:bulk",
+            content="x",
+            headers={"Content-Type": "text/plain"}
+        )
+        self.assert_status(response, 415, "Unsupported content type -> 415")
+    
+    async def test_batch_get_by_ids(self):
+        """Test 32: ?ids= returns a batch in request order with one query."""
+        print("\n🧪 Test 32: Batch GET by ids")
+        
+        repositories = {
+            "/offices": "OfficeRepository",
+            "/companies": "CompanyRepository",
+            "/contracts": "RentContractRepository",
+            "/building-employees": "BuildingEmployeeRepository"
+        }
+        for path, key in [("/offices", "id"), ("/companies", "id"), ("/contracts", "id"), ("/building-employees", "employee_id")]:
+            page = (await self.client.get(f"{self.base_url}{path}?limit=3")).json()
+            wanted = [item[key] for item in reversed(page)]
+            ids = ",".join(str(value) for value in wanted + [999999, wanted[0]])
+            queries_before = await self._query_count(f"{repositories[path]}.get_by_ids")
+            response = await self.client.get(f"{self.base_url}{path}?ids={ids}")
+            self.assert_status(response, 200, f"{path}?ids= returns 200")
+            self.assert_true(
+                [item[key] for item in response.json()] == wanted,
+                f"{path}: request order kept, unknown/duplicate ids dropped"
+            )
+            self.assert_true(
+                await self._query_count(f"{repositories[path]}.get_by_ids") - queries_before == 1,
+                f"{path}: ids resolved by the request loaders in one query"
+            )
+        
+        response = await self.client.get(f"{self.base_url}/offices?ids=1,abc")
+        self.assert_status(response, 400, "Malformed ids -> 400")
+        for ids in ("99999999999", "0", "1,-5"):
+            response = await self.client.get(f"{self.base_url}/offices?ids={ids}")
+            self.assert_status(response, 400, f"Out-of-range ids={ids} -> 400")
+    
+    async def _query_count(self, caller: str) -> float:
+        """Read db_query_duration_seconds_count (fetch) for one caller from /metrics."""
+        response = await self.client.get(f"http://localhost:{os.getenv('APP_PORT', '8222')}/metrics")
+        prefix = f'db_query_duration_seconds_count{{caller="{caller}",operation="fetch"}} '
+        for line in response.text.splitlines():
+            if line.startswith(prefix):
+                return float(line[len(prefix):])
+        return 0.0
+    
+    async def test_contract_validation_loaders(self):
+        """Test 33: Contract validation loads office and company through loaders on the transaction connection."""
+        print("\n🧪 Test 33: DataLoader Contract Validation")
+        
+        offices_before = await self._query_count("OfficeRepository.get_by_ids")
+        companies_before = await self._query_count("CompanyRepository.get_by_ids")
+        
+        contract_data = {
+            "office_id": 999999,
+            "company_id": 1,
+            "from_date": "2030-01-01",
+            "end_date": "2030-12-31",
+            "rent_price": 15000000
+        }
+        response = await self.client.post(f"{self.base_url}/contracts", json=contract_data)
+        self.assert_status(response, 404, "Unknown office -> 404")
+        self.assert_true(response.json().get("detail") == "Văn phòng không tồn tại", "404 names the office")
+        
+        response = await self.client.post(f"{self.base_url}/contracts", json={**contract_data, "office_id": 1, "company_id": 999999})
+        self.assert_status(response, 404, "Unknown company -> 404")
+        self.assert_true(response.json().get("detail") == "Công ty không tồn tại", "404 names the company")
+        
+        self.assert_true(
+            await self._query_count("OfficeRepository.get_by_ids") - offices_before == 2,
+            "One batched office lookup per request"
+        )
+        self.assert_true(
+            await self._query_count("CompanyRepository.get_by_ids") - companies_before == 2,
+            "One batched company lookup per request"
+        )
+    
+    async def test_payroll_runs(self):
+        """Test 34: Closed-month salaries come from a stored payroll run."""
+        print("\n🧪 Test 34: Payroll Runs")
+        
+        url = f"{self.base_url}/building-employees/salaries/monthly"
+        response = await self.client.post(f"{url}/run?month=1&year=2026")
+        self.assert_status(response, 200, "Payroll run of a closed month returns 200")
+        run = response.json()
+        
+        ids = [row["employee_id"] for row in run]
+        self.assert_true(len(ids) == len(set(ids)), "One row per employee")
+        self.assert_true(
+            all(abs(row["total_salary"] - (row["base_salary"] or 0) - row["bonus"]) < 0.01 for row in run),
+            "total_salary = base_salary + bonus"
+        )
+        
+        # The run invalidates cached salaries; the closed month is read back from payroll_runs
+        response = await self.client.get(f"{url}?month=1&year=2026")
+        self.assert_status(response, 200, "Closed-month salaries return 200")
+        self.assert_true(response.json() == run, "Closed month reads the stored run")
+        
+        today = date.today()
+        response = await self.client.post(f"{url}/run?month={today.month}&year={today.year}")
+        self.assert_status(response, 400, "Current month cannot be closed -> 400")
+    
+    async def test_generate_invoices(self):
+        """Test 35: Month-close invoice generation is idempotent."""
+        print("\n🧪 Test 35: Generate Invoices")
+        
+        url = f"{self.base_url}/invoices/generate"
+        response = await self.client.post(f"{url}?month=1&year=2026")
+        self.assert_status(response, 200, "Invoice generation returns 200")
+        first = response.json()
+        self.assert_true(first.get("shards_failed") == 0, "All shards committed")
+        
+        # Second run: invoices exist and usages are linked already
+        response = await self.client.post(f"{url}?month=1&year=2026")
+        self.assert_status(response, 200, "Rerun returns 200")
+        rerun = response.json()
+        self.assert_true(
+            rerun["invoices_created"] == 0 and rerun["invoices_updated"] == 0,
+            "Rerun creates no duplicate invoices"
+        )
+        self.assert_true(
+            rerun["monthly_usages_linked"] == 0 and rerun["daily_usages_linked"] == 0,
+            "Rerun links no usage twice"
+        )
+        
+        # Generated invoices carry company_id only; the details list must still include them
+        details = (await self.client.get(f"{self.base_url}/reports/building-finance/details?month=1&year=2026")).json()
+        summary = (await self.client.get(f"{self.base_url}/reports/building-finance?month=1&year=2026")).json()
+        self.assert_true(
+            abs(details["total_revenue"] - summary["invoiced_revenue"]) < 0.01,
+            "Finance details list every invoice of the month",
+            f"details={details['total_revenue']} invoiced={summary['invoiced_revenue']}"
+        )
+        
+        response = await self.client.post(f"{url}?month=12&year=2100")
+        self.assert_status(response, 400, "Future month -> 400")
+    
+    async def test_company_costs_report(self):
+        """Test 36: All-tenant company costs match the per-company endpoint."""
+        print("\n🧪 Test 36: Company Costs Report")
+        
+        url = f"{self.base_url}/reports/company-costs?month=1&year=2026"
+        response = await self.client.get(url)
+        self.assert_status(response, 200, "Company costs returns 200")
+        rows = response.json()
+        self.assert_true(isinstance(rows, list) and len(rows) > 0, "One row per company")
+        totals = [row["total_cost"] for row in rows]
+        self.assert_true(totals == sorted(totals, reverse=True), "Sorted by total_cost desc by default")
+        
+        first = rows[0]
+        response = await self.client.get(
+            f"{self.base_url}/companies/{first['company_id']}/monthly-costs?month=1&year=2026"
+        )
+        single = response.json()
+        self.assert_true(
+            abs(single["total_cost"] - first["total_cost"]) < 0.01 and abs(single["rent_cost"] - first["rent_cost"]) < 0.01,
+            "Totals match /companies/{id}/monthly-costs"
+        )
+        
+        response = await self.client.get(f"{url}&sort=company_id&order=asc&limit=2")
+        top = response.json()
+        self.assert_true(
+            [row["company_id"] for row in top] == sorted(row["company_id"] for row in rows)[:2],
+            "sort/order/limit return the top-N"
+        )
+        
+        response = await self.client.get(f"{url}&format=ndjson")
+        lines = [line for line in response.text.splitlines() if line]
+        self.assert_true(len(lines) == len(rows), "NDJSON streams one line per company")
+        
+        response = await self.client.get(f"{url}&sort=tax_code; DROP TABLE companies")
+        self.assert_status(response, 422, "Unknown sort column -> 422")
+    
+    async def test_report_month_ranges(self):
+        """Test 37: from/to month ranges return per-month series matching single-month reports."""
+        print("\n🧪 Test 37: Report Month Ranges")
+        
+        response = await self.client.get(f"{self.base_url}/reports/building-finance?from=2025-11&to=2026-01&fresh=true")
+        self.assert_status(response, 200, "Building finance range returns 200")
+        series = response.json()
+        months = series["months"]
+        self.assert_true([m["month"] for m in months] == ["2025-11", "2025-12", "2026-01"], "One entry per month")
+        self.assert_true(months[0]["revenue_change"] is None, "First month has no change")
+        self.assert_true(
+            abs(months[-1]["cumulative_revenue"] - series["total_revenue"]) < 0.01,
+            "Cumulative revenue ends at the range total"
+        )
+        response = await self.client.get(f"{self.base_url}/reports/building-finance?month=1&year=2026&fresh=true")
+        self.assert_true(
+            abs(response.json()["total_revenue"] - months[-1]["total_revenue"]) < 0.01,
+            "Last month matches the single-month report"
+        )
+        
+        response = await self.client.get(f"{self.base_url}/reports/company-costs?from=2025-12&to=2026-01")
+        self.assert_status(response, 200, "Company costs range returns 200")
+        rows = response.json()
+        single = (await self.client.get(f"{self.base_url}/reports/company-costs?month=1&year=2026")).json()
+        january = {row["company_id"]: row["total_cost"] for row in rows if row["month"] == "2026-01"}
+        self.assert_true(
+            all(abs(january.get(row["company_id"], 0) - row["total_cost"]) < 0.01 for row in single),
+            "January costs match the single-month report"
+        )
+        
+        response = await self.client.get(f"{self.base_url}/building-employees/salaries/monthly?from=2025-12&to=2026-01")
+        self.assert_status(response, 200, "Salaries range returns 200")
+        rows = response.json()
+        first, second = rows[0], rows[1]
+        self.assert_true(
+            first["employee_id"] == second["employee_id"] and second["month"] == "2026-01"
+            and abs(second["cumulative_salary"] - first["total_salary"] - second["total_salary"]) < 0.01
+            and abs(second["salary_change"] - (second["total_salary"] - first["total_salary"])) < 0.01,
+            "Salaries carry running total and month-over-month change"
+        )
+        
+        response = await self.client.get(f"{self.base_url}/reports/building-finance?from=2026-02&to=2026-01")
+        self.assert_status(response, 400, "Reversed range -> 400")
+        response = await self.client.get(f"{self.base_url}/reports/company-costs?from=2026-01")
+        self.assert_status(response, 400, "Missing to -> 400")
+        for path in ("/reports/building-finance", "/reports/company-costs"):
+            response = await self.client.get(f"{self.base_url}{path}?from=2000-01&to=2000-02")
+            self.assert_status(response, 400, f"{path}: range before 2020 -> 400 like ?year=")
+    
+    async def test_slow_query_log_rules(self):
+        """Test 38: slow query log threshold, sampling and parameter shapes (no DB or server)."""
+        print("\n🧪 Test 38: Slow Query Log Rules")
+        
+        from api.config import settings
+        from api.database import slow_query_log
+        
+        self.assert_true(
+            slow_query_log.param_shapes([1, "a", date(2026, 1, 1), [1, 2, 3], None])
+            == ["int", "str", "date", "list[3]", "NoneType"],
+            "Parameter shapes carry types, not values"
+        )
+        self.assert_true(
+            slow_query_log._is_read_only("  select 1") and slow_query_log._is_read_only("WITH x AS (SELECT 1) SELECT * FROM x")
+            and not slow_query_log._is_read_only("UPDATE offices SET name = $1")
+            and not slow_query_log._is_read_only(""),
+            "Only SELECT/WITH count as read only"
+        )
+        
+        written, explained = [], []
+        
+        async def fake_explain(record, sql, args):
+            explained.append(record)
+        
+        saved = {
+            name: getattr(settings, name)
+            for name in ("SLOW_QUERY_LOG_ENABLED", "SLOW_QUERY_THRESHOLD_MS", "SLOW_QUERY_EXPLAIN_SAMPLE_RATE")
+        }
+        saved_write, saved_explain = slow_query_log._write, slow_query_log._explain_and_write
+        slow_query_log._write = written.append
+        slow_query_log._explain_and_write = fake_explain
+        try:
+            settings.SLOW_QUERY_LOG_ENABLED = True
+            settings.SLOW_QUERY_THRESHOLD_MS = 100.0
+            settings.SLOW_QUERY_EXPLAIN_SAMPLE_RATE = 0.0
+            
+            slow_query_log.record_query("SELECT 1", [], 99.9, "Test.fast")
+            self.assert_true(not written, "Queries under the threshold are not logged")
+            
+            slow_query_log.record_query("SELECT *\n  FROM offices WHERE id = $1", [7], 150.0, "Test.slow")
+            record = written[-1] if written else {}
+            self.assert_true(
+                record.get("caller") == "Test.slow" and record.get("sql") == "SELECT * FROM offices WHERE id = $1"
+                and record.get("param_types") == ["int"] and "error" not in record,
+                "Slow query logged with normalized SQL and parameter types"
+            )
+            
+            slow_query_log.record_query("SELECT pg_sleep(10)", [], 5000.0, "Test.timeout", "QueryCanceledError")
+            self.assert_true(written[-1].get("error") == "QueryCanceledError", "Failed queries keep their error")
+            
+            settings.SLOW_QUERY_EXPLAIN_SAMPLE_RATE = 1.0
+            count = len(written)
+            slow_query_log.record_query("SELECT 2", [], 150.0, "Test.sampled")
+            await asyncio.gather(*slow_query_log._explain_tasks)
+            self.assert_true(
+                len(written) == count and [r["caller"] for r in explained] == ["Test.sampled"],
+                "Sampled queries are handed to EXPLAIN instead of written directly"
+            )
+            
+            settings.SLOW_QUERY_LOG_ENABLED = False
+            slow_query_log.record_query("SELECT 3", [], 9000.0, "Test.disabled")
+            self.assert_true(len(written) == count and len(explained) == 1, "Nothing is logged when disabled")
+        finally:
+            for name, value in saved.items():
+                setattr(settings, name, value)
+            slow_query_log._write, slow_query_log._explain_and_write = saved_write, saved_explain
+    
+    async def test_bulk_company_employees(self):
+        """Test 39: Bulk company employee load (CSV / NDJSON) with per-row errors."""
+        print("\n🧪 Test 39: Bulk Company Employees")
+        
+        company_id = (await self.client.get(f"{self.base_url}/companies?limit=1")).json()[0]["id"]
+        csv_body = (
+            "company_id,full_name,job_title,phone_number,email,status\n"
+            f"{company_id},TEST_BULK_EMPLOYEE A,Dev,0900000001,a@example.com,working\n"
+            f"{company_id},TEST_BULK_EMPLOYEE B,,,,\n"
+            "999999,TEST_BULK_EMPLOYEE C,,,,\n"
+            f"{company_id},TEST_BULK_EMPLOYEE D,,,not-an-email,\n"
+        )
+        response = await self.client.post(
+            f"{self.base_url}/companies/employees:bulk",
+            content=csv_body,
+            headers={"Content-Type": "text/csv"}
+        )
+        self.assert_status(response, 200, "CSV employee bulk returns 200")
+        result = response.json()
+        self.assert_true(result["inserted"] == 2 and result["failed"] == 2, f"2 inserted, 2 rejected ({result['inserted']}/{result['failed']})")
+        self.assert_true(
+            [error["line"] for error in result["errors"]] == [4, 5]
+            and "company_id" in result["errors"][0]["errors"][0],
+            "Unknown company and bad email reported per line"
+        )
+        
+        response = await self.client.post(
+            f"{self.base_url}/companies/employees:bulk",
+            content=json.dumps({"company_id": company_id, "full_name": "TEST_BULK_EMPLOYEE E"}),
+            headers={"Content-Type": "application/x-ndjson"}
+        )
+        self.assert_true(response.status_code == 200 and response.json()["inserted"] == 1, "NDJSON employee bulk inserts")
+    
+    async def test_request_loaders(self):
+        """Test 40: Concurrent load() calls in one request share one get_by_ids query (no DB or server)."""
+        print("\n🧪 Test 40: Request-scoped DataLoaders")
+        
+        from api.repositories import loaders as loaders_module
+        
+        calls = []
+        
+        async def fake_get_by_ids(ids, conn=None):
+            calls.append(list(ids))
+            return [{"id": office_id, "name": f"Office {office_id}"} for office_id in ids if office_id != 999999]
+        
+        async def request():
+            loaders_module.start_request_loaders()
+            loaders = loaders_module.get_loaders()
+            loaders.offices.batch_fn = loaders_module._by_id(fake_get_by_ids, "id", readonly=True)
+            results = await asyncio.gather(
+                loaders.offices.load(1),
+                loaders.offices.load(2),
+                loaders.offices.load(1),
+                loaders.offices.load_many([2, 999999, 3])
+            )
+            return loaders, results
+        
+        loaders, results = await asyncio.create_task(request())
+        self.assert_true(calls == [[1, 2, 999999, 3]], f"One get_by_ids query for all loads, duplicates sent once ({calls})")
+        self.assert_true(
+            results[0]["id"] == 1 and results[1]["id"] == 2 and results[2] is results[0]
+            and [row and row["id"] for row in results[3]] == [2, None, 3],
+            "Each load gets its row (None for an unknown id)"
+        )
+        
+        async def same_scope():
+            loaders_module.start_request_loaders()
+            return loaders_module.get_loaders() is loaders_module.get_loaders()
+        
+        self.assert_true(await asyncio.create_task(same_scope()), "get_loaders() returns one set per request")
+        self.assert_true(loaders_module.get_loaders() is not loaders, "Another request gets its own loaders")
+    
     async def run_all_tests(self):
         """Run all API tests."""
         print("=" * 60)
@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+Benchmark: building-finance details expense query vs. number of employees
+100% SQL thuần
+
+Seeds up to 10k working building employees (each assigned to the cleaning
+and security services) plus a large volume of company monthly usages, then
+measures the expense query of /reports/building-finance/details at growing
+employee counts. With revenue pre-aggregated per service, latency per 1k
+employees must stay roughly constant (linear scaling).
+
+Cách dùng:
+    cd back_end && python -m auto_test.benchmark.bench_finance_details
+"""
+import asyncio
+import sys
+import os
+
+# Add parent directory to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../../')))
+
+from auto_test.sql.db_utils import DatabaseUtils
+from auto_test.benchmark.bench_utils import measure, summarize, print_table
+from api.routes.report_routes import _finance_details_queries
+
+BENCH_FIRST_NAME = "BENCH"
+BENCH_TAX_CODE = "BENCH_FINANCE_DETAILS"
+EMPLOYEE_STEPS = [1000, 2500, 5000, 10000]
+USAGE_MONTHS = 24
+USAGES_PER_MONTH = 2000        # rows per service per month
+TARGET_MONTH = 1
+TARGET_YEAR = 2026
+ITERATIONS = 20
+
+# ms per 1k employees at the largest step may not exceed this factor of the smallest one
+MAX_PER_EMPLOYEE_GROWTH = 2.0
+P95_SLACK_MS = 2.0
+
+
+async def cleanup(db: DatabaseUtils):
+    """Remove benchmark rows (cascades to subscribers and usages)."""
+    await db.execute("DELETE FROM building_employees WHERE first_name = $1", BENCH_FIRST_NAME)
+    await db.execute("DELETE FROM companies WHERE tax_code = $1", BENCH_TAX_CODE)
+
+
+async def seed_usages(db: DatabaseUtils):
+    """Seed monthly usages for cleaning (1) and security (2) over USAGE_MONTHS."""
+    company_id = await db.fetchval("""
+        INSERT INTO companies (name, tax_code) VALUES ('Benchmark Finance Details', $1)
+        RETURNING id
+    """, BENCH_TAX_CODE)
+    # One partition per seeded month, as maintain_partitions.py keeps them
+    await db.execute("""
+        SELECT create_usage_partitions((MAKE_DATE($1, $2, 1) - ($3 - 1) * INTERVAL '1 month')::date, MAKE_DATE($1, $2, 1))
+    """, TARGET_YEAR, TARGET_MONTH, USAGE_MONTHS)
+    await db.execute("""
+        INSERT INTO company_monthly_usages (company_id, service_id, from_date, to_date, quantity, price)
+        SELECT $1, s.service_id, m::date, (m + INTERVAL '1 month - 1 day')::date, 1, 100000
+        FROM generate_series(
+            MAKE_DATE($2, $3, 1) - ($4 - 1) * INTERVAL '1 month',
+            MAKE_DATE($2, $3, 1),
+            INTERVAL '1 month'
+        ) AS m
+        CROSS JOIN (VALUES (1), (2)) AS s(service_id)
+        CROSS JOIN generate_series(1, $5) AS n
+    """, company_id, TARGET_YEAR, TARGET_MONTH, USAGE_MONTHS, USAGES_PER_MONTH)
+
+
+async def seed_employees(db: DatabaseUtils, count: int):
+    """Add `count` working employees, each subscribed to every 'staff' service rule."""
+    await db.execute("""
+        WITH new_employees AS (
+            INSERT INTO building_employees (first_name, last_name, role, base_salary, hire_date, status)
+            SELECT $1, 'Employee ' || n, 'staff', 8000000, '2024-01-01', 'working'
+            FROM generate_series(1, $2) AS n
+            RETURNING employee_id
+        )
+        INSERT INTO service_subscribers (service_id, employee_id, service_role_rules_id, from_date)
+        SELECT srr.service_id, ne.employee_id, srr.id, '2024-01-01'
+        FROM new_employees ne
+        CROSS JOIN service_role_rules srr
+        WHERE srr.role = 'staff'
+    """, BENCH_FIRST_NAME, count)
+
+
+async def run_benchmark() -> bool:
+    """Grow the employee count and measure the expense query."""
+    db = DatabaseUtils()
+    results = []
+    _, expense_query, params = _finance_details_queries(TARGET_MONTH, TARGET_YEAR)
+
+    print("=" * 60)
+    print("⏱️  BENCHMARK: finance details expense query vs. employees")
+    print("=" * 60)
+
+    try:
+        await cleanup(db)
+        print(f"\n🌱 Seeding {USAGE_MONTHS * USAGES_PER_MONTH * 2} monthly usages")
+        await seed_usages(db)
+
+        seeded = 0
+        for employees in EMPLOYEE_STEPS:
+            print(f"🌱 Seeding employees: {seeded} → {employees}")
+            await seed_employees(db, employees - seeded)
+            seeded = employees
+            await db.execute("ANALYZE building_employees")
+            await db.execute("ANALYZE service_subscribers")
+            await db.execute("ANALYZE company_monthly_usages")
+
+            conn = await db.connect()
+            samples = await measure(lambda: conn.fetch(expense_query, *params), iterations=ITERATIONS, warmup=3)
+            results.append({"employees": employees, "rows": employees, **summarize(samples)})
+
+        print_table("expense query latency", "employees", results)
+
+        first = results[0]["p95"] / EMPLOYEE_STEPS[0] * 1000
+        last = results[-1]["p95"] / EMPLOYEE_STEPS[-1] * 1000
+        limit = first * MAX_PER_EMPLOYEE_GROWTH + P95_SLACK_MS / EMPLOYEE_STEPS[-1] * 1000
+        if last <= limit:
+            print(f"\n✅ Linear: {last:.3f} ms per 1k employees <= {limit:.3f}")
+            return True
+        print(f"\n❌ Super-linear: {last:.3f} ms per 1k employees > {limit:.3f}")
+        return False
+    finally:
+        await cleanup(db)
+        await db.close()
+
+
+if __name__ == "__main__":
+    success = asyncio.run(run_benchmark())
+    sys.exit(0 if success else 1)
@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""
+Benchmark: CompanyRepository.get_monthly_costs vs. history size
+100% SQL thuần
+
+Seeds a dedicated benchmark company with several years of daily usages
+(parking + meals per employee per working day) and monthly usages, growing
+the history step by step. After each step the p95 latency of
+get_monthly_costs for a single month is measured. Month filters prune to
+the month's partition, so the p95 must stay flat as history grows.
+
+Cách dùng:
+    cd back_end && python -m auto_test.benchmark.bench_monthly_costs
+"""
+import asyncio
+import sys
+import os
+from datetime import date
+
+# Add parent directory to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../../')))
+
+from auto_test.sql.db_utils import DatabaseUtils
+from auto_test.benchmark.bench_utils import measure, summarize, print_table
+from api.database import create_pool, close_pool
+from api.repositories.company_repository import CompanyRepository
+
+BENCH_TAX_CODE = "BENCH_MONTHLY_COSTS"
+EMPLOYEES = 50
+TARGET_MONTH = 1
+TARGET_YEAR = 2026
+HISTORY_STEPS = [1, 2, 4, 6]   # years of history before each measurement
+ITERATIONS = 200
+
+# p95 at the largest history may not exceed this factor of the smallest one
+MAX_P95_GROWTH = 2.0
+# Absolute slack (ms) so sub-millisecond jitter does not fail the run
+P95_SLACK_MS = 1.0
+
+
+async def seed_company(db: DatabaseUtils) -> int:
+    """Create the benchmark company and its employees."""
+    await db.execute("DELETE FROM companies WHERE tax_code = $1", BENCH_TAX_CODE)
+    company_id = await db.fetchval("""
+        INSERT INTO companies (name, tax_code, email)
+        VALUES ('Benchmark Monthly Costs', $1, 'bench@bench.local')
+        RETURNING id
+    """, BENCH_TAX_CODE)
+    await db.execute("""
+        INSERT INTO company_employees (company_id, full_name, job_title, status)
+        SELECT $1, 'Bench Employee ' || n, 'Bench', 'working'
+        FROM generate_series(1, $2) AS n
+    """, company_id, EMPLOYEES)
+    return company_id
+
+
+async def seed_history(db: DatabaseUtils, company_id: int, start: date, end: date):
+    """Seed usages for the half-open period [start, end)."""
+    # One partition per seeded month, as maintain_partitions.py keeps them
+    await db.execute("SELECT create_usage_partitions($1, $2::date - 1)", start, end)
+
+    # Daily usages: parking (3) + meal (4) per employee per working day
+    await db.execute("""
+        INSERT INTO employee_daily_usages (employee_id, service_id, usage_date, price, service_type)
+        SELECT ce.id, s.service_id, d::date, s.price, s.service_type
+        FROM company_employees ce
+        CROSS JOIN generate_series($2::timestamp, $3::timestamp - INTERVAL '1 day', INTERVAL '1 day') AS d
+        CROSS JOIN (VALUES (3, 15000, 'parking'), (4, 50000, 'meal')) AS s(service_id, price, service_type)
+        WHERE ce.company_id = $1
+        AND EXTRACT(ISODOW FROM d) < 6
+    """, company_id, start, end)
+
+    # Monthly usages: cleaning (1) + security (2) per month
+    await db.execute("""
+        INSERT INTO company_monthly_usages (company_id, service_id, from_date, to_date, quantity, price)
+        SELECT $1, s.service_id, m::date, (m + INTERVAL '1 month - 1 day')::date, $4, s.price
+        FROM generate_series($2::timestamp, $3::timestamp - INTERVAL '1 month', INTERVAL '1 month') AS m
+        CROSS JOIN (VALUES (1, 11000000), (2, 750000)) AS s(service_id, price)
+    """, company_id, start, end, EMPLOYEES)
+
+
+async def run_benchmark() -> bool:
+    """Grow history step by step and measure get_monthly_costs p95."""
+    db = DatabaseUtils()
+    repository = CompanyRepository()
+    results = []
+
+    print("=" * 60)
+    print("⏱️  BENCHMARK: get_monthly_costs vs. history size")
+    print("=" * 60)
+
+    await create_pool()
+    try:
+        company_id = await seed_company(db)
+        # History ends with the target month (exclusive upper bound)
+        history_end = date(TARGET_YEAR + TARGET_MONTH // 12, TARGET_MONTH % 12 + 1, 1)
+        seeded_from = history_end
+
+        for years in HISTORY_STEPS:
+            start = history_end.replace(year=history_end.year - years)
+            print(f"\n🌱 Seeding history: {years} year(s) ({start} → {history_end})")
+            await seed_history(db, company_id, start, seeded_from)
+            seeded_from = start
+            await db.execute("ANALYZE employee_daily_usages")
+            await db.execute("ANALYZE company_monthly_usages")
+
+            row_count = await db.fetchval("""
+                SELECT COUNT(*) FROM employee_daily_usages edu
+                JOIN company_employees ce ON edu.employee_id = ce.id
+                WHERE ce.company_id = $1
+            """, company_id)
+
+            samples = await measure(
+                lambda: repository.get_monthly_costs(company_id, TARGET_MONTH, TARGET_YEAR),
+                iterations=ITERATIONS
+            )
+            results.append({"years": years, "rows": row_count, **summarize(samples)})
+
+        print_table("get_monthly_costs latency", "years", results)
+
+        baseline = results[0]["p95"]
+        largest = results[-1]["p95"]
+        limit = baseline * MAX_P95_GROWTH + P95_SLACK_MS
+        if largest <= limit:
+            print(f"\n✅ p95 flat: {largest:.2f} ms <= {limit:.2f} ms")
+            return True
+        print(f"\n❌ p95 grew with history: {largest:.2f} ms > {limit:.2f} ms")
+        return False
+    finally:
+        await db.execute("DELETE FROM companies WHERE tax_code = $1", BENCH_TAX_CODE)
+        await db.close()
+        await close_pool()
+
+
+if __name__ == "__main__":
+    success = asyncio.run(run_benchmark())
+    sys.exit(0 if success else 1)
@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+"""
+Benchmark: monthly payroll (/building-employees/salaries/monthly)
+100% SQL thuần
+
+Seeds 50k working building employees (each assigned to the cleaning and
+security services) and 5M company monthly usages, then compares:
+- the legacy per-employee join (employees x usages rows, under a statement timeout),
+- the set-based payroll query (revenue aggregated once per service),
+- reading a stored payroll run of a closed month (one index range scan).
+
+Cách dùng:
+    cd back_end && python -m auto_test.benchmark.bench_payroll
+"""
+import asyncio
+import sys
+import os
+import time
+
+import asyncpg
+
+# Add parent directory to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../../')))
+
+from auto_test.sql.db_utils import DatabaseUtils
+from auto_test.benchmark.bench_utils import measure, summarize, print_table
+from api.database import statements
+from api.repositories.payroll_repository import PayrollRepository, _COMPUTE, _GET_RUN
+
+BENCH_FIRST_NAME = "BENCH"
+BENCH_TAX_CODE = "BENCH_PAYROLL"
+EMPLOYEES = 50000
+USAGE_MONTHS = 25
+USAGES_PER_MONTH = 100000      # rows per service per month (2 services → 5M rows)
+TARGET_MONTH = 1
+TARGET_YEAR = 2026
+ITERATIONS = 10
+LEGACY_TIMEOUT_S = 60
+
+# Stored run must be read faster than the set-based query computes it
+MAX_RUN_READ_RATIO = 0.5
+# Set-based query p95 ceiling at full size
+MAX_COMPUTE_P95_MS = 5000.0
+
+# Former BuildingEmployeeRepository.get_salaries: joins every active
+# assignment to every usage row of its service before grouping
+LEGACY_SALARIES_QUERY = """
+    SELECT
+        be.employee_id,
+        CONCAT(be.first_name, ' ', be.last_name) as full_name,
+        be.role,
+        be.base_salary,
+        COALESCE(sr.bonus_rate, 0) as bonus_rate,
+        COALESCE(SUM(cmu.price), 0) as monthly_revenue,
+        be.base_salary + (COALESCE(SUM(cmu.price), 0) * COALESCE(sr.bonus_rate, 0)) as total_salary
+    FROM building_employees be
+    LEFT JOIN service_subscribers ss ON be.employee_id = ss.employee_id
+        AND ss.from_date <= MAKE_DATE($1, $2, 1) + INTERVAL '1 month' - INTERVAL '1 day'
+        AND (ss.end_date IS NULL OR ss.end_date >= MAKE_DATE($1, $2, 1))
+    LEFT JOIN service_role_rules srr ON ss.service_role_rules_id = srr.id
+    LEFT JOIN salary_rules sr ON srr.salary_rule_id = sr.id
+    LEFT JOIN company_monthly_usages cmu ON cmu.service_id = srr.service_id
+        AND EXTRACT(YEAR FROM cmu.from_date) = $1
+        AND EXTRACT(MONTH FROM cmu.from_date) = $2
+    GROUP BY be.employee_id, be.first_name, be.last_name, be.role,
+             be.base_salary, sr.bonus_rate
+    ORDER BY be.employee_id
+"""
+
+
+async def cleanup(db: DatabaseUtils):
+    """Remove benchmark rows (cascades to subscribers, usages and payroll rows)."""
+    await db.execute("DELETE FROM building_employees WHERE first_name = $1", BENCH_FIRST_NAME)
+    await db.execute("DELETE FROM companies WHERE tax_code = $1", BENCH_TAX_CODE)
+    # The stored run of the target month also covers the sample employees
+    await db.execute("DELETE FROM payroll_runs WHERE year = $1 AND month = $2", TARGET_YEAR, TARGET_MONTH)
+
+
+async def seed(db: DatabaseUtils):
+    """Seed EMPLOYEES staff employees and USAGE_MONTHS months of usages for services 1 and 2."""
+    company_id = await db.fetchval("""
+        INSERT INTO companies (name, tax_code) VALUES ('Benchmark Payroll', $1)
+        RETURNING id
+    """, BENCH_TAX_CODE)
+    # One partition per seeded month, as maintain_partitions.py keeps them
+    await db.execute("""
+        SELECT create_usage_partitions((MAKE_DATE($1, $2, 1) - ($3 - 1) * INTERVAL '1 month')::date, MAKE_DATE($1, $2, 1))
+    """, TARGET_YEAR, TARGET_MONTH, USAGE_MONTHS)
+    await db.execute("""
+        INSERT INTO company_monthly_usages (company_id, service_id, from_date, to_date, quantity, price)
+        SELECT $1, s.service_id, m::date, (m + INTERVAL '1 month - 1 day')::date, 1, 100000
+        FROM generate_series(
+            MAKE_DATE($2, $3, 1) - ($4 - 1) * INTERVAL '1 month',
+            MAKE_DATE($2, $3, 1),
+            INTERVAL '1 month'
+        ) AS m
+        CROSS JOIN (VALUES (1), (2)) AS s(service_id)
+        CROSS JOIN generate_series(1, $5) AS n
+    """, company_id, TARGET_YEAR, TARGET_MONTH, USAGE_MONTHS, USAGES_PER_MONTH)
+    await db.execute("""
+        WITH new_employees AS (
+            INSERT INTO building_employees (first_name, last_name, role, base_salary, hire_date, status)
+            SELECT $1, 'Employee ' || n, 'staff', 8000000, '2024-01-01', 'working'
+            FROM generate_series(1, $2) AS n
+            RETURNING employee_id
+        )
+        INSERT INTO service_subscribers (service_id, employee_id, service_role_rules_id, from_date)
+        SELECT srr.service_id, ne.employee_id, srr.id, '2024-01-01'
+        FROM new_employees ne
+        CROSS JOIN service_role_rules srr
+        WHERE srr.role = 'staff'
+    """, BENCH_FIRST_NAME, EMPLOYEES)
+    for table in ("building_employees", "service_subscribers", "company_monthly_usages"):
+        await db.execute(f"ANALYZE {table}")
+
+
+async def time_legacy(conn: asyncpg.Connection) -> str:
+    """One run of the legacy query, or the timeout it hit."""
+    started = time.perf_counter()
+    try:
+        async with conn.transaction():
+            await conn.execute(f"SET LOCAL statement_timeout = '{LEGACY_TIMEOUT_S}s'")
+            await conn.fetch(LEGACY_SALARIES_QUERY, TARGET_YEAR, TARGET_MONTH)
+    except asyncpg.QueryCanceledError:
+        return f"> {LEGACY_TIMEOUT_S * 1000:.0f} ms (timeout)"
+    return f"{(time.perf_counter() - started) * 1000:.0f} ms"
+
+
+async def run_benchmark() -> bool:
+    """Seed, then measure legacy vs. set-based vs. stored payroll."""
+    db = DatabaseUtils()
+
+    print("=" * 60)
+    print("⏱️  BENCHMARK: monthly payroll")
+    print("=" * 60)
+
+    try:
+        await cleanup(db)
+        print(f"\n🌱 Seeding {EMPLOYEES} employees, {USAGE_MONTHS * USAGES_PER_MONTH * 2} monthly usages")
+        await seed(db)
+        conn = await db.connect()
+
+        compute = summarize(await measure(
+            lambda: statements.fetch(conn, _COMPUTE, TARGET_YEAR, TARGET_MONTH),
+            iterations=ITERATIONS, warmup=2
+        ))
+
+        started = time.perf_counter()
+        async with conn.transaction():
+            saved = await PayrollRepository().save_run(TARGET_MONTH, TARGET_YEAR, conn)
+        save_ms = (time.perf_counter() - started) * 1000
+
+        read = summarize(await measure(
+            lambda: statements.fetch(conn, _GET_RUN, TARGET_YEAR, TARGET_MONTH),
+            iterations=ITERATIONS, warmup=2
+        ))
+
+        print_table("payroll latency", "query", [
+            {"query": "compute", "rows": len(saved), **compute},
+            {"query": "run read", "rows": len(saved), **read},
+        ])
+        print(f"\n💾 Payroll run stored in {save_ms:.0f} ms")
+        print(f"🐢 Legacy per-employee join: {await time_legacy(conn)}")
+
+        success = True
+        if compute["p95"] > MAX_COMPUTE_P95_MS:
+            print(f"\n❌ Set-based p95 {compute['p95']:.1f} ms > {MAX_COMPUTE_P95_MS:.0f} ms")
+            success = False
+        if read["p95"] > compute["p95"] * MAX_RUN_READ_RATIO:
+            print(f"\n❌ Stored run p95 {read['p95']:.1f} ms is not below {MAX_RUN_READ_RATIO} x compute")
+            success = False
+        if success:
+            print(f"\n✅ Set-based p95 {compute['p95']:.1f} ms, stored run p95 {read['p95']:.1f} ms")
+        return success
+    finally:
+        await cleanup(db)
+        await db.close()
+
+
+if __name__ == "__main__":
+    success = asyncio.run(run_benchmark())
+    sys.exit(0 if success else 1)
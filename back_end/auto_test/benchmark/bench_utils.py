@@ -0,0 +1,82 @@
+"""
+Benchmark Utilities
+Timing helpers shared by the benchmark scripts (100% SQL thuần).
+"""
+import math
+import time
+from typing import Awaitable, Callable, Dict, List
+
+
+def percentile(samples: List[float], pct: float) -> float:
+    """
+    Nearest-rank percentile.
+
+    Args:
+        samples: Measured values
+        pct: Percentile in range 0-100
+
+    Returns:
+        float: Percentile value (0 if no samples)
+    """
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    rank = max(0, min(len(ordered) - 1, math.ceil(pct / 100 * len(ordered)) - 1))
+    return ordered[rank]
+
+
+async def measure(
+    fn: Callable[[], Awaitable[object]],
+    iterations: int = 200,
+    warmup: int = 20
+) -> List[float]:
+    """
+    Run an async callable repeatedly and collect latencies.
+
+    Args:
+        fn: Async callable without arguments
+        iterations: Number of measured runs
+        warmup: Number of unmeasured runs (plan cache, buffer cache)
+
+    Returns:
+        list: Latencies in milliseconds
+    """
+    for _ in range(warmup):
+        await fn()
+
+    samples = []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        await fn()
+        samples.append((time.perf_counter() - started) * 1000)
+    return samples
+
+
+def summarize(samples: List[float]) -> Dict[str, float]:
+    """Return p50/p95/p99/max (ms) for a list of latencies."""
+    return {
+        "p50": percentile(samples, 50),
+        "p95": percentile(samples, 95),
+        "p99": percentile(samples, 99),
+        "max": max(samples) if samples else 0.0,
+    }
+
+
+def print_table(title: str, label: str, rows: List[Dict[str, float]]):
+    """
+    Print benchmark results as a table.
+
+    Args:
+        title: Table title
+        label: Name of the key column (e.g. "years")
+        rows: Dicts with the key column, a "rows" count and summarize() fields
+    """
+    print("\n" + "=" * 60)
+    print(f"📊 {title}")
+    print("=" * 60)
+    print(f"{label:>10} {'rows':>12} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+    for row in rows:
+        print(
+            f"{row[label]:>10} {row['rows']:>12} "
+            f"{row['p50']:>9.2f} {row['p95']:>9.2f} {row['p99']:>9.2f}"
+        )
@@ -0,0 +1,46 @@
+#!/usr/bin/env python3
+"""
+Script to generate the monthly invoices of all companies (month close)
+Same job as POST /api/invoices/generate, for cron / manual runs. Cached
+reports of the running API are invalidated through the shared
+cache_tag_versions table (REPORT_CACHE_SHARED_TAGS).
+
+Cách dùng:
+    cd back_end && python auto_test/script/generate_invoices.py <month> <year>
+"""
+import asyncio
+import sys
+import os
+
+# Add parent directory to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../../')))
+
+from fastapi import HTTPException
+from api.database import create_pool, close_pool
+from api.services.invoice_service import InvoiceService
+
+
+async def generate_invoices(month: int, year: int):
+    """Run the invoice job once."""
+    print(f"🧾 Generating invoices for {month:02d}/{year}...")
+    
+    await create_pool()
+    try:
+        summary = await InvoiceService().generate_invoices(month, year)
+        for key, value in summary.items():
+            print(f"  • {key}: {value}")
+        print("\n✅ Invoices generated!")
+        return True
+    except HTTPException as e:
+        print(f"❌ Error generating invoices: {e.detail}")
+        return False
+    finally:
+        await close_pool()
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 3:
+        print("Usage: python auto_test/script/generate_invoices.py <month> <year>")
+        sys.exit(1)
+    success = asyncio.run(generate_invoices(int(sys.argv[1]), int(sys.argv[2])))
+    sys.exit(0 if success else 1)
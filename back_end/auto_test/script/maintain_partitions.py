@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+"""
+Script to maintain the monthly partitions of the usage tables
+100% SQL thuần
+
+Creates the partitions of the coming months, moves rows parked in the default
+partitions into their own months and, with a retention, detaches old months
+into the usage_archive schema. Run monthly (cron); safe to rerun.
+
+Cách dùng:
+    cd back_end && python auto_test/script/maintain_partitions.py [months_ahead] [retention_months]
+    (mặc định: USAGE_PARTITIONS_AHEAD, USAGE_RETENTION_MONTHS; retention 0 = không archive)
+"""
+import asyncio
+import sys
+import os
+
+# Add parent directory to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../../')))
+
+from api.config import settings
+from auto_test.sql.db_utils import DatabaseUtils
+
+
+async def maintain_partitions(months_ahead: int, retention_months: int):
+    """Run maintain_usage_partitions() once (migration 008)."""
+    db = DatabaseUtils()
+    
+    print(f"🗂️  Maintaining usage partitions (ahead: {months_ahead}, retention: {retention_months or 'keep all'})...")
+    
+    try:
+        rows = await db.fetchall(
+            "SELECT * FROM maintain_usage_partitions($1, $2)",
+            months_ahead, retention_months or None
+        )
+        for row in rows:
+            print(f"  • {row['action']}: {row['partition_name']}")
+        print(f"\n✅ Partitions up to date ({len(rows)} change(s))")
+        return True
+    except Exception as e:
+        print(f"❌ Error maintaining partitions: {e}")
+        return False
+    finally:
+        await db.close()
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 3:
+        print("Usage: python auto_test/script/maintain_partitions.py [months_ahead] [retention_months]")
+        sys.exit(1)
+    months_ahead = int(sys.argv[1]) if len(sys.argv) > 1 else settings.USAGE_PARTITIONS_AHEAD
+    retention_months = int(sys.argv[2]) if len(sys.argv) > 2 else settings.USAGE_RETENTION_MONTHS
+    success = asyncio.run(maintain_partitions(months_ahead, retention_months))
+    sys.exit(0 if success else 1)
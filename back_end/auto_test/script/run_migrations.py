@@ -20,7 +20,15 @@ async def run_migrations():
     migrations_dir = os.path.join(os.path.dirname(__file__), '../../migrations')
     migration_files = [
         '001_initial_schema.sql',
-        '002_sample_data.sql'
+        '002_sample_data.sql',
+        '003_rent_contract_ranges.sql',
+        '004_rent_contract_no_overlap.sql',
+        '005_monthly_finance_rollup.sql',
+        '006_payroll_runs.sql',
+        '007_invoice_generation.sql',
+        '008_usage_partitions.sql',
+        '009_table_versions.sql',
+        '010_cache_tag_versions.sql'
     ]
     
     print("🔄 Running migrations...")
@@ -233,15 +233,17 @@ class DatabaseUtils:
     
     async def get_table_names(self) -> List[str]:
         """
-        Get all table names in current database.
+        Get all table names in current database (partitions are covered by their parent).
         
         Returns:
             list: List of table names
         """
         query = """
             SELECT tablename 
-            FROM pg_tables 
-            WHERE schemaname = 'public'
+            FROM pg_tables t
+            JOIN pg_class c ON c.oid = format('%I.%I', t.schemaname, t.tablename)::regclass
+            WHERE t.schemaname = 'public'
+            AND NOT c.relispartition
             ORDER BY tablename
         """
         rows = await self.fetchall(query)
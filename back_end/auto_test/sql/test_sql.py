@@ -14,6 +14,7 @@ Cách dùng:
     cd back_end && python -m auto_test.sql.test_sql test_tables_exist test_sample_data_loaded
 """
 import asyncio
+import re
 import sys
 import os
 from datetime import date
@@ -35,6 +36,12 @@ ALL_SQL_TESTS = [
     "test_company_monthly_costs",
     "test_foreign_key_constraints",
     "test_date_range_constraints",
+    "test_month_filters_use_indexes",
+    "test_rent_overlap_across_year_boundary",
+    "test_office_overlap_exclusion",
+    "test_finance_rollup_triggers",
+    "test_usage_partition_maintenance",
+    "test_table_version_triggers",
 ]
 
 
@@ -296,6 +303,228 @@ class SQLTests:
         except Exception:
             self.assert_true(True, "Invalid date range rejected (CHECK constraint works)")
     
+    async def test_month_filters_use_indexes(self):
+        """Test 11: Month filters on usages prune to the month's partition and use its index."""
+        print("\n🧪 Test 11: Month Filters Use Indexes")
+        
+        conn = await self.db.connect()
+        async with conn.transaction():
+            # Disable seq scans so the planner must pick an index if one is usable
+            await conn.execute("SET LOCAL enable_seqscan = off")
+            
+            plan_rows = await conn.fetch("""
+                EXPLAIN SELECT SUM(cmu.price)
+                FROM company_monthly_usages cmu
+                WHERE cmu.company_id = $1
+                AND cmu.from_date >= MAKE_DATE($2, $3, 1)
+                AND cmu.from_date < (MAKE_DATE($2, $3, 1) + INTERVAL '1 month')::date
+            """, 1, 2026, 1)
+            plan = "\n".join(row[0] for row in plan_rows)
+            self.assert_equal(
+                set(re.findall(r"company_monthly_usages_(\d{4}_\d{2}|default)", plan)), {"2026_01"},
+                "Monthly usages month filter scans only the 2026_01 partition"
+            )
+            self.assert_true("Index" in plan, "Monthly usages month filter uses the partition's index")
+            
+            plan_rows = await conn.fetch("""
+                EXPLAIN SELECT SUM(edu.price)
+                FROM employee_daily_usages edu
+                WHERE edu.employee_id = $1
+                AND edu.usage_date >= MAKE_DATE($2, $3, 1)
+                AND edu.usage_date < (MAKE_DATE($2, $3, 1) + INTERVAL '1 month')::date
+            """, 1, 2025, 12)
+            plan = "\n".join(row[0] for row in plan_rows)
+            self.assert_equal(
+                set(re.findall(r"employee_daily_usages_(\d{4}_\d{2}|default)", plan)), {"2025_12"},
+                "Daily usages month filter scans only the 2025_12 partition"
+            )
+            self.assert_true("Index" in plan, "Daily usages month filter uses the partition's index")
+    
+    async def test_rent_overlap_across_year_boundary(self):
+        """Test 12: Rent overlap predicate works across year boundaries."""
+        print("\n🧪 Test 12: Rent Overlap Across Year Boundary")
+        
+        query = """
+            SELECT COALESCE(SUM(rc.rent_price), 0)
+            FROM rent_contracts rc
+            WHERE rc.company_id = $1
+            AND rc.status = 'active'
+            AND daterange(rc.from_date, rc.end_date, '[]')
+                && daterange(MAKE_DATE($2, $3, 1), (MAKE_DATE($2, $3, 1) + INTERVAL '1 month')::date)
+        """
+        
+        # Company 1 rents P101 + P102 from 2025-11-01: January 2026 must be billed
+        rent_cost = await self.db.fetchval(query, 1, 2026, 1)
+        self.assert_equal(float(rent_cost), 33000000.0, "Contract from Nov 2025 billed in Jan 2026")
+        
+        # Before the contract starts nothing is billed
+        rent_cost = await self.db.fetchval(query, 1, 2025, 10)
+        self.assert_equal(float(rent_cost), 0.0, "No rent before contract start")
+        
+        conn = await self.db.connect()
+        async with conn.transaction():
+            await conn.execute("SET LOCAL enable_seqscan = off")
+            plan_rows = await conn.fetch("EXPLAIN " + query, 1, 2026, 1)
+            plan = "\n".join(row[0] for row in plan_rows)
+            self.assert_true(
+                "idx_rent_contracts_company_period" in plan,
+                "Rent overlap uses idx_rent_contracts_company_period"
+            )
+    
+    async def test_office_overlap_exclusion(self):
+        """Test 13: Exclusion constraint rejects overlapping active contracts."""
+        print("\n🧪 Test 13: Office Overlap Exclusion Constraint")
+        
+        query = """
+            INSERT INTO rent_contracts 
+            (office_id, company_id, from_date, end_date, rent_price, status)
+            VALUES ($1, $2, $3, $4, $5, $6)
+            RETURNING id
+        """
+        
+        # Office 1 is rented by company 1 from 2025-11-01 to 2026-10-31
+        try:
+            await self.db.execute(query, 1, 2, date(2026, 10, 31), date(2027, 3, 31), 15000000, 'active')
+            self.assert_true(False, "Overlapping active contract rejected")
+        except Exception as e:
+            self.assert_true(
+                "rent_contracts_office_no_overlap" in str(e),
+                "Overlapping active contract rejected (exclusion constraint works)"
+            )
+        
+        # Inactive contracts do not block the office
+        contract_id = await self.db.fetchval(
+            query, 1, 2, date(2026, 1, 1), date(2026, 6, 30), 15000000, 'terminated'
+        )
+        self.assert_true(contract_id is not None, "Terminated contract may overlap")
+        await self.db.execute("DELETE FROM rent_contracts WHERE id = $1", contract_id)
+    
+    async def test_finance_rollup_triggers(self):
+        """Test 14: Triggers keep monthly_finance_rollup current."""
+        print("\n🧪 Test 14: Finance Rollup Triggers")
+        
+        rollup_query = """
+            SELECT COALESCE(SUM(invoice_revenue), 0)
+            FROM monthly_finance_rollup WHERE year = 2030 AND month = 3
+        """
+        before = await self.db.fetchval(rollup_query)
+        
+        invoice_id = await self.db.fetchval("""
+            INSERT INTO invoices (from_date, to_date, total_amount, note)
+            VALUES ('2030-03-01', '2030-03-31', 1234000, 'TEST_ROLLUP')
+            RETURNING id
+        """)
+        after_insert = await self.db.fetchval(rollup_query)
+        self.assert_equal(float(after_insert - before), 1234000.0, "INSERT adds to rollup")
+        
+        await self.db.execute("UPDATE invoices SET total_amount = 1000000 WHERE id = $1", invoice_id)
+        after_update = await self.db.fetchval(rollup_query)
+        self.assert_equal(float(after_update - before), 1000000.0, "UPDATE applies delta to rollup")
+        
+        await self.db.execute("DELETE FROM invoices WHERE id = $1", invoice_id)
+        after_delete = await self.db.fetchval(rollup_query)
+        self.assert_equal(float(after_delete), float(before), "DELETE removes from rollup")
+        
+        # Rollup equals a full recomputation
+        drift = await self.db.fetchval("""
+            SELECT COUNT(*) FROM (
+                SELECT EXTRACT(YEAR FROM usage_date)::int AS year,
+                       EXTRACT(MONTH FROM usage_date)::int AS month,
+                       SUM(price) AS amount
+                FROM employee_daily_usages GROUP BY 1, 2
+            ) live
+            LEFT JOIN monthly_finance_rollup r USING (year, month)
+            WHERE r.daily_service_revenue IS DISTINCT FROM live.amount
+        """)
+        self.assert_equal(drift, 0, "Daily usage rollup matches live totals")
+    
+    async def test_usage_partition_maintenance(self):
+        """Test 15: Partition maintenance moves rows out of the default partition and archives old months."""
+        print("\n🧪 Test 15: Usage Partition Maintenance")
+        
+        rollup_query = """
+            SELECT COALESCE(SUM(daily_service_revenue), 0)
+            FROM monthly_finance_rollup WHERE year = 2031 AND month = 7
+        """
+        partition_query = "SELECT tableoid::regclass::text FROM employee_daily_usages WHERE id = $1"
+        try:
+            usage_id = await self.db.fetchval("""
+                INSERT INTO employee_daily_usages (employee_id, service_id, usage_date, price, service_type)
+                VALUES (1, 3, '2031-07-15', 15000, 'TEST_PARTITION')
+                RETURNING id
+            """)
+            self.assert_equal(
+                await self.db.fetchval(partition_query, usage_id), "employee_daily_usages_default",
+                "Month without a partition lands in the default partition"
+            )
+            before = await self.db.fetchval(rollup_query)
+            
+            await self.db.execute("SELECT * FROM maintain_usage_partitions(0)")
+            self.assert_equal(
+                await self.db.fetchval(partition_query, usage_id), "employee_daily_usages_2031_07",
+                "Maintenance moves the month into its own partition"
+            )
+            self.assert_equal(await self.db.fetchval(rollup_query), before, "Moving rows leaves the rollup unchanged")
+            
+            # Retention ending at 1990-02 archives only the 1990-01 partition
+            await self.db.execute("SELECT create_usage_partition('employee_daily_usages', '1990-01-01')")
+            today = date.today()
+            retention = (today.year * 12 + today.month) - (1990 * 12 + 2)
+            archived = await self.db.fetchall("SELECT * FROM maintain_usage_partitions(0, $1)", retention)
+            self.assert_equal(
+                [row["partition_name"] for row in archived if row["action"] == "archived"],
+                ["usage_archive.employee_daily_usages_1990_01"],
+                "Retention detaches old months into usage_archive"
+            )
+        finally:
+            await self.db.execute("DELETE FROM employee_daily_usages WHERE service_type = 'TEST_PARTITION'")
+            await self.db.execute("DROP TABLE IF EXISTS employee_daily_usages_2031_07")
+            await self.db.execute("DROP TABLE IF EXISTS company_monthly_usages_2031_07")
+            await self.db.execute("DROP TABLE IF EXISTS usage_archive.employee_daily_usages_1990_01")
+    
+    async def test_table_version_triggers(self):
+        """Test 16: Every committed write bumps the table version, even one hidden from max(updated_at)."""
+        print("\n🧪 Test 16: Table Version Triggers")
+        
+        version_query = "SELECT version FROM table_versions WHERE table_name = 'offices'"
+        legacy_query = "SELECT count(*) || ':' || COALESCE(max(updated_at)::text, '') FROM offices"
+        office_ids = [row["id"] for row in await self.db.fetchall("SELECT id FROM offices ORDER BY id LIMIT 2")]
+        if len(office_ids) < 2:
+            self.assert_true(False, "Need two offices", "Sample data not loaded")
+            return
+        
+        other = DatabaseUtils()
+        conn = await other.connect()
+        try:
+            # A transaction that started first commits last: its updated_at is
+            # older than the other write, so count + max(updated_at) misses it
+            tx = conn.transaction()
+            await tx.start()
+            await conn.fetchval("SELECT now()")
+            await self.db.execute("UPDATE offices SET name = name WHERE id = $1", office_ids[0])
+            before_version = await self.db.fetchval(version_query)
+            before_legacy = await self.db.fetchval(legacy_query)
+            await conn.execute("UPDATE offices SET name = name WHERE id = $1", office_ids[1])
+            await tx.commit()
+            
+            self.assert_equal(
+                await self.db.fetchval(legacy_query), before_legacy,
+                "count + max(updated_at) does not see the late commit"
+            )
+            self.assert_equal(
+                await self.db.fetchval(version_query), before_version + 1,
+                "Table version counts the late commit"
+            )
+            
+            async with conn.transaction():
+                await conn.execute("UPDATE offices SET name = name WHERE id = $1", office_ids[1])
+                self.assert_equal(
+                    await self.db.fetchval(version_query), before_version + 1,
+                    "Uncommitted writes are not visible in the version"
+                )
+        finally:
+            await other.close()
+    
     async def run_all_tests(self):
         """Run all tests."""
         print("=" * 60)
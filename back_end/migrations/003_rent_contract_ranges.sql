@@ -0,0 +1,18 @@
+-- Migration 003: Range indexes for rent contracts
+-- Rent queries compare the contract period with a month as daterange overlap (&&).
+-- A GiST index on (company_id, period) serves those lookups without scanning
+-- every contract of the company.
+
+-- btree_gist: allows plain scalar columns (company_id, office_id) in GiST indexes
+CREATE EXTENSION IF NOT EXISTS btree_gist;
+
+-- Contract period is inclusive on both ends: [from_date, end_date]
+CREATE INDEX IF NOT EXISTS idx_rent_contracts_company_period
+ON rent_contracts USING GIST (company_id, daterange(from_date, end_date, '[]'))
+INCLUDE (office_id, rent_price)
+WHERE status = 'active';
+
+DO $$
+BEGIN
+    RAISE NOTICE '✅ Migration 003: Rent contract range indexes created successfully';
+END $$;
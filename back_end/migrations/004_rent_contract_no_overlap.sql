@@ -0,0 +1,19 @@
+-- Migration 004: Prevent overlapping active contracts on the same office
+-- Replaces the application-side availability check (COUNT + INSERT) with an
+-- exclusion constraint, which is atomic under concurrent bookings.
+-- Requires btree_gist (migration 003) for "office_id WITH =".
+
+CREATE EXTENSION IF NOT EXISTS btree_gist;
+
+ALTER TABLE rent_contracts
+ADD CONSTRAINT rent_contracts_office_no_overlap
+EXCLUDE USING GIST (
+    office_id WITH =,
+    daterange(from_date, end_date, '[]') WITH &&
+)
+WHERE (status = 'active');
+
+DO $$
+BEGIN
+    RAISE NOTICE '✅ Migration 004: Office overlap exclusion constraint created successfully';
+END $$;
@@ -0,0 +1,182 @@
+-- Migration 005: Monthly finance rollup
+-- Pre-aggregated revenue per (year, month), kept current by statement-level
+-- triggers on invoices, company_monthly_usages and employee_daily_usages.
+-- /reports/building-finance reads one row instead of aggregating invoices.
+
+CREATE TABLE IF NOT EXISTS monthly_finance_rollup (
+    year INT NOT NULL,
+    month INT NOT NULL CHECK (month BETWEEN 1 AND 12),
+    invoice_revenue DECIMAL(18,2) NOT NULL DEFAULT 0,
+    invoice_count INT NOT NULL DEFAULT 0,
+    monthly_service_revenue DECIMAL(18,2) NOT NULL DEFAULT 0,
+    daily_service_revenue DECIMAL(18,2) NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (year, month)
+);
+
+-- Add deltas to one (year, month) bucket
+CREATE OR REPLACE FUNCTION finance_rollup_add(
+    p_year INT,
+    p_month INT,
+    p_invoice_revenue DECIMAL,
+    p_invoice_count INT,
+    p_monthly_service_revenue DECIMAL,
+    p_daily_service_revenue DECIMAL
+) RETURNS VOID AS $$
+BEGIN
+    INSERT INTO monthly_finance_rollup
+        (year, month, invoice_revenue, invoice_count, monthly_service_revenue, daily_service_revenue)
+    VALUES
+        (p_year, p_month, p_invoice_revenue, p_invoice_count, p_monthly_service_revenue, p_daily_service_revenue)
+    ON CONFLICT (year, month) DO UPDATE SET
+        invoice_revenue = monthly_finance_rollup.invoice_revenue + EXCLUDED.invoice_revenue,
+        invoice_count = monthly_finance_rollup.invoice_count + EXCLUDED.invoice_count,
+        monthly_service_revenue = monthly_finance_rollup.monthly_service_revenue + EXCLUDED.monthly_service_revenue,
+        daily_service_revenue = monthly_finance_rollup.daily_service_revenue + EXCLUDED.daily_service_revenue,
+        updated_at = CURRENT_TIMESTAMP;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Statement-level triggers: one aggregate per statement (cheap for bulk loads).
+-- Transition tables: new_rows (INSERT/UPDATE), old_rows (UPDATE/DELETE).
+CREATE OR REPLACE FUNCTION finance_rollup_invoices() RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        PERFORM finance_rollup_add(y, m, amount, cnt, 0, 0)
+        FROM (
+            SELECT EXTRACT(YEAR FROM from_date)::int AS y, EXTRACT(MONTH FROM from_date)::int AS m,
+                   COALESCE(SUM(total_amount), 0) AS amount, COUNT(*)::int AS cnt
+            FROM new_rows WHERE from_date IS NOT NULL
+            GROUP BY 1, 2
+        ) delta;
+    END IF;
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        PERFORM finance_rollup_add(y, m, -amount, -cnt, 0, 0)
+        FROM (
+            SELECT EXTRACT(YEAR FROM from_date)::int AS y, EXTRACT(MONTH FROM from_date)::int AS m,
+                   COALESCE(SUM(total_amount), 0) AS amount, COUNT(*)::int AS cnt
+            FROM old_rows WHERE from_date IS NOT NULL
+            GROUP BY 1, 2
+        ) delta;
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION finance_rollup_monthly_usages() RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        PERFORM finance_rollup_add(y, m, 0, 0, amount, 0)
+        FROM (
+            SELECT EXTRACT(YEAR FROM from_date)::int AS y, EXTRACT(MONTH FROM from_date)::int AS m,
+                   COALESCE(SUM(price), 0) AS amount
+            FROM new_rows WHERE from_date IS NOT NULL
+            GROUP BY 1, 2
+        ) delta;
+    END IF;
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        PERFORM finance_rollup_add(y, m, 0, 0, -amount, 0)
+        FROM (
+            SELECT EXTRACT(YEAR FROM from_date)::int AS y, EXTRACT(MONTH FROM from_date)::int AS m,
+                   COALESCE(SUM(price), 0) AS amount
+            FROM old_rows WHERE from_date IS NOT NULL
+            GROUP BY 1, 2
+        ) delta;
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION finance_rollup_daily_usages() RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        PERFORM finance_rollup_add(y, m, 0, 0, 0, amount)
+        FROM (
+            SELECT EXTRACT(YEAR FROM usage_date)::int AS y, EXTRACT(MONTH FROM usage_date)::int AS m,
+                   COALESCE(SUM(price), 0) AS amount
+            FROM new_rows
+            GROUP BY 1, 2
+        ) delta;
+    END IF;
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        PERFORM finance_rollup_add(y, m, 0, 0, 0, -amount)
+        FROM (
+            SELECT EXTRACT(YEAR FROM usage_date)::int AS y, EXTRACT(MONTH FROM usage_date)::int AS m,
+                   COALESCE(SUM(price), 0) AS amount
+            FROM old_rows
+            GROUP BY 1, 2
+        ) delta;
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- A trigger with transition tables may only fire on one event, hence 3 per table
+CREATE TRIGGER finance_rollup_invoices_insert AFTER INSERT ON invoices
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION finance_rollup_invoices();
+CREATE TRIGGER finance_rollup_invoices_update AFTER UPDATE ON invoices
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION finance_rollup_invoices();
+CREATE TRIGGER finance_rollup_invoices_delete AFTER DELETE ON invoices
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION finance_rollup_invoices();
+
+CREATE TRIGGER finance_rollup_monthly_usages_insert AFTER INSERT ON company_monthly_usages
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION finance_rollup_monthly_usages();
+CREATE TRIGGER finance_rollup_monthly_usages_update AFTER UPDATE ON company_monthly_usages
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION finance_rollup_monthly_usages();
+CREATE TRIGGER finance_rollup_monthly_usages_delete AFTER DELETE ON company_monthly_usages
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION finance_rollup_monthly_usages();
+
+CREATE TRIGGER finance_rollup_daily_usages_insert AFTER INSERT ON employee_daily_usages
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION finance_rollup_daily_usages();
+CREATE TRIGGER finance_rollup_daily_usages_update AFTER UPDATE ON employee_daily_usages
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION finance_rollup_daily_usages();
+CREATE TRIGGER finance_rollup_daily_usages_delete AFTER DELETE ON employee_daily_usages
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION finance_rollup_daily_usages();
+
+-- Full rebuild (backfill, or repair after TRUNCATE / manual edits)
+CREATE OR REPLACE FUNCTION refresh_monthly_finance_rollup() RETURNS VOID AS $$
+BEGIN
+    DELETE FROM monthly_finance_rollup;
+
+    PERFORM finance_rollup_add(y, m, amount, cnt, 0, 0)
+    FROM (
+        SELECT EXTRACT(YEAR FROM from_date)::int AS y, EXTRACT(MONTH FROM from_date)::int AS m,
+               COALESCE(SUM(total_amount), 0) AS amount, COUNT(*)::int AS cnt
+        FROM invoices WHERE from_date IS NOT NULL
+        GROUP BY 1, 2
+    ) totals;
+
+    PERFORM finance_rollup_add(y, m, 0, 0, amount, 0)
+    FROM (
+        SELECT EXTRACT(YEAR FROM from_date)::int AS y, EXTRACT(MONTH FROM from_date)::int AS m,
+               COALESCE(SUM(price), 0) AS amount
+        FROM company_monthly_usages WHERE from_date IS NOT NULL
+        GROUP BY 1, 2
+    ) totals;
+
+    PERFORM finance_rollup_add(y, m, 0, 0, 0, amount)
+    FROM (
+        SELECT EXTRACT(YEAR FROM usage_date)::int AS y, EXTRACT(MONTH FROM usage_date)::int AS m,
+               COALESCE(SUM(price), 0) AS amount
+        FROM employee_daily_usages
+        GROUP BY 1, 2
+    ) totals;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Backfill existing data
+SELECT refresh_monthly_finance_rollup();
+
+DO $$
+BEGIN
+    RAISE NOTICE '✅ Migration 005: Monthly finance rollup created successfully';
+END $$;
@@ -0,0 +1,29 @@
+-- Migration 006: Payroll runs
+-- Salaries of a closed month are computed once (set-based) and stored, so
+-- /building-employees/salaries/monthly reads them back with one indexed lookup.
+-- Rows are a snapshot: later edits to employees or usages do not change a
+-- closed run until it is recomputed (POST /building-employees/salaries/monthly/run).
+
+CREATE TABLE IF NOT EXISTS payroll_runs (
+    year INT NOT NULL,
+    month INT NOT NULL CHECK (month BETWEEN 1 AND 12),
+    employee_id INT NOT NULL REFERENCES building_employees(employee_id) ON DELETE CASCADE,
+    full_name VARCHAR(101),
+    role VARCHAR(50),
+    base_salary DECIMAL(15,2),
+    bonus_rate FLOAT NOT NULL DEFAULT 0,
+    monthly_revenue DECIMAL(18,2) NOT NULL DEFAULT 0,
+    bonus DECIMAL(18,2) NOT NULL DEFAULT 0,
+    total_salary DECIMAL(18,2),
+    computed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (year, month, employee_id)
+);
+
+-- Revenue per service for one month: range scan on from_date without heap access
+CREATE INDEX IF NOT EXISTS idx_company_monthly_usages_date_service
+    ON company_monthly_usages(from_date) INCLUDE (service_id, price);
+
+DO $$
+BEGIN
+    RAISE NOTICE '✅ Migration 006: Payroll runs created successfully';
+END $$;
@@ -0,0 +1,24 @@
+-- Migration 007: Monthly invoice generation
+-- Invoices generated at month close belong to a company and cover one month.
+-- (company_id, from_date) is unique, so re-running a month updates the
+-- existing unpaid invoices instead of creating duplicates.
+
+ALTER TABLE invoices ADD COLUMN IF NOT EXISTS company_id INT REFERENCES companies(id) ON DELETE CASCADE;
+ALTER TABLE invoices ADD COLUMN IF NOT EXISTS rent_amount DECIMAL(15,2);
+ALTER TABLE invoices ADD COLUMN IF NOT EXISTS monthly_service_amount DECIMAL(15,2);
+ALTER TABLE invoices ADD COLUMN IF NOT EXISTS daily_service_amount DECIMAL(15,2);
+
+-- One invoice per company and month (invoices without company_id are not constrained)
+CREATE UNIQUE INDEX IF NOT EXISTS idx_invoices_company_period
+    ON invoices(company_id, from_date);
+
+-- Usages of an invoice; also keeps ON DELETE SET NULL from scanning the usage tables
+CREATE INDEX IF NOT EXISTS idx_company_monthly_usages_invoice
+    ON company_monthly_usages(invoice_id) WHERE invoice_id IS NOT NULL;
+CREATE INDEX IF NOT EXISTS idx_employee_daily_usages_invoice
+    ON employee_daily_usages(invoice_id) WHERE invoice_id IS NOT NULL;
+
+DO $$
+BEGIN
+    RAISE NOTICE '✅ Migration 007: Invoice generation created successfully';
+END $$;
@@ -0,0 +1,256 @@
+-- Migration 008: Monthly partitions for usage tables
+-- employee_daily_usages (by usage_date) and company_monthly_usages (by from_date)
+-- are range-partitioned by month. A month filter scans one partition with small
+-- indexes, and old months are detached whole instead of DELETE + VACUUM.
+--
+-- Partitions are named <table>_YYYY_MM. Rows of a month without a partition
+-- land in <table>_default until maintain_usage_partitions() moves them out.
+-- maintain_usage_partitions() (auto_test/script/maintain_partitions.py, run
+-- monthly) creates the coming months and detaches months past retention into
+-- the usage_archive schema. Archived rows stay in monthly_finance_rollup
+-- (DETACH fires no triggers) but are no longer seen by live queries.
+
+CREATE SCHEMA IF NOT EXISTS usage_archive;
+
+-- Partition key of a usage table
+CREATE OR REPLACE FUNCTION usage_partition_key(p_table TEXT) RETURNS TEXT AS $$
+BEGIN
+    CASE p_table
+        WHEN 'employee_daily_usages' THEN RETURN 'usage_date';
+        WHEN 'company_monthly_usages' THEN RETURN 'from_date';
+        ELSE RAISE EXCEPTION 'Not a partitioned usage table: %', p_table;
+    END CASE;
+END;
+$$ LANGUAGE plpgsql IMMUTABLE;
+
+-- Create the partition of one month (no-op if it exists); returns its name, or NULL.
+-- Rows of that month parked in the default partition are moved into it. They
+-- move partition to partition, so the parent's rollup triggers do not fire.
+CREATE OR REPLACE FUNCTION create_usage_partition(p_table TEXT, p_month DATE) RETURNS TEXT AS $$
+DECLARE
+    v_key TEXT := usage_partition_key(p_table);
+    v_start DATE := date_trunc('month', p_month)::date;
+    v_end DATE := (date_trunc('month', p_month) + INTERVAL '1 month')::date;
+    v_name TEXT := p_table || '_' || to_char(v_start, 'YYYY_MM');
+BEGIN
+    IF to_regclass(format('public.%I', v_name)) IS NOT NULL THEN
+        RETURN NULL;
+    END IF;
+
+    EXECUTE format('CREATE TABLE %I (LIKE %I INCLUDING DEFAULTS)', v_name, p_table);
+    IF to_regclass(format('public.%I', p_table || '_default')) IS NOT NULL THEN
+        EXECUTE format(
+            'WITH moved AS (DELETE FROM %I WHERE %I >= $1 AND %I < $2 RETURNING *) INSERT INTO %I SELECT * FROM moved',
+            p_table || '_default', v_key, v_key, v_name
+        ) USING v_start, v_end;
+    END IF;
+    EXECUTE format(
+        'ALTER TABLE %I ATTACH PARTITION %I FOR VALUES FROM (%L) TO (%L)',
+        p_table, v_name, v_start, v_end
+    );
+    RETURN v_name;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Partitions of every month in [p_from, p_to] for both usage tables (names of the created ones)
+CREATE OR REPLACE FUNCTION create_usage_partitions(p_from DATE, p_to DATE) RETURNS SETOF TEXT AS $$
+    SELECT created
+    FROM unnest(ARRAY['employee_daily_usages', 'company_monthly_usages']) AS t(name)
+    CROSS JOIN generate_series(date_trunc('month', p_from), p_to, INTERVAL '1 month') AS m
+    CROSS JOIN LATERAL create_usage_partition(t.name, m::date) AS created
+    WHERE created IS NOT NULL;
+$$ LANGUAGE sql;
+
+-- Monthly upkeep of both usage tables:
+-- - create the partitions of the current month and p_months_ahead months after it,
+-- - move months found in the default partition into their own partitions,
+-- - with p_retention_months, detach partitions older than that many months
+--   (before the current month) into usage_archive.
+CREATE OR REPLACE FUNCTION maintain_usage_partitions(
+    p_months_ahead INT DEFAULT 3,
+    p_retention_months INT DEFAULT NULL
+) RETURNS TABLE (action TEXT, partition_name TEXT) AS $$
+DECLARE
+    v_table TEXT;
+    v_month DATE;
+    v_name TEXT;
+    v_current DATE := date_trunc('month', CURRENT_DATE)::date;
+    v_cutoff DATE := (date_trunc('month', CURRENT_DATE) - COALESCE(p_retention_months, 0) * INTERVAL '1 month')::date;
+BEGIN
+    FOREACH v_table IN ARRAY ARRAY['employee_daily_usages', 'company_monthly_usages'] LOOP
+        FOR v_month IN EXECUTE format(
+            'SELECT generate_series($1, $1 + $2 * INTERVAL ''1 month'', INTERVAL ''1 month'')::date
+             UNION
+             SELECT DISTINCT date_trunc(''month'', %I)::date FROM %I
+             ORDER BY 1',
+            usage_partition_key(v_table), v_table || '_default'
+        ) USING v_current, p_months_ahead LOOP
+            -- Late rows of an archived month stay in the default partition
+            CONTINUE WHEN p_retention_months IS NOT NULL AND v_month < v_cutoff;
+            v_name := create_usage_partition(v_table, v_month);
+            IF v_name IS NOT NULL THEN
+                action := 'created';
+                partition_name := v_name;
+                RETURN NEXT;
+            END IF;
+        END LOOP;
+
+        CONTINUE WHEN p_retention_months IS NULL;
+        FOR v_name IN
+            SELECT c.relname
+            FROM pg_inherits i
+            JOIN pg_class c ON c.oid = i.inhrelid
+            WHERE i.inhparent = v_table::regclass
+                AND c.relname ~ ('^' || v_table || '_[0-9]{4}_[0-9]{2}$')
+                AND to_date(right(c.relname, 7), 'YYYY_MM') < v_cutoff
+            ORDER BY c.relname
+        LOOP
+            EXECUTE format('ALTER TABLE %I DETACH PARTITION %I', v_table, v_name);
+            EXECUTE format('ALTER TABLE %I SET SCHEMA usage_archive', v_name);
+            action := 'archived';
+            partition_name := 'usage_archive.' || v_name;
+            RETURN NEXT;
+        END LOOP;
+    END LOOP;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Convert employee_daily_usages: new partitioned table, copy rows, then
+-- foreign keys and indexes on the loaded data. The primary key must contain
+-- the partition key, hence (id, usage_date); ids still come from one sequence.
+DO $$
+BEGIN
+    IF EXISTS (SELECT 1 FROM pg_partitioned_table WHERE partrelid = 'employee_daily_usages'::regclass) THEN
+        RETURN;
+    END IF;
+
+    ALTER TABLE employee_daily_usages RENAME TO employee_daily_usages_unpartitioned;
+    ALTER TABLE employee_daily_usages_unpartitioned DROP CONSTRAINT employee_daily_usages_pkey;
+    DROP INDEX IF EXISTS idx_employee_daily_usages_date;
+    DROP INDEX IF EXISTS idx_employee_daily_usages_invoice;
+
+    CREATE TABLE employee_daily_usages (
+        id INT NOT NULL DEFAULT nextval('employee_daily_usages_id_seq'),
+        employee_id INT NOT NULL,
+        invoice_id INT,
+        service_id INT NOT NULL,
+        usage_date DATE NOT NULL,
+        price DECIMAL(15,2),
+        service_type VARCHAR(50),
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        PRIMARY KEY (id, usage_date)
+    ) PARTITION BY RANGE (usage_date);
+    ALTER SEQUENCE employee_daily_usages_id_seq OWNED BY employee_daily_usages.id;
+    CREATE TABLE employee_daily_usages_default PARTITION OF employee_daily_usages DEFAULT;
+
+    PERFORM create_usage_partition('employee_daily_usages', m)
+    FROM (SELECT DISTINCT date_trunc('month', usage_date)::date AS m FROM employee_daily_usages_unpartitioned) months;
+
+    INSERT INTO employee_daily_usages
+        (id, employee_id, invoice_id, service_id, usage_date, price, service_type, created_at, updated_at)
+    SELECT id, employee_id, invoice_id, service_id, usage_date, price, service_type, created_at, updated_at
+    FROM employee_daily_usages_unpartitioned;
+    DROP TABLE employee_daily_usages_unpartitioned;
+
+    ALTER TABLE employee_daily_usages
+        ADD FOREIGN KEY (employee_id) REFERENCES company_employees(id) ON DELETE CASCADE,
+        ADD FOREIGN KEY (invoice_id) REFERENCES invoices(id) ON DELETE SET NULL,
+        ADD FOREIGN KEY (service_id) REFERENCES services(id) ON DELETE CASCADE;
+END $$;
+
+-- Same for company_monthly_usages, partitioned by from_date (now required).
+-- Rows without from_date are placed in the month they were recorded (the old
+-- table's rollup trigger counts them there).
+DO $$
+BEGIN
+    IF EXISTS (SELECT 1 FROM pg_partitioned_table WHERE partrelid = 'company_monthly_usages'::regclass) THEN
+        RETURN;
+    END IF;
+
+    ALTER TABLE company_monthly_usages RENAME TO company_monthly_usages_unpartitioned;
+    ALTER TABLE company_monthly_usages_unpartitioned DROP CONSTRAINT company_monthly_usages_pkey;
+    DROP INDEX IF EXISTS idx_company_monthly_usages_company_date;
+    DROP INDEX IF EXISTS idx_company_monthly_usages_date_service;
+    DROP INDEX IF EXISTS idx_company_monthly_usages_invoice;
+
+    CREATE TABLE company_monthly_usages (
+        id INT NOT NULL DEFAULT nextval('company_monthly_usages_id_seq'),
+        company_id INT NOT NULL,
+        service_id INT NOT NULL,
+        invoice_id INT,
+        from_date DATE NOT NULL,
+        to_date DATE,
+        quantity INT,
+        price DECIMAL(15,2),
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        PRIMARY KEY (id, from_date)
+    ) PARTITION BY RANGE (from_date);
+    ALTER SEQUENCE company_monthly_usages_id_seq OWNED BY company_monthly_usages.id;
+    CREATE TABLE company_monthly_usages_default PARTITION OF company_monthly_usages DEFAULT;
+
+    UPDATE company_monthly_usages_unpartitioned
+    SET from_date = date_trunc('month', COALESCE(created_at, CURRENT_TIMESTAMP))::date
+    WHERE from_date IS NULL;
+
+    PERFORM create_usage_partition('company_monthly_usages', m)
+    FROM (SELECT DISTINCT date_trunc('month', from_date)::date AS m FROM company_monthly_usages_unpartitioned) months;
+
+    INSERT INTO company_monthly_usages
+        (id, company_id, service_id, invoice_id, from_date, to_date, quantity, price, created_at, updated_at)
+    SELECT id, company_id, service_id, invoice_id, from_date, to_date, quantity, price, created_at, updated_at
+    FROM company_monthly_usages_unpartitioned;
+    DROP TABLE company_monthly_usages_unpartitioned;
+
+    ALTER TABLE company_monthly_usages
+        ADD FOREIGN KEY (company_id) REFERENCES companies(id) ON DELETE CASCADE,
+        ADD FOREIGN KEY (service_id) REFERENCES services(id) ON DELETE CASCADE,
+        ADD FOREIGN KEY (invoice_id) REFERENCES invoices(id) ON DELETE SET NULL;
+END $$;
+
+-- Indexes of migrations 001, 006 and 007, now per partition
+CREATE INDEX IF NOT EXISTS idx_employee_daily_usages_date
+    ON employee_daily_usages(employee_id, usage_date);
+CREATE INDEX IF NOT EXISTS idx_employee_daily_usages_invoice
+    ON employee_daily_usages(invoice_id) WHERE invoice_id IS NOT NULL;
+CREATE INDEX IF NOT EXISTS idx_company_monthly_usages_company_date
+    ON company_monthly_usages(company_id, from_date);
+CREATE INDEX IF NOT EXISTS idx_company_monthly_usages_date_service
+    ON company_monthly_usages(from_date) INCLUDE (service_id, price);
+CREATE INDEX IF NOT EXISTS idx_company_monthly_usages_invoice
+    ON company_monthly_usages(invoice_id) WHERE invoice_id IS NOT NULL;
+
+-- Triggers of migrations 001 and 005 (dropped with the old tables)
+CREATE OR REPLACE TRIGGER update_employee_daily_usages_updated_at BEFORE UPDATE ON employee_daily_usages
+    FOR EACH ROW EXECUTE FUNCTION update_updated_at_column();
+CREATE OR REPLACE TRIGGER update_company_monthly_usages_updated_at BEFORE UPDATE ON company_monthly_usages
+    FOR EACH ROW EXECUTE FUNCTION update_updated_at_column();
+
+CREATE OR REPLACE TRIGGER finance_rollup_monthly_usages_insert AFTER INSERT ON company_monthly_usages
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION finance_rollup_monthly_usages();
+CREATE OR REPLACE TRIGGER finance_rollup_monthly_usages_update AFTER UPDATE ON company_monthly_usages
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION finance_rollup_monthly_usages();
+CREATE OR REPLACE TRIGGER finance_rollup_monthly_usages_delete AFTER DELETE ON company_monthly_usages
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION finance_rollup_monthly_usages();
+
+CREATE OR REPLACE TRIGGER finance_rollup_daily_usages_insert AFTER INSERT ON employee_daily_usages
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION finance_rollup_daily_usages();
+CREATE OR REPLACE TRIGGER finance_rollup_daily_usages_update AFTER UPDATE ON employee_daily_usages
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION finance_rollup_daily_usages();
+CREATE OR REPLACE TRIGGER finance_rollup_daily_usages_delete AFTER DELETE ON employee_daily_usages
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION finance_rollup_daily_usages();
+
+-- Partitions for the current month and the next three
+SELECT * FROM maintain_usage_partitions(3);
+
+DO $$
+BEGIN
+    RAISE NOTICE '✅ Migration 008: Usage partitions created successfully';
+END $$;
@@ -0,0 +1,43 @@
+-- Migration 009: Table versions
+-- One counter per listed table, bumped by a statement-level trigger whenever
+-- rows are inserted, updated, deleted or truncated. List GETs build their ETag
+-- from it with one primary-key lookup instead of count(*) + max(updated_at).
+-- The bump is transactional, so readers never see a new version before the
+-- rows it describes (updated_at is the transaction start time and could not
+-- tell two writes in the same microsecond, or a late commit, apart).
+
+CREATE TABLE IF NOT EXISTS table_versions (
+    table_name VARCHAR(63) PRIMARY KEY,
+    version BIGINT NOT NULL DEFAULT 0
+);
+
+CREATE OR REPLACE FUNCTION bump_table_version() RETURNS TRIGGER AS $$
+BEGIN
+    INSERT INTO table_versions (table_name, version)
+    VALUES (TG_TABLE_NAME, 1)
+    ON CONFLICT (table_name) DO UPDATE SET version = table_versions.version + 1;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+INSERT INTO table_versions (table_name)
+VALUES ('offices'), ('companies'), ('rent_contracts'), ('building_employees')
+ON CONFLICT (table_name) DO NOTHING;
+
+CREATE OR REPLACE TRIGGER bump_offices_version
+    AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON offices
+    FOR EACH STATEMENT EXECUTE FUNCTION bump_table_version();
+CREATE OR REPLACE TRIGGER bump_companies_version
+    AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON companies
+    FOR EACH STATEMENT EXECUTE FUNCTION bump_table_version();
+CREATE OR REPLACE TRIGGER bump_rent_contracts_version
+    AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON rent_contracts
+    FOR EACH STATEMENT EXECUTE FUNCTION bump_table_version();
+CREATE OR REPLACE TRIGGER bump_building_employees_version
+    AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON building_employees
+    FOR EACH STATEMENT EXECUTE FUNCTION bump_table_version();
+
+DO $$
+BEGIN
+    RAISE NOTICE '✅ Migration 009: Table versions created successfully';
+END $$;
@@ -0,0 +1,15 @@
+-- Migration 010: Cache tag versions
+-- Report cache tag versions (api/cache.py), shared by every process that
+-- reads or invalidates cached reports: API workers and scripts such as
+-- auto_test/script/generate_invoices.py. A process-local counter would
+-- leave the other processes serving the old report until its TTL expires.
+
+CREATE TABLE IF NOT EXISTS cache_tag_versions (
+    tag VARCHAR(63) PRIMARY KEY,
+    version BIGINT NOT NULL DEFAULT 0
+);
+
+DO $$
+BEGIN
+    RAISE NOTICE '✅ Migration 010: Cache tag versions created successfully';
+END $$;